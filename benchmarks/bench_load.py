@@ -0,0 +1,213 @@
+"""
+Синтетическая нагрузка на DiscordLogger
+
+Прогоняет через DiscordLogger смесь событий сообщений, статуса, голосовых
+каналов и ролей на множестве серверов с фальшивыми объектами discord.py и
+заглушкой канала логов. Показывает события в секунду (вместе с разбором
+очередей отправки), временные выделения памяти на событие, память,
+удержанную после прогона (tracemalloc), и пиковую память. Горячие пути: send_log, is_rate_limited, рассылка статусов
+по общим серверам.
+
+Запуск:
+    python benchmarks/bench_load.py --guilds 100 --events 50000
+    python benchmarks/bench_load.py --mix message=1 --rate-limit 5
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import discord
+
+from fakes import FakeBot, FakeMember, FakeMessage, FakeRole, FakeVoiceState, build_guilds
+from modules.config import BotConfig
+from modules.logger import DiscordLogger
+from modules.system import format_bytes, get_rss_bytes
+
+DEFAULT_MIX = 'message=60,presence=25,voice=10,role=5'
+STATUSES = (discord.Status.online, discord.Status.idle, discord.Status.dnd, discord.Status.offline)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {'message', 'presence', 'voice', 'role'}
+    if unknown:
+        raise SystemExit(f"Неизвестные типы событий: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def make_config(args, guilds, config_dir: str) -> BotConfig:
+    config = BotConfig(os.path.join(config_dir, 'config.json'))
+    config.journal_path = os.path.join(config_dir, 'events.db') if args.journal else ''
+    config.server_log_channels = {str(guild.id): guild.log_channel.id for guild in guilds}
+    config.presence_window = args.presence_window
+    config.log_batch_interval = 0
+    config.log_queue_size = args.queue_size
+    # По умолчанию лимит частоты не срабатывает, чтобы замерять полный путь до отправки
+    config.rate_limit_default = [args.rate_limit or 10 ** 9, 60]
+    config.rate_limits = {}
+    config.compile_log_masks()
+    return config
+
+
+class EventGenerator:
+    """Готовит события заранее, чтобы в замер попадала только обработка"""
+
+    def __init__(self, logger: DiscordLogger, guilds, seed: int):
+        self.logger = logger
+        self.guilds = guilds
+        self.rng = random.Random(seed)
+        self.message_id = 0
+
+    def message(self) -> Callable:
+        guild = self.rng.choice(self.guilds)
+        author = self.rng.choice(guild.members)
+        self.message_id += 1
+        message = FakeMessage(self.message_id, guild, guild.text_channel, author, "сообщение " * self.rng.randrange(1, 30))
+        return lambda: self.logger.log_message_create(message)
+
+    def presence(self) -> Callable:
+        guild = self.rng.choice(self.guilds)
+        member = self.rng.choice(guild.members)
+        before, after = self.rng.sample(STATUSES, 2)
+        old = FakeMember(member.id, guild)
+        old.status = before
+        new = FakeMember(member.id, guild)
+        new.status = after
+        return lambda: self.logger.log_presence_update(old, new)
+
+    def voice(self) -> Callable:
+        guild = self.rng.choice(self.guilds)
+        member = self.rng.choice(guild.members)
+        channels = [None] + guild.voice_channels
+        before, after = self.rng.sample(channels, 2)
+        return lambda: self.logger.log_voice_state_update(member, FakeVoiceState(before), FakeVoiceState(after))
+
+    def role(self) -> Callable:
+        guild = self.rng.choice(self.guilds)
+        before = self.rng.choice(guild.roles)
+        after = FakeRole(before.id, guild, position=before.position + 1)
+        return lambda: self.logger.log_role_update(before, after)
+
+    def build(self, mix: Dict[str, float], count: int) -> List[Callable]:
+        kinds = list(mix)
+        weights = [mix[kind] for kind in kinds]
+        return [getattr(self, kind)() for kind in self.rng.choices(kinds, weights, k=count)]
+
+
+async def run_events(discord_logger: DiscordLogger, events: List[Callable]) -> float:
+    """Обрабатывает события и ждет, пока очереди отправки опустеют"""
+    started = time.perf_counter()
+    for event in events:
+        await event()
+    while discord_logger.delivery.depth():
+        await asyncio.sleep(0)
+    return time.perf_counter() - started
+
+
+async def trace_events(discord_logger: DiscordLogger, events: List[Callable]) -> dict:
+    """Обрабатывает события под tracemalloc.
+
+    Снимок до и после прогона показывает только удержанную память:
+    временные объекты горячего пути к концу уже освобождены. Поэтому для
+    каждого события (и для разбора очередей) отдельно замеряется пик
+    выделенной памяти над уровнем перед ним - сколько байт событие
+    выделяет, даже если потом освобождает.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    transient = 0
+    overall_peak = 0
+
+    for event in events:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await event()
+        _, peak = tracemalloc.get_traced_memory()
+        transient += peak - start
+        overall_peak = max(overall_peak, peak)
+
+    start, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    while discord_logger.delivery.depth():
+        await asyncio.sleep(0)
+    _, peak = tracemalloc.get_traced_memory()
+    transient += peak - start
+    overall_peak = max(overall_peak, peak)
+
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+    return {
+        'transient': transient,
+        'retained': sum(stat.size_diff for stat in diff),
+        'blocks': sum(stat.count_diff for stat in diff),
+        'peak': overall_peak
+    }
+
+
+async def run(args):
+    mix = parse_mix(args.mix)
+    guilds = build_guilds(args.guilds, args.members, args.users, args.seed)
+    bot = FakeBot(guilds)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        config = make_config(args, guilds, config_dir)
+        discord_logger = DiscordLogger(bot, config)
+        discord_logger.membership.rebuild(guilds)
+        generator = EventGenerator(discord_logger, guilds, args.seed)
+
+        # Прогрев: кэши описаний, очереди и воркеры серверов
+        await run_events(discord_logger, generator.build(mix, min(args.events, 2000)))
+
+        events = generator.build(mix, args.events)
+        gc.collect()
+        elapsed = await run_events(discord_logger, events)
+
+        # Второй проход под tracemalloc: он замедляет выполнение в разы, поэтому отдельно
+        memory = await trace_events(discord_logger, generator.build(mix, args.events))
+
+        await discord_logger.close()
+        sent_messages = sum(guild.log_channel.sent_messages for guild in guilds)
+        sent_embeds = sum(guild.log_channel.sent_embeds for guild in guilds)
+        delivery = discord_logger.delivery.get_stats()
+        limiter = discord_logger.rate_limiter.get_stats()
+
+    print(f"серверов: {args.guilds}, участников на сервере: {args.members}, событий: {args.events}, смесь: {args.mix}")
+    print(f"обработка:       {args.events / elapsed:,.0f} событий/с ({elapsed / args.events * 1e6:.1f} мкс/событие)")
+    print(f"выделено:        {memory['transient'] / args.events:.0f} байт на событие (пик временных выделений)")
+    print(f"удержано:        {memory['retained'] / args.events:.0f} байт и "
+          f"{memory['blocks'] / args.events:.2f} блоков на событие после прогона")
+    print(f"пик tracemalloc: {format_bytes(memory['peak'])}, RSS процесса: {format_bytes(get_rss_bytes())}")
+    print(f"отправлено:      {sent_embeds} embed в {sent_messages} сообщениях, "
+          f"потеряно: {delivery['dropped']}, подавлено лимитом: {limiter['suppressed_total']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, default=100)
+    parser.add_argument('--members', type=int, default=200, help='участников на сервере')
+    parser.add_argument('--users', type=int, default=5000, help='всего уникальных пользователей')
+    parser.add_argument('--events', type=int, default=50000, help='событий на замер')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='веса событий: message, presence, voice, role')
+    parser.add_argument('--rate-limit', type=int, default=0, help='событий на пользователя за минуту (0 - без лимита)')
+    parser.add_argument('--presence-window', type=float, default=0, help='окно объединения статусов, сек')
+    parser.add_argument('--queue-size', type=int, default=100000, help='размер очереди сервера')
+    parser.add_argument('--journal', action='store_true', help='включить журнал SQLite')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    args.members = min(args.members, args.users)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Бенчмарк поиска общих серверов пользователя для событий статуса и профиля
+
+Сравнивает прежний обход всех серверов (guild.get_member на каждый сервер)
+с обратным индексом MembershipIndex. Стоимость индекса не должна зависеть
+от числа серверов бота.
+
+Запуск:
+    python benchmarks/bench_membership.py --guilds 1 10 100 1000
+"""
+import argparse
+import random
+import time
+
+from fakes import build_guilds
+from modules.membership import MembershipIndex
+
+
+def scan_lookup(guilds, user_id: int):
+    """Прежний способ: проверяем каждый сервер"""
+    return [guild.id for guild in guilds if guild.get_member(user_id)]
+
+
+def bench(func, user_ids) -> float:
+    """Возвращает среднее время одного поиска в микросекундах"""
+    start = time.perf_counter()
+    for user_id in user_ids:
+        func(user_id)
+    return (time.perf_counter() - start) / len(user_ids) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--members', type=int, default=200, help='участников на сервере')
+    parser.add_argument('--users', type=int, default=20000, help='всего уникальных пользователей')
+    parser.add_argument('--events', type=int, default=20000, help='событий статуса на замер')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    user_ids = [rng.randrange(args.users) for _ in range(args.events)]
+
+    print(f"{'серверов':>10} {'обход, мкс':>12} {'индекс, мкс':>12} {'ускорение':>10}")
+    for guild_count in args.guilds:
+        guilds = build_guilds(guild_count, min(args.members, args.users), args.users, args.seed)
+        index = MembershipIndex()
+        index.rebuild(guilds)
+
+        scan_us = bench(lambda user_id: scan_lookup(guilds, user_id), user_ids)
+        index_us = bench(index.guilds_for, user_ids)
+        print(f"{guild_count:>10} {scan_us:>12.2f} {index_us:>12.3f} {scan_us / index_us:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
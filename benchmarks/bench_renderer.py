@@ -0,0 +1,97 @@
+"""
+Бенчмарк подготовки текста логов
+
+Сравнивает прежнее форматирование (новый объект часового пояса и strftime
+на каждый вызов, f-строки с описанием пользователя) с EmbedRenderer:
+шаблоны событий, время, закэшированное на секунду, и LRU описаний
+пользователей.
+
+Запуск:
+    python benchmarks/bench_renderer.py --events 100000 --users 1000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.renderer import EmbedRenderer
+
+
+class FakeUser:
+    __slots__ = ('id', 'name', 'discriminator')
+
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.discriminator = "0"
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+
+class FakeConfig:
+    def get_timezone_offset(self, guild_id=None) -> float:
+        return 7
+
+
+def legacy_format_time() -> str:
+    """Прежний DiscordLogger.format_time"""
+    dt = datetime.utcnow()
+    novosibirsk_tz = timezone(timedelta(hours=7))
+    dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(novosibirsk_tz).strftime('%d.%m.%Y %H:%M:%S MSK+4')
+
+
+def legacy_render(user, channel_id: int, content: str):
+    user_info = f"{user.mention} (`{user.id}`)\n{user.name}#{user.discriminator}"
+    title = "📝 Новое сообщение"
+    description = f"**Автор:** {user_info}\n**Канал:** <#{channel_id}>\n**Содержание:** {content}"
+    return title, description, legacy_format_time()
+
+
+def cached_render(renderer: EmbedRenderer, user, channel_id: int, content: str):
+    title, description, _ = renderer.render(
+        "message_create",
+        author=renderer.user(user),
+        channel=f"<#{channel_id}>",
+        content=content
+    )
+    return title, description, renderer.format_time(guild_id=1)
+
+
+def bench(func, events) -> float:
+    """Возвращает среднее время подготовки одного лога в микросекундах"""
+    start = time.perf_counter()
+    for user, channel_id, content in events:
+        func(user, channel_id, content)
+    return (time.perf_counter() - start) / len(events) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=100000, help='событий на замер')
+    parser.add_argument('--users', type=int, default=1000, help='уникальных авторов')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    users = [FakeUser(user_id) for user_id in range(args.users)]
+    events = [(rng.choice(users), rng.randrange(100), "привет " * rng.randrange(1, 20)) for _ in range(args.events)]
+
+    renderer = EmbedRenderer(FakeConfig())
+    legacy_us = bench(legacy_render, events)
+    cached_us = bench(lambda *event: cached_render(renderer, *event), events)
+    stats = renderer.get_stats()
+
+    print(f"прежнее форматирование: {legacy_us:.2f} мкс/лог")
+    print(f"EmbedRenderer:          {cached_us:.2f} мкс/лог ({legacy_us / cached_us:.1f}x)")
+    print(f"кэш описаний: {stats['hits']} попаданий, {stats['misses']} промахов")
+
+
+if __name__ == '__main__':
+    main()
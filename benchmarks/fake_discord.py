@@ -0,0 +1,341 @@
+"""
+Локальная замена REST API Discord для нагрузочных и длительных тестов
+
+Эмулирует отправку сообщений в каналы и через вебхуки с лимитами частоты,
+похожими на настоящие: у каждого маршрута свой лимит на канал или вебхук,
+общий глобальный лимит на все запросы, ответы 429 с Retry-After и
+заголовками X-RateLimit-*. Дополнительно можно задать задержку ответа,
+долю ошибок 5xx и обрывов соединения. Статистика доступна по /_stats.
+
+Запуск отдельно (бот подключается через replay.py --rest-url):
+    python benchmarks/fake_discord.py --port 8300 --latency 0.05 --fail-rate 0.01
+"""
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from aiohttp import web
+
+API_PREFIX = '/api/v10'
+
+
+def json_response(data, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    """JSON-ответ с Content-Type без charset: discord.py разбирает только точное application/json"""
+    headers = {**(headers or {}), 'Content-Type': 'application/json'}
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers)
+
+
+class Bucket:
+    """Лимит с фиксированным окном: limit запросов за window секунд"""
+
+    __slots__ = ('limit', 'window', 'remaining', 'reset_at')
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def acquire(self, now: float) -> float:
+        """Занимает место в окне; возвращает 0 или время до сброса лимита"""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        if self.remaining <= 0:
+            return self.reset_at - now
+        self.remaining -= 1
+        return 0.0
+
+
+class FakeDiscordServer:
+    """HTTP-сервер, отвечающий как REST API Discord на запросы бота логов"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8300, latency: float = 0.0, jitter: float = 0.0,
+                 fail_rate: float = 0.0, reset_rate: float = 0.0, route_limit: Tuple[int, float] = (5, 5.0),
+                 webhook_limit: Tuple[int, float] = (5, 2.0), global_limit: int = 50, send_headers: bool = True,
+                 seed: int = 1):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.reset_rate = reset_rate
+        self.route_limit = route_limit
+        self.webhook_limit = webhook_limit
+        self.global_bucket = Bucket(global_limit, 1.0) if global_limit else None
+        # Без заголовков X-RateLimit-* клиент узнает о лимите только из ответов 429
+        self.send_headers = send_headers
+        self.rng = random.Random(seed)
+        self.runner: Optional[web.AppRunner] = None
+
+        # (маршрут, ID канала или вебхука) -> лимит
+        self.buckets: Dict[Tuple[str, str], Bucket] = {}
+        # ID канала -> созданные вебхуки
+        self.webhooks: Dict[str, list] = {}
+        self.snowflake = 1
+
+        self.requests = collections.Counter()
+        self.statuses = collections.Counter()
+        self.rate_limited = collections.Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = time.monotonic()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def next_id(self) -> str:
+        self.snowflake += 1
+        return str(self.snowflake)
+
+    def get_bucket(self, route: str, major: str) -> Bucket:
+        key = (route, major)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            limit, window = self.webhook_limit if route.startswith('POST /webhooks') else self.route_limit
+            bucket = self.buckets[key] = Bucket(limit, window)
+        return bucket
+
+    def rate_limit_response(self, bucket: Bucket, route: str, retry_after: float, scope: str) -> web.Response:
+        self.rate_limited[scope] += 1
+        headers = {
+            'Retry-After': str(max(1, round(retry_after))),
+            'X-RateLimit-Scope': scope
+        }
+        if scope != 'global':
+            headers.update(self.bucket_headers(bucket, route))
+        body = {'message': 'You are being rate limited.', 'retry_after': round(retry_after, 3), 'global': scope == 'global'}
+        return json_response(body, status=429, headers=headers)
+
+    @staticmethod
+    def bucket_headers(bucket: Bucket, route: str) -> Dict[str, str]:
+        reset_after = max(bucket.reset_at - time.monotonic(), 0.0)
+        return {
+            'X-RateLimit-Limit': str(bucket.limit),
+            'X-RateLimit-Remaining': str(bucket.remaining),
+            'X-RateLimit-Reset': f"{time.time() + reset_after:.3f}",
+            'X-RateLimit-Reset-After': f"{reset_after:.3f}",
+            'X-RateLimit-Bucket': hashlib.md5(route.encode()).hexdigest()[:16]
+        }
+
+    async def limited(self, request: web.Request, route: str, major: str, handler) -> web.StreamResponse:
+        """Общая обработка запроса: лимиты, задержка и внедренные сбои"""
+        self.requests[route] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency or self.jitter:
+                await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+
+            if self.reset_rate and self.rng.random() < self.reset_rate:
+                self.statuses['reset'] += 1
+                request.transport.close()
+                return web.Response(status=500)
+            if self.fail_rate and self.rng.random() < self.fail_rate:
+                status = self.rng.choice((500, 502, 503))
+                self.statuses[status] += 1
+                return json_response({'message': 'Internal Server Error', 'code': 0}, status=status)
+
+            now = time.monotonic()
+            bucket = self.get_bucket(route, major)
+            if self.global_bucket is not None:
+                retry_after = self.global_bucket.acquire(now)
+                if retry_after:
+                    self.statuses[429] += 1
+                    return self.rate_limit_response(bucket, route, retry_after, 'global')
+            retry_after = bucket.acquire(now)
+            if retry_after:
+                self.statuses[429] += 1
+                return self.rate_limit_response(bucket, route, retry_after, 'user')
+
+            response = await handler(request)
+            if self.send_headers:
+                response.headers.update(self.bucket_headers(bucket, route))
+            self.statuses[response.status] += 1
+            return response
+        finally:
+            self.in_flight -= 1
+
+    def message_payload(self, channel_id: str, data: dict, author: dict) -> dict:
+        return {
+            'id': self.next_id(),
+            'channel_id': channel_id,
+            'type': 0,
+            'content': data.get('content') or '',
+            'author': author,
+            'attachments': [],
+            'embeds': data.get('embeds') or [],
+            'mentions': [],
+            'mention_roles': [],
+            'mention_everyone': False,
+            'pinned': False,
+            'tts': False,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'edited_timestamp': None,
+            'flags': 0,
+            'components': []
+        }
+
+    @staticmethod
+    async def read_payload(request: web.Request) -> dict:
+        """Достает JSON из тела запроса (обычного или multipart с файлами)"""
+        if request.content_type == 'multipart/form-data':
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == 'payload_json':
+                    return json.loads(await part.text())
+                await part.release()
+            return {}
+        if request.can_read_body:
+            return await request.json()
+        return {}
+
+    def bot_user(self) -> dict:
+        return {'id': '1', 'username': 'fake-bot', 'discriminator': '0', 'avatar': None, 'bot': True}
+
+    async def handle_me(self, request: web.Request) -> web.Response:
+        return json_response(self.bot_user())
+
+    async def handle_channel_message(self, request: web.Request) -> web.StreamResponse:
+        channel_id = request.match_info['channel_id']
+
+        async def create(request):
+            data = await self.read_payload(request)
+            return json_response(self.message_payload(channel_id, data, self.bot_user()))
+        return await self.limited(request, 'POST /channels/{channel_id}/messages', channel_id, create)
+
+    async def handle_list_webhooks(self, request: web.Request) -> web.StreamResponse:
+        channel_id = request.match_info['channel_id']
+
+        async def listing(request):
+            return json_response(self.webhooks.get(channel_id, []))
+        return await self.limited(request, 'GET /channels/{channel_id}/webhooks', channel_id, listing)
+
+    async def handle_create_webhook(self, request: web.Request) -> web.StreamResponse:
+        channel_id = request.match_info['channel_id']
+
+        async def create(request):
+            data = await self.read_payload(request)
+            webhook = {
+                'id': self.next_id(),
+                'token': hashlib.md5(self.next_id().encode()).hexdigest(),
+                'type': 1,
+                'channel_id': channel_id,
+                'guild_id': None,
+                'name': data.get('name'),
+                'avatar': None,
+                'application_id': None,
+                'user': self.bot_user()
+            }
+            self.webhooks.setdefault(channel_id, []).append(webhook)
+            return json_response(webhook)
+        return await self.limited(request, 'POST /channels/{channel_id}/webhooks', channel_id, create)
+
+    async def handle_execute_webhook(self, request: web.Request) -> web.StreamResponse:
+        webhook_id = request.match_info['webhook_id']
+
+        async def execute(request):
+            data = await self.read_payload(request)
+            if request.query.get('wait', 'false').lower() != 'true':
+                return web.Response(status=204)
+            author = {'id': webhook_id, 'username': data.get('username') or 'webhook', 'discriminator': '0000', 'avatar': None}
+            return json_response(self.message_payload('0', data, author))
+        return await self.limited(request, 'POST /webhooks/{webhook_id}/{token}', webhook_id, execute)
+
+    async def handle_other(self, request: web.Request) -> web.StreamResponse:
+        async def empty(request):
+            return json_response({})
+        return await self.limited(request, f"{request.method} other", '', empty)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return json_response(self.get_stats())
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/_stats', self.handle_stats)
+        app.router.add_get(API_PREFIX + '/users/@me', self.handle_me)
+        app.router.add_post(API_PREFIX + '/channels/{channel_id}/messages', self.handle_channel_message)
+        app.router.add_get(API_PREFIX + '/channels/{channel_id}/webhooks', self.handle_list_webhooks)
+        app.router.add_post(API_PREFIX + '/channels/{channel_id}/webhooks', self.handle_create_webhook)
+        app.router.add_post(API_PREFIX + '/webhooks/{webhook_id}/{token}', self.handle_execute_webhook)
+        app.router.add_route('*', API_PREFIX + '/{tail:.*}', self.handle_other)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        self.started = time.monotonic()
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def get_stats(self) -> dict:
+        return {
+            'uptime': round(time.monotonic() - self.started, 3),
+            'requests': dict(self.requests),
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+            'rate_limited': dict(self.rate_limited),
+            'buckets': len(self.buckets),
+            'max_in_flight': self.max_in_flight
+        }
+
+
+def parse_limit(text: str) -> Tuple[int, float]:
+    """Разбирает лимит вида 5/5 (запросов/секунд)"""
+    count, _, window = text.partition('/')
+    return int(count), float(window or 1)
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8300)
+    parser.add_argument('--latency', type=float, default=0.0, help='задержка ответа, сек')
+    parser.add_argument('--jitter', type=float, default=0.0, help='случайная добавка к задержке, сек')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='доля ответов 5xx')
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='доля оборванных соединений')
+    parser.add_argument('--route-limit', type=parse_limit, default=(5, 5.0), help='лимит сообщений в канал, запросов/сек')
+    parser.add_argument('--webhook-limit', type=parse_limit, default=(5, 2.0), help='лимит вебхука, запросов/сек')
+    parser.add_argument('--global-limit', type=int, default=50, help='глобальный лимит в секунду (0 - без лимита)')
+    parser.add_argument('--no-headers', action='store_true', help='не отдавать X-RateLimit-* в успешных ответах')
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def server_from_args(args) -> FakeDiscordServer:
+    return FakeDiscordServer(
+        host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+        fail_rate=args.fail_rate, reset_rate=args.reset_rate, route_limit=args.route_limit,
+        webhook_limit=args.webhook_limit, global_limit=args.global_limit,
+        send_headers=not args.no_headers, seed=args.seed
+    )
+
+
+async def serve(args):
+    server = server_from_args(args)
+    await server.start()
+    print(f"Заглушка REST API Discord: {server.url} (статистика: {server.url}/_stats)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+        print(json.dumps(server.get_stats(), ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
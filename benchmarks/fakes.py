@@ -0,0 +1,185 @@
+"""
+Легкие заменители объектов discord.py для бенчмарков
+
+Содержат только те атрибуты, которые читают DiscordLogger и его модули,
+поэтому бенчмарки работают без подключения к Discord.
+"""
+import os
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+
+
+class FakeAsset:
+    __slots__ = ('url',)
+
+    def __init__(self, url: str):
+        self.url = url
+
+
+class FakeMember:
+    """Участник сервера (подходит и как discord.User)"""
+
+    def __init__(self, user_id: int, guild: Optional['FakeGuild'] = None):
+        self.id = user_id
+        self.guild = guild
+        self.name = f"user{user_id}"
+        self.discriminator = "0"
+        self.display_name = self.name
+        self.display_avatar = FakeAsset(f"https://cdn.discordapp.com/embed/avatars/{user_id % 5}.png")
+        self.avatar = self.display_avatar
+        self.roles: List['FakeRole'] = []
+        self.pending = False
+        self.status = discord.Status.online
+        self.activity = None
+        self.created_at = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        self.joined_at = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeChannel:
+    """Текстовый или голосовой канал; отправленные сообщения только считаются"""
+
+    def __init__(self, channel_id: int, guild: Optional['FakeGuild'] = None, name: str = None):
+        self.id = channel_id
+        self.guild = guild
+        self.name = name or f"channel{channel_id}"
+        self.category = None
+        self.members: List[FakeMember] = []
+        self.sent_messages = 0
+        self.sent_embeds = 0
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    def permissions_for(self, member) -> discord.Permissions:
+        return discord.Permissions.all()
+
+    async def send(self, content=None, *, embed=None, embeds=None, **kwargs):
+        self.sent_messages += 1
+        self.sent_embeds += len(embeds) if embeds else (1 if embed else 0)
+
+
+class FakeRole:
+    def __init__(self, role_id: int, guild: 'FakeGuild', position: int = 1):
+        self.id = role_id
+        self.guild = guild
+        self.name = f"role{role_id}"
+        self.color = discord.Color(role_id & 0xFFFFFF)
+        self.position = position
+        self.permissions = discord.Permissions(0)
+        self.hoist = False
+        self.mentionable = False
+        self.managed = False
+        self.members: List[FakeMember] = []
+
+    @property
+    def mention(self) -> str:
+        return f"<@&{self.id}>"
+
+
+class FakeGuild:
+    """Сервер с кэшем участников, каналом логов и голосовыми каналами"""
+
+    def __init__(self, guild_id: int, member_ids=(), voice_channels: int = 2):
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+        self.chunked = True
+        self.shard_id = 0
+        self._members: Dict[int, FakeMember] = {user_id: FakeMember(user_id, self) for user_id in member_ids}
+        self.log_channel = FakeChannel(guild_id * 1000, self, name="logs")
+        self.text_channel = FakeChannel(guild_id * 1000 + 1, self, name="general")
+        self.voice_channels = [FakeChannel(guild_id * 1000 + 10 + i, self) for i in range(voice_channels)]
+        self.roles = [FakeRole(guild_id * 1000 + 100 + i, self, position=i) for i in range(5)]
+        self.me = FakeMember(0, self)
+        self.owner = None
+        self.owner_id = 0
+
+    @property
+    def members(self) -> List[FakeMember]:
+        return list(self._members.values())
+
+    @property
+    def member_count(self) -> int:
+        return len(self._members)
+
+    def get_member(self, user_id: int) -> Optional[FakeMember]:
+        return self._members.get(user_id)
+
+
+class FakeMessage:
+    def __init__(self, message_id: int, guild: FakeGuild, channel: FakeChannel, author: FakeMember, content: str):
+        self.id = message_id
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.attachments = []
+        self.created_at = datetime.now(timezone.utc)
+        self.edited_at = None
+        self.jump_url = f"https://discord.com/channels/{guild.id}/{channel.id}/{message_id}"
+
+
+class FakeVoiceState:
+    __slots__ = ('channel',)
+
+    def __init__(self, channel: Optional[FakeChannel]):
+        self.channel = channel
+
+
+class FakeResponse:
+    """Ответ HTTP для исключений discord.py"""
+
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = ''
+
+
+class FakeBot:
+    """Минимальная замена бота: поиск каналов и пользователей по кэшу серверов"""
+
+    def __init__(self, guilds: List[FakeGuild]):
+        self.guilds = guilds
+        self.channels = {guild.log_channel.id: guild.log_channel for guild in guilds}
+        self.guild_map = {guild.id: guild for guild in guilds}
+        self.latency = 0.05
+        self.shard_id = None
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.channels.get(channel_id)
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return self.guild_map.get(guild_id)
+
+    def get_user(self, user_id: int):
+        return None
+
+    async def fetch_channel(self, channel_id: int) -> FakeChannel:
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            raise discord.NotFound(FakeResponse(404), 'Unknown Channel')
+        return channel
+
+    def is_ready(self) -> bool:
+        return True
+
+
+def build_guilds(guild_count: int, members_per_guild: int, user_pool: int, seed: int) -> List[FakeGuild]:
+    """Создает серверы со случайными пересекающимися наборами участников"""
+    rng = random.Random(seed)
+    return [
+        FakeGuild(guild_id, rng.sample(range(user_pool), members_per_guild))
+        for guild_id in range(1, guild_count + 1)
+    ]
@@ -0,0 +1,102 @@
+"""
+Длительный тест отправки логов против локальной замены REST API Discord
+
+Запускает benchmarks/fake_discord.py в том же процессе, направляет на него
+HTTP-клиент discord.py и вебхуки и воспроизводит запись событий шлюза
+(replay.py) через обработчики bot.py, повторяя ее до истечения --duration.
+Раз в --report-interval секунд печатает прогресс, в конце - пропускную
+способность отправки, ответы 429 по областям лимитов и ошибки.
+
+Запуск:
+    python benchmarks/soak.py events.jsonl.gz --speed 0 --duration 600
+    python benchmarks/soak.py events.jsonl.gz --latency 0.1 --fail-rate 0.02 --route-limit 5/5
+"""
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import replay
+from fake_discord import FakeDiscordServer, add_server_arguments, server_from_args
+from modules.recorder import read_recording
+
+
+def limited_records(args):
+    records = read_recording(args.path)
+    if args.limit:
+        records = itertools.islice(records, args.limit)
+    return records
+
+
+async def progress(server: FakeDiscordServer, replayer: replay.Replayer, discord_logger, interval: float):
+    started = time.perf_counter()
+    while True:
+        await asyncio.sleep(interval)
+        delivery = discord_logger.delivery.get_stats()
+        print(f"[{time.perf_counter() - started:7.1f} с] событий: {sum(replayer.replayed.values())}, "
+              f"логов: {delivery['sent']}, в очередях: {discord_logger.delivery.depth()}, "
+              f"запросов: {sum(server.requests.values())}, 429: {server.statuses[429]}, "
+              f"сбоев: {sum(count for status, count in server.statuses.items() if status == 'reset' or status >= 500)}")
+
+
+async def soak(args):
+    server = server_from_args(args)
+    await server.start()
+    args.rest_url = server.url
+
+    client, discord_logger, _, config_dir = replay.prepare(args)
+    await client._async_setup_hook()
+    await client.http.static_login(replay.bot_module.config.token or 'soak')
+
+    replayer = replay.Replayer(client, speed=args.speed, max_gap=args.max_gap)
+    reporter = asyncio.create_task(progress(server, replayer, discord_logger, args.report_interval))
+    started = time.perf_counter()
+    try:
+        elapsed = await replayer.run(limited_records(args))
+        passes = 1
+        while time.perf_counter() - started < args.duration:
+            elapsed += await replayer.play(limited_records(args), skip_setup=True)
+            passes += 1
+
+        drain_started = time.perf_counter()
+        await replay.finish(client, discord_logger, config_dir, replayer)
+        drain = time.perf_counter() - drain_started
+    finally:
+        reporter.cancel()
+        await server.close()
+
+    wall = time.perf_counter() - started
+    replay.report(args, replayer, elapsed, discord_logger, None)
+    delivery = discord_logger.delivery.get_stats()
+    stats = server.get_stats()
+    rest = replay.bot_module.metrics.rest_responses.values
+
+    print(f"Проходов записи: {passes}, всего {wall:.1f} с, из них дозапись очередей {drain:.1f} с")
+    print(f"Отправка: {delivery['sent'] / wall:,.1f} логов/с, {sum(stats['requests'].values()) / wall:,.1f} запросов/с, "
+          f"одновременно до {stats['max_in_flight']}")
+    print(f"Ответы сервера: {', '.join(f'{status}: {count}' for status, count in sorted(stats['statuses'].items()))}")
+    print(f"Лимиты 429 по областям: {stats['rate_limited'] or 'нет'}")
+    print(f"Ответы глазами бота: {', '.join(f'{status[0]}: {count:.0f}' for status, count in sorted(rest.items())) or 'нет'}")
+    print("Запросы по маршрутам:")
+    for route, count in sorted(stats['requests'].items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {route:<48} {count}")
+
+
+def main():
+    parser = replay.build_parser(__doc__)
+    add_server_arguments(parser)
+    parser.add_argument('--duration', type=float, default=0, help='повторять запись, пока не пройдет N секунд')
+    parser.add_argument('--report-interval', type=float, default=10, help='интервал вывода прогресса, сек')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"❌ Файл записи не найден: {args.path}")
+        sys.exit(1)
+    asyncio.run(soak(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,8 @@ Discord бот
 """
 import asyncio
 import logging
+import os
+import time
 from datetime import datetime
 import discord
 from discord.ext import commands
@@ -10,7 +12,14 @@ from discord.ext import commands
 # Импортируем модули
 from modules.config import BotConfig
 from modules.logger import DiscordLogger
+from modules.metrics import LoggerMetrics, MetricsServer
+from modules.profiling import HandlerProfiler
+from modules.recorder import EventRecorder
 from modules.commands import BotCommands
+from modules.system import get_rss_bytes, format_bytes
+
+# Момент запуска процесса для замера времени до готовности
+PROCESS_STARTED_AT = time.monotonic()
 
 # Настройка логирования
 logging.basicConfig(
@@ -38,19 +47,119 @@ intents.dm_messages = True
 intents.guild_reactions = True
 intents.presences = True  # Для отслеживания статуса пользователей
 
+# Какие участники остаются в кэше (по умолчанию - все)
+MEMBER_CACHE_MODES = {
+    'all': discord.MemberCacheFlags.all,
+    'joined': lambda: discord.MemberCacheFlags(voice=False),
+    'voice': lambda: discord.MemberCacheFlags(joined=False),
+    'none': discord.MemberCacheFlags.none
+}
+member_cache_flags = MEMBER_CACHE_MODES.get(config.member_cache, discord.MemberCacheFlags.all)()
+
+# При запуске из лаунчера кластера процесс обслуживает только свой диапазон шардов
+BotBase = commands.AutoShardedBot if config.shard_count else commands.Bot
+
+class LoggerBot(BotBase):
+    """Бот, досылающий накопленные логи при остановке и собирающий метрики обработчиков"""
+    
+    async def setup_hook(self):
+        if recorder is not None:
+            recorder.attach(self._connection.parsers)
+        if metrics_server is not None:
+            try:
+                await metrics_server.start()
+            except OSError as e:
+                logger.error(f"Не удалось запустить сервер метрик на порту {metrics_server.port}: {e}")
+    
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        # Все обработчики событий проходят здесь: считаем события и время обработки
+        event = event_name[3:] if event_name.startswith('on_') else event_name
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                await profiler.run(event_name, super()._run_event, coro, event_name, *args, **kwargs)
+            else:
+                await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            metrics.events_received.inc(event)
+            metrics.handler_latency.observe(time.perf_counter() - started, event)
+    
+    async def close(self):
+        await discord_logger.close()
+        await config.flush_save()
+        if metrics_server is not None:
+            await metrics_server.close()
+        if recorder is not None:
+            await recorder.close()
+        await super().close()
+
+shard_options = {}
+if config.shard_count:
+    shard_options = {'shard_count': config.shard_count, 'shard_ids': config.shard_ids}
+
+# Метрики конвейера логов; каждый процесс кластера слушает свой порт
+metrics = LoggerMetrics()
+metrics_server = None
+if config.metrics_port:
+    metrics_port = config.metrics_port + int(config.cluster_id or 0)
+    metrics_server = MetricsServer(metrics, config.metrics_host, metrics_port)
+
+# Профилирование обработчиков включается только явно: замеры стоят времени
+profiler = HandlerProfiler(config.profiling_slow_ms / 1000) if config.profiling else None
+http_trace = metrics.trace_config()
+if profiler is not None:
+    profiler.attach(http_trace)
+
+# Запись событий шлюза для воспроизведения в replay.py; у каждого процесса кластера свой файл
+recorder = None
+if config.record_events:
+    record_path = config.record_events
+    if config.cluster_id is not None:
+        root, ext = os.path.splitext(record_path)
+        record_path = f"{root}.cluster{config.cluster_id}{ext}"
+    recorder = EventRecorder(record_path)
+
 # Создаем бота (убираем встроенную команду help)
-bot = commands.Bot(command_prefix=config.prefix, intents=intents, help_command=None)
+# В режиме lazy участники не загружаются при старте, а догружаются по требованию
+bot = LoggerBot(
+    command_prefix=config.prefix,
+    intents=intents,
+    help_command=None,
+    member_cache_flags=member_cache_flags,
+    chunk_guilds_at_startup=config.startup_mode != 'lazy',
+    http_trace=http_trace,
+    **shard_options
+)
 
 # Инициализируем модули
-discord_logger = DiscordLogger(bot, config)
+discord_logger = DiscordLogger(bot, config, metrics, profiler)
 bot_commands = BotCommands(bot, config, discord_logger)
 
 @bot.event
 async def on_ready():
     """Событие запуска бота"""
     logger.info(f'{bot.user} успешно запущен!')
+    if config.shard_count:
+        logger.info(f'Кластер {config.cluster_id}: шарды {bot.shard_ids} из {bot.shard_count}')
     logger.info(f'Бот подключен к {len(bot.guilds)} серверам')
     
+    # on_ready повторяется после переподключений, время запуска фиксируем один раз
+    if not hasattr(bot, 'ready_after'):
+        bot.ready_after = time.monotonic() - PROCESS_STARTED_AT
+        logger.info(
+            f'Время до готовности: {bot.ready_after:.1f} с, '
+            f'память: {format_bytes(get_rss_bytes())} (режим запуска: {config.startup_mode})'
+        )
+    
+    # Каналы могли измениться, пока бот был отключен
+    discord_logger.router.clear()
+    
+    # Досылаем логи, сохраненные на диск до перезапуска
+    discord_logger.delivery.resume_spilled(guild.id for guild in bot.guilds)
+    
+    # Строим индекс участников для рассылки событий статуса и профиля
+    discord_logger.membership.rebuild(bot.guilds)
+    logger.info(f'Индекс участников построен: {len(discord_logger.membership)} пользователей')
     
     # Показываем информацию о настроенных каналах логов
     for guild in bot.guilds:
@@ -96,31 +205,101 @@ async def on_bulk_message_delete(messages):
     if messages and not messages[0].author.bot and not messages[0].guild is None:
         await discord_logger.log_bulk_message_delete(messages)
 
+# Raw-события приходят и для сообщений, вытесненных из кэша discord.py.
+# Если сообщение было в кэше, его логирует обычный обработчик выше.
+@bot.event
+async def on_raw_message_edit(payload):
+    """Логирование редактирования сообщений вне кэша discord.py"""
+    new_content = payload.data.get('content')
+    if new_content is None or payload.guild_id is None:
+        return
+    
+    cached = discord_logger.message_cache.get(payload.message_id)
+    if cached is None:
+        return
+    
+    if payload.cached_message is None:
+        edited_at = discord.utils.parse_time(payload.data.get('edited_timestamp'))
+        await discord_logger.log_raw_message_edit(cached, new_content, edited_at)
+    discord_logger.message_cache.update_content(payload.message_id, new_content)
+
+@bot.event
+async def on_raw_message_delete(payload):
+    """Логирование удаления сообщений вне кэша discord.py"""
+    cached = discord_logger.message_cache.pop(payload.message_id)
+    if cached is not None and payload.cached_message is None:
+        await discord_logger.log_raw_message_delete(cached)
+
+@bot.event
+async def on_raw_bulk_message_delete(payload):
+    """Логирование массового удаления сообщений вне кэша discord.py"""
+    if payload.guild_id is None:
+        return
+    
+    known_ids = {message.id for message in payload.cached_messages}
+    cached = []
+    for message_id in payload.message_ids:
+        record = discord_logger.message_cache.pop(message_id)
+        if record is not None and message_id not in known_ids:
+            cached.append(record)
+    
+    # Если discord.py знал все сообщения, сработает on_bulk_message_delete
+    uncached_total = len(payload.message_ids) - len(known_ids)
+    if uncached_total > 0:
+        await discord_logger.log_raw_bulk_message_delete(
+            payload.guild_id, payload.channel_id, cached, uncached_total
+        )
+
 # === СОБЫТИЯ УЧАСТНИКОВ ===
 @bot.event
 async def on_member_join(member):
     """Логирование присоединения участника"""
+    discord_logger.membership.add_member(member.id, member.guild.id)
+    discord_logger.ensure_chunked(member.guild)
     await discord_logger.log_member_join(member)
 
 @bot.event
 async def on_member_remove(member):
     """Логирование выхода участника"""
+    discord_logger.membership.remove_member(member.id, member.guild.id)
+    discord_logger.ensure_chunked(member.guild)
     await discord_logger.log_member_remove(member)
 
 @bot.event
 async def on_member_update(before, after):
     """Логирование обновления участника"""
+    discord_logger.ensure_chunked(after.guild)
+    discord_logger.renderer.invalidate_user(after.id)
+    if bot.user is not None and after.id == bot.user.id:
+        # Роли бота изменились - права в канале логов нужно перепроверить
+        discord_logger.router.refresh_guild(after.guild.id)
     await discord_logger.log_member_update(before, after)
 
 @bot.event
 async def on_user_update(before, after):
     """Логирование обновления пользователя"""
+    discord_logger.renderer.invalidate_user(after.id)
     await discord_logger.log_user_update(before, after)
 
+# === СОБЫТИЯ СЕРВЕРОВ БОТА ===
+@bot.event
+async def on_guild_join(guild):
+    """Добавление нового сервера в индекс участников"""
+    discord_logger.membership.add_guild(guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    """Удаление сервера из индекса участников"""
+    discord_logger.membership.remove_guild(guild)
+    discord_logger.router.invalidate(guild.id)
+
 # === СОБЫТИЯ СТАТУСА ПОЛЬЗОВАТЕЛЕЙ ===
 @bot.event
 async def on_presence_update(before, after):
     """Логирование изменений статуса пользователя (онлайн/офлайн)"""
+    # Без загрузки участников при старте индекс пополняется по мере событий
+    discord_logger.membership.add_member(after.id, after.guild.id)
+    discord_logger.ensure_chunked(after.guild)
     await discord_logger.log_presence_update(before, after)
 
 @bot.event
@@ -137,27 +316,37 @@ async def on_guild_channel_create(channel):
 @bot.event
 async def on_guild_channel_delete(channel):
     """Логирование удаления канала"""
+    discord_logger.forget_channel(channel.id)
     await discord_logger.log_channel_delete(channel)
 
 @bot.event
 async def on_guild_channel_update(before, after):
     """Логирование обновления канала"""
+    if isinstance(after, discord.CategoryChannel):
+        # Название категории входит в описания всех ее каналов
+        discord_logger.renderer.invalidate_channels()
+    else:
+        discord_logger.renderer.invalidate_channel(after.id)
+    discord_logger.router.refresh_channel(after)
     await discord_logger.log_channel_update(before, after)
 
 # === СОБЫТИЯ РОЛЕЙ ===
 @bot.event
 async def on_guild_role_create(role):
     """Логирование создания роли"""
+    discord_logger.router.refresh_guild(role.guild.id)
     await discord_logger.log_role_create(role)
 
 @bot.event
 async def on_guild_role_delete(role):
     """Логирование удаления роли"""
+    discord_logger.router.refresh_guild(role.guild.id)
     await discord_logger.log_role_delete(role)
 
 @bot.event
 async def on_guild_role_update(before, after):
     """Логирование обновления роли"""
+    discord_logger.router.refresh_guild(after.guild.id)
     await discord_logger.log_role_update(before, after)
 
 # === СОБЫТИЯ РЕАКЦИЙ ===
@@ -183,6 +372,7 @@ async def on_reaction_clear(message, reactions):
 @bot.event
 async def on_voice_state_update(member, before, after):
     """Логирование изменений голосового состояния"""
+    discord_logger.ensure_chunked(member.guild)
     await discord_logger.log_voice_state_update(member, before, after)
 
 # === СОБЫТИЯ СЕРВЕРА ===
@@ -0,0 +1,134 @@
+"""
+Лаунчер кластера: запускает несколько процессов бота с разными диапазонами шардов
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import List
+
+from modules.config import BotConfig
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('cluster')
+
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.py')
+
+
+def fetch_recommended_shards(token: str) -> int:
+    """Запрашивает у Discord рекомендуемое количество шардов"""
+    request = urllib.request.Request(
+        'https://discord.com/api/v10/gateway/bot',
+        headers={'Authorization': f'Bot {token}', 'User-Agent': 'DiscordBot (cluster launcher)'}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)['shards']
+
+
+def split_shards(shard_count: int, processes: int) -> List[List[int]]:
+    """Делит шарды на непрерывные диапазоны по процессам"""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+class ClusterWorker:
+    """Процесс бота, обслуживающий свой диапазон шардов"""
+
+    def __init__(self, cluster_id: int, shard_ids: List[int], shard_count: int):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process = None
+        self.restarts = 0
+
+    def start(self):
+        env = dict(os.environ)
+        env.update({
+            'SHARD_COUNT': str(self.shard_count),
+            'SHARD_IDS': ','.join(str(i) for i in self.shard_ids),
+            'CLUSTER_ID': str(self.cluster_id)
+        })
+        self.process = subprocess.Popen([sys.executable, BOT_SCRIPT], env=env)
+        logger.info(f"Кластер {self.cluster_id} запущен (PID {self.process.pid}), шарды {self.shard_ids}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='количество процессов бота')
+    parser.add_argument('--shards', type=int, default=0, help='общее количество шардов (0 - рекомендованное Discord)')
+    parser.add_argument('--restart-delay', type=float, default=5.0, help='пауза перед перезапуском упавшего процесса')
+    args = parser.parse_args()
+
+    config = BotConfig()
+    if config.token == 'YOUR_BOT_TOKEN_HERE':
+        print("❌ Ошибка: Не установлен токен бота!")
+        return
+
+    shard_count = args.shards or fetch_recommended_shards(config.token)
+    workers = [
+        ClusterWorker(cluster_id, shard_ids, shard_count)
+        for cluster_id, shard_ids in enumerate(split_shards(shard_count, args.processes))
+    ]
+    logger.info(f"Запуск {len(workers)} процессов на {shard_count} шардов")
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for worker in workers:
+            worker.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    for worker in workers:
+        if stopping:
+            break
+        worker.start()
+        # Discord ограничивает частоту подключения шардов (IDENTIFY)
+        time.sleep(5 * len(worker.shard_ids))
+
+    while not stopping and any(worker.process is not None for worker in workers):
+        time.sleep(1)
+        for worker in workers:
+            if worker.process is None:
+                continue
+            code = worker.process.poll()
+            if code is None or stopping:
+                continue
+            if code == 0:
+                logger.info(f"Кластер {worker.cluster_id} завершил работу")
+                worker.process = None
+                continue
+            worker.restarts += 1
+            logger.warning(f"Кластер {worker.cluster_id} завершился с кодом {code}, перезапуск #{worker.restarts}")
+            time.sleep(args.restart_delay)
+            worker.start()
+
+    for worker in workers:
+        if worker.process is not None:
+            worker.process.wait()
+    logger.info("Кластер остановлен")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Модуль вспомогательных кэшей
+"""
+import time
+from collections import OrderedDict
+from typing import Hashable, List
+
+
+class FanoutDedupe:
+    """Отсеивает копии одного события, которые Discord присылает с каждого общего сервера.
+
+    Первое событие перехода рассылается, и для него запоминается, сколько
+    копий еще придет (по одной с каждого другого общего сервера). Каждая
+    копия уменьшает счетчик, а когда он исчерпан, тот же переход снова
+    считается новым: настоящий повтор (A→B→A→B) не теряется. Запись
+    живет не дольше ttl, чтобы копии, которые так и не пришли, не
+    поглотили будущий переход.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 100000):
+        self.ttl = ttl
+        self.maxsize = max(1, maxsize)
+        # Ключ -> [момент устаревания, ожидаемых копий]
+        self.entries: "OrderedDict[Hashable, List]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self, now: float):
+        """Удаляет устаревшие записи (время жизни одинаково, поэтому они в начале)"""
+        entries = self.entries
+        while entries:
+            key, (expires, _) = next(iter(entries.items()))
+            if expires > now:
+                break
+            entries.popitem(last=False)
+
+    def check_and_add(self, key: Hashable, copies: int) -> bool:
+        """Возвращает True, если событие - ожидаемая копия уже разосланного.
+
+        copies - сколько копий нового события придет с других серверов.
+        """
+        now = time.monotonic()
+        self._expire(now)
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self.entries[key]
+            return True
+
+        self.misses += 1
+        if copies > 0:
+            self.entries[key] = [now + self.ttl, copies]
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return False
+
+    def get_stats(self) -> dict:
+        """Возвращает статистику попаданий"""
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
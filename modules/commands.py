@@ -3,12 +3,15 @@
 """
 import os
 import asyncio
+import time
 import logging
-from datetime import datetime, timezone, timedelta
 from typing import Optional
 import discord
 from discord.ext import commands
 
+from modules.config import LogType, LOG_TYPE_NAMES
+from modules.system import get_rss_bytes, format_bytes
+
 logger = logging.getLogger(__name__)
 
 class BotCommands:
@@ -17,13 +20,9 @@ class BotCommands:
         self.config = config
         self.discord_logger = discord_logger
     
-    def format_time(self):
-        """Форматирует время для отображения в UTC+7 (Новосибирское)"""
-        dt = datetime.utcnow()
-        novosibirsk_tz = timezone(timedelta(hours=7))
-        dt = dt.replace(tzinfo=timezone.utc)
-        local_time = dt.astimezone(novosibirsk_tz)
-        return local_time.strftime('%d.%m.%Y %H:%M:%S MSK+4')
+    def format_time(self, guild_id: int = None):
+        """Форматирует текущее время в часовом поясе сервера"""
+        return self.discord_logger.format_time(guild_id=guild_id)
     
     def setup_commands(self):
         """Настраивает команды бота"""
@@ -33,6 +32,7 @@ class BotCommands:
         async def set_log_channel(ctx, channel: discord.TextChannel):
             """Устанавливает канал для логов на текущем сервере"""
             self.config.set_log_channel_id(ctx.guild.id, channel.id)
+            self.discord_logger.router.invalidate(ctx.guild.id)
             
             await ctx.send(f"✅ Канал для логов установлен: {channel.mention}\n"
                           f"Теперь все логи сервера **{ctx.guild.name}** будут отправляться в этот канал!")
@@ -52,18 +52,57 @@ class BotCommands:
             if channel_id:
                 channel = self.bot.get_channel(channel_id)
                 channel_info = f"✅ {channel.mention}" if channel else f"❌ Канал не найден (ID: {channel_id})"
+                reason = self.discord_logger.router.unavailable_reason(ctx.guild.id)
+                if reason:
+                    channel_info += f"\n⚠️ Отправка приостановлена: {reason}"
             else:
                 channel_info = "❌ Не установлен"
             
             embed.add_field(name="Канал логов", value=channel_info, inline=False)
             
             # Статус типов логов
-            embed.add_field(name="📝 Сообщения", value="✅ Включено" if self.config.log_messages else "❌ Выключено", inline=True)
-            embed.add_field(name="👥 Участники", value="✅ Включено" if self.config.log_members else "❌ Выключено", inline=True)
-            embed.add_field(name="📁 Каналы", value="✅ Включено" if self.config.log_channels else "❌ Выключено", inline=True)
-            embed.add_field(name="🎭 Роли", value="✅ Включено" if self.config.log_roles else "❌ Выключено", inline=True)
-            embed.add_field(name="🎤 Голос", value="✅ Включено" if self.config.log_voice else "❌ Выключено", inline=True)
-            embed.add_field(name="📱 Статус", value="✅ Включено" if self.config.log_presence else "❌ Выключено", inline=True)
+            enabled = lambda log_type: self.config.is_log_enabled(ctx.guild.id, log_type)
+            embed.add_field(name="📝 Сообщения", value="✅ Включено" if enabled(LogType.MESSAGES) else "❌ Выключено", inline=True)
+            embed.add_field(name="👥 Участники", value="✅ Включено" if enabled(LogType.MEMBERS) else "❌ Выключено", inline=True)
+            embed.add_field(name="📁 Каналы", value="✅ Включено" if enabled(LogType.CHANNELS) else "❌ Выключено", inline=True)
+            embed.add_field(name="🎭 Роли", value="✅ Включено" if enabled(LogType.ROLES) else "❌ Выключено", inline=True)
+            embed.add_field(name="🎤 Голос", value="✅ Включено" if enabled(LogType.VOICE) else "❌ Выключено", inline=True)
+            embed.add_field(name="📱 Статус", value="✅ Включено" if enabled(LogType.PRESENCE) else "❌ Выключено", inline=True)
+            
+            # Состояние очереди отправки
+            queue_stats = self.discord_logger.delivery.get_stats(ctx.guild.id)
+            embed.add_field(
+                name="📬 Очередь логов",
+                value=f"{queue_stats['depth']}/{queue_stats['maxsize']} ({queue_stats['overflow']})\n"
+                      f"Отправлено: {queue_stats['sent']} ({queue_stats['requests']} запросов), "
+                      f"потеряно: {queue_stats['dropped']}, на диске: {queue_stats['spilled']}, "
+                      f"ждут конца паузы: {queue_stats['deferred']}",
+                inline=False
+            )
+            
+            retry_stats = self.discord_logger.retry_policy.get_stats()
+            embed.add_field(
+                name="🔄 Повторы отправки",
+                value=f"Повторов: {retry_stats['retries']} "
+                      f"({', '.join(f'{reason}: {count}' for reason, count in retry_stats['by_reason'].items()) or 'нет'})\n"
+                      f"Доставлено после повтора: {retry_stats['recovered']}, брошено: {retry_stats['exhausted']}",
+                inline=False
+            )
+            
+            limiter_stats = self.discord_logger.rate_limiter.get_stats()
+            embed.add_field(
+                name="⏱️ Лимит частоты",
+                value=f"Отслеживается ключей: {limiter_stats['keys']}\n"
+                      f"Подавлено событий: {limiter_stats['suppressed_total']}",
+                inline=False
+            )
+            
+            dedupe_stats = self.discord_logger.presence_dedupe.get_stats()
+            embed.add_field(
+                name="🔁 Дедупликация статусов",
+                value=f"Дублей отброшено: {dedupe_stats['hits']}, уникальных: {dedupe_stats['misses']}",
+                inline=False
+            )
             
             # Статистика сервера
             embed.add_field(name="Участников", value=str(ctx.guild.member_count), inline=True)
@@ -82,26 +121,17 @@ class BotCommands:
                 return
             
             log_type = log_type.lower()
-            log_map = {
-                'messages': 'log_messages',
-                'members': 'log_members', 
-                'channels': 'log_channels',
-                'roles': 'log_roles',
-                'voice': 'log_voice',
-                'presence': 'log_presence'
-            }
-            
-            if log_type not in log_map:
+            
+            if log_type not in LOG_TYPE_NAMES:
                 await ctx.send("❌ Неверный тип логов!\n"
                               "Доступные типы: `messages`, `members`, `channels`, `roles`, `voice`, `presence`")
                 return
             
-            # Переключаем настройку
-            current_value = getattr(self.config, log_map[log_type])
-            setattr(self.config, log_map[log_type], not current_value)
-            self.config.save_config()
+            # Переключаем настройку только для текущего сервера
+            flag = LOG_TYPE_NAMES[log_type]
+            new_value = not self.config.is_log_enabled(ctx.guild.id, flag)
+            self.config.set_log_enabled(ctx.guild.id, flag, new_value)
             
-            new_value = getattr(self.config, log_map[log_type])
             status = "включено" if new_value else "выключено"
             emoji = "✅" if new_value else "❌"
             
@@ -111,12 +141,71 @@ class BotCommands:
                 description=f"**Статус:** {status.title()}\n**Изменил:** {ctx.author.mention}",
                 color=discord.Color.green() if new_value else discord.Color.red(),
                 fields=[
-                    ("Время изменения", self.format_time(), True)
+                    ("Время изменения", self.format_time(ctx.guild.id), True)
                 ]
             )
             
             await ctx.send(f"✅ Логирование **{log_type}** {status}!")
         
+        @self.bot.command(name='presencewindow')
+        @commands.has_permissions(administrator=True)
+        async def presence_window(ctx, seconds: float = None):
+            """Показывает или задает окно объединения изменений статуса (0 - выключить)"""
+            if seconds is None:
+                current = self.config.get_presence_window(ctx.guild.id)
+                await ctx.send(f"⏳ Окно объединения изменений статуса: **{current:g} с**")
+                return
+            
+            if seconds < 0 or seconds > 3600:
+                await ctx.send("❌ Окно должно быть от 0 до 3600 секунд!")
+                return
+            
+            self.config.set_presence_window(ctx.guild.id, seconds)
+            
+            if seconds == 0:
+                await ctx.send("✅ Объединение изменений статуса выключено, каждое изменение логируется сразу!")
+            else:
+                await ctx.send(f"✅ Изменения статуса за **{seconds:g} с** будут объединяться в один лог!")
+        
+        @self.bot.command(name='digest')
+        @commands.has_permissions(administrator=True)
+        async def message_digest(ctx, minutes: float = None):
+            """Показывает или задает период сводки сообщений (0 - лог каждого сообщения)"""
+            if minutes is None:
+                current = self.config.get_message_digest(ctx.guild.id)
+                if current > 0:
+                    await ctx.send(f"📊 Сообщения логируются сводкой раз в **{current:g} мин**")
+                else:
+                    await ctx.send("📊 Сводка сообщений выключена, каждое сообщение логируется отдельно")
+                return
+            
+            if minutes < 0 or minutes > 1440:
+                await ctx.send("❌ Период должен быть от 0 до 1440 минут!")
+                return
+            
+            self.config.set_message_digest(ctx.guild.id, minutes)
+            
+            if minutes == 0:
+                await ctx.send("✅ Сводка сообщений выключена, каждое сообщение логируется отдельно!")
+            else:
+                await ctx.send(f"✅ Новые сообщения будут логироваться сводкой раз в **{minutes:g} мин**!")
+        
+        @self.bot.command(name='timezone')
+        @commands.has_permissions(administrator=True)
+        async def set_timezone(ctx, hours: float = None):
+            """Показывает или задает часовой пояс времени в логах (смещение от UTC в часах)"""
+            if hours is None:
+                current = self.config.get_timezone_offset(ctx.guild.id)
+                await ctx.send(f"🕐 Часовой пояс логов: **UTC{current:+g}** ({self.format_time(ctx.guild.id)})")
+                return
+            
+            if hours < -12 or hours > 14:
+                await ctx.send("❌ Смещение должно быть от -12 до +14 часов!")
+                return
+            
+            self.config.set_timezone_offset(ctx.guild.id, hours)
+            await ctx.send(f"✅ Время в логах теперь в **UTC{hours:+g}**: {self.format_time(ctx.guild.id)}")
+        
         @self.bot.command(name='serverlist')
         @commands.has_permissions(administrator=True)
         async def server_list(ctx):
@@ -150,7 +239,7 @@ class BotCommands:
             await self.discord_logger.send_log(
                 guild_id=ctx.guild.id,
                 title="🧪 Тестовый лог",
-                description=f"**Тест выполнил:** {ctx.author.mention}\n**Время:** {self.format_time()}",
+                description=f"**Тест выполнил:** {ctx.author.mention}\n**Время:** {self.format_time(ctx.guild.id)}",
                 color=discord.Color.green(),
                 fields=[
                     ("Сервер", ctx.guild.name, True),
@@ -180,6 +269,59 @@ class BotCommands:
             
             embed.add_field(name="Префикс", value=self.config.prefix, inline=True)
             embed.add_field(name="Задержка", value=f"{round(self.bot.latency * 1000)}ms", inline=True)
+            embed.add_field(name="Память", value=format_bytes(get_rss_bytes()), inline=True)
+            if hasattr(self.bot, 'ready_after'):
+                embed.add_field(name="Запуск", value=f"{self.bot.ready_after:.1f} с ({self.config.startup_mode})", inline=True)
+            
+            # Информация о шардах этого процесса кластера
+            if self.config.shard_count:
+                guild_counts = {}
+                for guild in self.bot.guilds:
+                    guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+                
+                shards_info = "\n".join(
+                    f"Шард {shard_id}: {round(latency * 1000)}ms, серверов: {guild_counts.get(shard_id, 0)}"
+                    for shard_id, latency in self.bot.latencies
+                )
+                embed.add_field(
+                    name=f"Кластер {self.config.cluster_id or 0} (шард сервера: {ctx.guild.shard_id}, всего шардов: {self.bot.shard_count})",
+                    value=shards_info[:1024] or "Нет данных",
+                    inline=False
+                )
+            
+            await ctx.send(embed=embed)
+        
+        @self.bot.command(name='perf')
+        @commands.has_permissions(administrator=True)
+        async def perf(ctx, limit: int = 10):
+            """Показывает самые затратные обработчики событий с момента запуска"""
+            profiler = self.discord_logger.profiler
+            if profiler is None:
+                await ctx.send("❌ Профилирование выключено! Включите `profiling` в config.json или `PROFILING=true`")
+                return
+            
+            limit = max(1, min(limit, 20))
+            top = profiler.top(limit)
+            if not top:
+                await ctx.send("📭 Замеров пока нет!")
+                return
+            
+            uptime = time.monotonic() - profiler.started_at
+            embed = discord.Embed(
+                title="⏱️ Самые затратные обработчики",
+                description=f"Замеры за {uptime / 60:.0f} мин, порог медленного вызова: {profiler.slow_threshold * 1000:.0f} мс",
+                color=discord.Color.blue()
+            )
+            for name, stats in top:
+                embed.add_field(
+                    name=name,
+                    value=(
+                        f"Вызовов: {stats['calls']}, всего: {stats['total'] * 1000:.0f} мс "
+                        f"(REST {stats['rest'] * 1000:.0f} мс)\n"
+                        f"p50/p95/p99: {stats['p50'] * 1000:.1f} / {stats['p95'] * 1000:.1f} / {stats['p99'] * 1000:.1f} мс"
+                    ),
+                    inline=False
+                )
             
             await ctx.send(embed=embed)
         
@@ -211,7 +353,7 @@ class BotCommands:
                         color=discord.Color.blue(),
                         fields=[
                             ("Участников в канале", str(len(channel.members)), True),
-                            ("Время", self.format_time(), True)
+                            ("Время", self.format_time(ctx.guild.id), True)
                         ],
                         thumbnail=ctx.author.display_avatar.url
                     )
@@ -229,7 +371,7 @@ class BotCommands:
                     color=discord.Color.green(),
                     fields=[
                         ("Участников в канале", str(len(channel.members)), True),
-                        ("Время подключения", self.format_time(), True)
+                        ("Время подключения", self.format_time(ctx.guild.id), True)
                     ],
                     thumbnail=ctx.author.display_avatar.url
                 )
@@ -259,7 +401,7 @@ class BotCommands:
                 description=f"**Канал:** {channel.mention}\n**Команду выполнил:** {ctx.author.mention}",
                 color=discord.Color.red(),
                 fields=[
-                    ("Время отключения", self.format_time(), True)
+                    ("Время отключения", self.format_time(ctx.guild.id), True)
                 ],
                 thumbnail=ctx.author.display_avatar.url
             )
@@ -300,7 +442,7 @@ class BotCommands:
                         ("Из канала", old_channel.mention, True),
                         ("В канал", channel.mention, True),
                         ("Участников в новом канале", str(len(channel.members)), True),
-                        ("Время", self.format_time(), True)
+                        ("Время", self.format_time(ctx.guild.id), True)
                     ],
                     thumbnail=ctx.author.display_avatar.url
                 )
@@ -416,6 +558,10 @@ class BotCommands:
                 f"`{prefix}setlogchannel <канал>` - Установить канал для логов",
                 f"`{prefix}logstatus` - Показать статус логирования",
                 f"`{prefix}togglelogs <тип>` - Включить/выключить тип логов",
+                f"`{prefix}presencewindow [сек]` - Окно объединения изменений статуса",
+                f"`{prefix}digest [мин]` - Сводка сообщений вместо лога каждого",
+                f"`{prefix}timezone [часы]` - Часовой пояс времени в логах",
+                f"`{prefix}perf [N]` - Самые затратные обработчики (profiling)",
                 f"`{prefix}serverlist` - Список всех серверов бота",
                 f"`{prefix}testlog` - Отправить тестовый лог"
             ]
@@ -3,7 +3,43 @@
 """
 import os
 import json
-from typing import Optional, Dict
+import asyncio
+import copy
+import enum
+import tempfile
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Разделы конфигурации с настройками отдельных серверов.
+# Несколько процессов кластера меняют их независимо друг от друга.
+GUILD_SECTIONS = ('server_log_channels', 'server_presence_windows', 'server_log_types', 'server_timezones',
+                  'server_message_digests')
+
+
+class LogType(enum.IntFlag):
+    """Типы логов, которые можно включать и выключать для сервера"""
+    MESSAGES = 1
+    MEMBERS = 2
+    CHANNELS = 4
+    ROLES = 8
+    VOICE = 16
+    PRESENCE = 32
+
+
+# Название типа в командах и config.json -> флаг
+LOG_TYPE_NAMES = {
+    'messages': LogType.MESSAGES,
+    'members': LogType.MEMBERS,
+    'channels': LogType.CHANNELS,
+    'roles': LogType.ROLES,
+    'voice': LogType.VOICE,
+    'presence': LogType.PRESENCE
+}
 
 class BotConfig:
     def __init__(self, config_file: str = "config.json"):
@@ -16,8 +52,82 @@ class BotConfig:
         self.log_channels = os.getenv('LOG_CHANNELS', 'true').lower() == 'true'
         self.log_roles = os.getenv('LOG_ROLES', 'true').lower() == 'true'
         self.log_presence = os.getenv('LOG_PRESENCE', 'true').lower() == 'true'
+        # Очередь отправки логов (размер на сервер и поведение при переполнении)
+        self.log_queue_size = int(os.getenv('LOG_QUEUE_SIZE', '500'))
+        self.log_queue_overflow = os.getenv('LOG_QUEUE_OVERFLOW', 'drop_oldest')
+        self.log_spill_dir = os.getenv('LOG_SPILL_DIR', 'log_spill')
+        # Объединение логов в одно сообщение (до 10 embed)
+        self.log_batch_size = int(os.getenv('LOG_BATCH_SIZE', '10'))
+        self.log_batch_interval = float(os.getenv('LOG_BATCH_INTERVAL', '0.5'))
+        # Способ отправки логов: 'channel' (от имени бота) или 'webhook' (пул вебхуков)
+        self.log_delivery_backend = os.getenv('LOG_DELIVERY_BACKEND', 'channel')
+        self.log_webhooks_per_channel = int(os.getenv('LOG_WEBHOOKS_PER_CHANNEL', '2'))
+        # Повторная проверка ненайденного канала логов или канала без прав, сек
+        self.log_channel_retry = float(os.getenv('LOG_CHANNEL_RETRY', '300'))
+        # Приостановка отправки после серии сбоев: число сбоев подряд и начальная пауза, сек
+        self.log_breaker_threshold = int(os.getenv('LOG_BREAKER_THRESHOLD', '5'))
+        self.log_breaker_cooldown = float(os.getenv('LOG_BREAKER_COOLDOWN', '60'))
+        # Повтор отправки после 429, 5xx и обрыва соединения: число повторов, начальная и наибольшая пауза, сек
+        self.log_retry_attempts = int(os.getenv('LOG_RETRY_ATTEMPTS', '3'))
+        self.log_retry_base = float(os.getenv('LOG_RETRY_BASE', '1.0'))
+        self.log_retry_max_delay = float(os.getenv('LOG_RETRY_MAX_DELAY', '30'))
+        # Локальный журнал событий SQLite (пустая строка - выключен)
+        self.journal_path = os.getenv('JOURNAL_PATH', '')
+        self.journal_flush_interval = float(os.getenv('JOURNAL_FLUSH_INTERVAL', '1.0'))
+        self.journal_batch_size = int(os.getenv('JOURNAL_BATCH_SIZE', '500'))
+        # Срок хранения записей журнала, дней (0 - хранить всегда)
+        self.journal_retention_days = float(os.getenv('JOURNAL_RETENTION_DAYS', '30'))
+        # Кэш текста сообщений для логов удаления/редактирования старых сообщений
+        self.message_cache_size = int(os.getenv('MESSAGE_CACHE_SIZE', '50000'))
+        self.message_cache_chars = int(os.getenv('MESSAGE_CACHE_CHARS', '20000000'))
+        # Расшифровка массового удаления во вложении: 'txt', 'jsonl' или '' (без вложения)
+        self.bulk_delete_transcript = os.getenv('BULK_DELETE_TRANSCRIPT', 'txt')
+        # Режим запуска: 'full' - загрузка всех участников при старте,
+        # 'lazy' - участники сервера загружаются при первом событии участника
+        self.startup_mode = os.getenv('STARTUP_MODE', 'full')
+        # Кэш участников: 'all', 'joined', 'voice' или 'none'
+        self.member_cache = os.getenv('MEMBER_CACHE', 'all')
+        # Локальный HTTP-адрес /metrics в формате Prometheus (порт 0 - выключен)
+        self.metrics_host = os.getenv('METRICS_HOST', '127.0.0.1')
+        self.metrics_port = int(os.getenv('METRICS_PORT', '0'))
+        # Профилирование обработчиков (!perf) и порог медленного вызова в миллисекундах
+        self.profiling = os.getenv('PROFILING', 'false').lower() in ('1', 'true', 'yes')
+        self.profiling_slow_ms = float(os.getenv('PROFILING_SLOW_MS', '250'))
+        # Файл записи событий шлюза для replay.py (пустая строка - запись выключена)
+        self.record_events = os.getenv('RECORD_EVENTS', '')
+        # Лимиты частоты событий: [количество, период в секундах]
+        self.rate_limit_default: List[float] = [5, 60]
+        self.rate_limits: Dict[str, List[float]] = {}
+        # Время (сек), в течение которого повтор одного перехода статуса считается дублем
+        self.presence_dedupe_ttl = float(os.getenv('PRESENCE_DEDUPE_TTL', '5'))
+        # Окно (сек) объединения частых изменений статуса в один лог, 0 - выключено
+        self.presence_window = float(os.getenv('PRESENCE_WINDOW', '60'))
+        self.server_presence_windows: Dict[str, float] = {}
+        # Период (мин) сводки сообщений вместо лога каждого сообщения, 0 - выключено
+        self.message_digest_interval = float(os.getenv('MESSAGE_DIGEST_INTERVAL', '0'))
+        self.server_message_digests: Dict[str, float] = {}
+        # Часовой пояс времени в логах (смещение от UTC в часах), по умолчанию Новосибирск
+        self.timezone_offset = float(os.getenv('TIMEZONE_OFFSET', '7'))
+        self.server_timezones: Dict[str, float] = {}
         # Словарь для хранения каналов логов для каждого сервера
         self.server_log_channels: Dict[str, int] = {}
+        # Типы логов, переопределенные для отдельных серверов: {"ID сервера": {"messages": false}}
+        self.server_log_types: Dict[str, Dict[str, bool]] = {}
+        # Скомпилированные маски типов логов: ID сервера -> LogType
+        self.default_log_mask = LogType(0)
+        self.log_masks: Dict[int, int] = {}
+        # Измененные этим процессом настройки серверов: (раздел, ID сервера)
+        self.changed_guild_keys: Set[Tuple[str, str]] = set()
+        # Отложенное сохранение: серия изменений записывается одним разом
+        self.save_delay = float(os.getenv('CONFIG_SAVE_DELAY', '2.0'))
+        self.save_pending = False
+        self.save_task: Optional[asyncio.Task] = None
+        
+        # Шардинг (задается лаунчером кластера через переменные окружения)
+        self.shard_count = int(os.getenv('SHARD_COUNT', '0'))
+        shard_ids = os.getenv('SHARD_IDS', '')
+        self.shard_ids: Optional[List[int]] = [int(i) for i in shard_ids.split(',') if i.strip()] or None
+        self.cluster_id = os.getenv('CLUSTER_ID')
         
         # Загружаем конфигурацию из файла
         self.load_config()
@@ -36,9 +146,85 @@ class BotConfig:
                     self.log_channels = config.get('log_channels', self.log_channels)
                     self.log_roles = config.get('log_roles', self.log_roles)
                     self.log_presence = config.get('log_presence', self.log_presence)
+                    self.log_queue_size = config.get('log_queue_size', self.log_queue_size)
+                    self.log_queue_overflow = config.get('log_queue_overflow', self.log_queue_overflow)
+                    self.log_spill_dir = config.get('log_spill_dir', self.log_spill_dir)
+                    self.log_batch_size = config.get('log_batch_size', self.log_batch_size)
+                    self.log_batch_interval = config.get('log_batch_interval', self.log_batch_interval)
+                    self.log_delivery_backend = config.get('log_delivery_backend', self.log_delivery_backend)
+                    self.log_webhooks_per_channel = config.get('log_webhooks_per_channel', self.log_webhooks_per_channel)
+                    self.log_channel_retry = config.get('log_channel_retry', self.log_channel_retry)
+                    self.log_breaker_threshold = config.get('log_breaker_threshold', self.log_breaker_threshold)
+                    self.log_breaker_cooldown = config.get('log_breaker_cooldown', self.log_breaker_cooldown)
+                    self.log_retry_attempts = config.get('log_retry_attempts', self.log_retry_attempts)
+                    self.log_retry_base = config.get('log_retry_base', self.log_retry_base)
+                    self.log_retry_max_delay = config.get('log_retry_max_delay', self.log_retry_max_delay)
+                    self.journal_path = config.get('journal_path', self.journal_path)
+                    self.journal_flush_interval = config.get('journal_flush_interval', self.journal_flush_interval)
+                    self.journal_batch_size = config.get('journal_batch_size', self.journal_batch_size)
+                    self.journal_retention_days = config.get('journal_retention_days', self.journal_retention_days)
+                    self.message_cache_size = config.get('message_cache_size', self.message_cache_size)
+                    self.message_cache_chars = config.get('message_cache_chars', self.message_cache_chars)
+                    self.bulk_delete_transcript = config.get('bulk_delete_transcript', self.bulk_delete_transcript)
+                    self.startup_mode = config.get('startup_mode', self.startup_mode)
+                    self.member_cache = config.get('member_cache', self.member_cache)
+                    self.metrics_host = config.get('metrics_host', self.metrics_host)
+                    self.metrics_port = config.get('metrics_port', self.metrics_port)
+                    self.profiling = config.get('profiling', self.profiling)
+                    self.profiling_slow_ms = config.get('profiling_slow_ms', self.profiling_slow_ms)
+                    self.record_events = config.get('record_events', self.record_events)
+                    self.rate_limit_default = config.get('rate_limit_default', self.rate_limit_default)
+                    self.rate_limits = config.get('rate_limits', self.rate_limits)
+                    self.presence_dedupe_ttl = config.get('presence_dedupe_ttl', self.presence_dedupe_ttl)
+                    self.presence_window = config.get('presence_window', self.presence_window)
+                    self.server_presence_windows = config.get('server_presence_windows', {})
+                    self.message_digest_interval = config.get('message_digest_interval', self.message_digest_interval)
+                    self.server_message_digests = config.get('server_message_digests', {})
+                    self.timezone_offset = config.get('timezone_offset', self.timezone_offset)
+                    self.server_timezones = config.get('server_timezones', {})
                     self.server_log_channels = config.get('server_log_channels', {})
+                    self.server_log_types = config.get('server_log_types', {})
             except Exception as e:
                 print(f"Ошибка загрузки конфигурации: {e}")
+        
+        self.compile_log_masks()
+    
+    def compile_log_masks(self):
+        """Собирает маски типов логов для всех серверов.
+
+        Глобальные переключатели log_* задают маску по умолчанию, а настройки
+        сервера переопределяют отдельные биты. Обработчики событий проверяют
+        маску за O(1) до любого форматирования.
+        """
+        default_mask = LogType(0)
+        for name, log_type in LOG_TYPE_NAMES.items():
+            if getattr(self, f'log_{name}'):
+                default_mask |= log_type
+        self.default_log_mask = default_mask
+        
+        log_masks = {}
+        for guild_key, overrides in self.server_log_types.items():
+            mask = default_mask
+            for name, enabled in overrides.items():
+                log_type = LOG_TYPE_NAMES.get(name)
+                if log_type is None:
+                    continue
+                mask = mask | log_type if enabled else mask & ~log_type
+            log_masks[int(guild_key)] = int(mask)
+        self.log_masks = log_masks
+    
+    def is_log_enabled(self, guild_id: int, log_type: LogType) -> bool:
+        """Проверяет, включен ли тип логов на сервере"""
+        return bool(self.log_masks.get(guild_id, self.default_log_mask) & log_type)
+    
+    def set_log_enabled(self, guild_id: int, log_type: LogType, enabled: bool):
+        """Включает или выключает тип логов на конкретном сервере"""
+        guild_key = str(guild_id)
+        overrides = self.server_log_types.setdefault(guild_key, {})
+        overrides[log_type.name.lower()] = enabled
+        self.changed_guild_keys.add(('server_log_types', guild_key))
+        self.compile_log_masks()
+        self.request_save()
     
     def get_log_channel_id(self, guild_id: int) -> Optional[int]:
         """Получает ID канала логов для конкретного сервера"""
@@ -47,11 +233,162 @@ class BotConfig:
     def set_log_channel_id(self, guild_id: int, channel_id: int):
         """Устанавливает ID канала логов для конкретного сервера"""
         self.server_log_channels[str(guild_id)] = channel_id
-        self.save_config()
+        self.changed_guild_keys.add(('server_log_channels', str(guild_id)))
+        self.request_save()
     
+    def get_presence_window(self, guild_id: int) -> float:
+        """Получает окно объединения изменений статуса для сервера"""
+        return self.server_presence_windows.get(str(guild_id), self.presence_window)
+    
+    def set_presence_window(self, guild_id: int, seconds: float):
+        """Устанавливает окно объединения изменений статуса для сервера"""
+        self.server_presence_windows[str(guild_id)] = seconds
+        self.changed_guild_keys.add(('server_presence_windows', str(guild_id)))
+        self.request_save()
+    
+    def get_message_digest(self, guild_id: int) -> float:
+        """Получает период сводки сообщений сервера в минутах"""
+        return self.server_message_digests.get(str(guild_id), self.message_digest_interval)
+    
+    def set_message_digest(self, guild_id: int, minutes: float):
+        """Устанавливает период сводки сообщений сервера"""
+        self.server_message_digests[str(guild_id)] = minutes
+        self.changed_guild_keys.add(('server_message_digests', str(guild_id)))
+        self.request_save()
+    
+    def get_timezone_offset(self, guild_id: Optional[int] = None) -> float:
+        """Получает часовой пояс времени в логах сервера (смещение от UTC в часах)"""
+        if guild_id is None:
+            return self.timezone_offset
+        return self.server_timezones.get(str(guild_id), self.timezone_offset)
+    
+    def set_timezone_offset(self, guild_id: int, hours: float):
+        """Устанавливает часовой пояс времени в логах сервера"""
+        self.server_timezones[str(guild_id)] = hours
+        self.changed_guild_keys.add(('server_timezones', str(guild_id)))
+        self.request_save()
+    
+    def request_save(self):
+        """Планирует сохранение конфигурации.
+
+        Сохранение откладывается на save_delay секунд, поэтому серия изменений
+        (на одном или многих серверах) дает одну запись файла. Запись идет
+        в отдельном потоке и не блокирует цикл событий. Вне цикла событий
+        конфигурация сохраняется сразу.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save_config()
+            return
+        
+        self.save_pending = True
+        if self.save_task is None or self.save_task.done():
+            self.save_task = loop.create_task(self._debounced_save())
+    
+    async def _debounced_save(self):
+        """Сохраняет конфигурацию, пока остаются несохраненные изменения"""
+        while self.save_pending:
+            await asyncio.sleep(self.save_delay)
+            self.save_pending = False
+            await self.save_config_async()
+    
+    async def flush_save(self):
+        """Немедленно сохраняет отложенные изменения (при остановке бота)"""
+        if self.save_task is not None and not self.save_task.done():
+            self.save_task.cancel()
+            await asyncio.gather(self.save_task, return_exceptions=True)
+            self.save_pending = False
+            await self.save_config_async()
+    
+    async def save_config_async(self):
+        """Сохраняет конфигурацию в отдельном потоке"""
+        data = self._snapshot()
+        changed = set(self.changed_guild_keys)
+        loop = asyncio.get_running_loop()
+        try:
+            merged = await loop.run_in_executor(None, self._write_snapshot, data, changed)
+        except Exception as e:
+            print(f"Ошибка сохранения конфигурации: {e}")
+            return
+        self._apply_merged(merged)
     
     def save_config(self):
         """Сохраняет конфигурацию в файл"""
+        try:
+            merged = self._write_snapshot(self._snapshot(), set(self.changed_guild_keys))
+        except Exception as e:
+            print(f"Ошибка сохранения конфигурации: {e}")
+            return
+        self._apply_merged(merged)
+    
+    def _write_snapshot(self, data: dict, changed: Set[Tuple[str, str]]) -> dict:
+        """Атомарно записывает снимок конфигурации (безопасно вызывать из потока).
+
+        Настройки серверов, измененные другими процессами кластера, берутся
+        из файла, а измененные этим процессом остаются поверх них.
+        Возвращает итоговые разделы настроек серверов.
+        """
+        with self._file_lock():
+            return self._merge_and_write(data, changed)
+    
+    @contextmanager
+    def _file_lock(self):
+        """Блокирует файл конфигурации от одновременной записи процессами кластера"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.config_file + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _merge_and_write(self, data: dict, changed: Set[Tuple[str, str]]) -> dict:
+        on_disk = {}
+        if os.path.exists(self.config_file):
+            try:
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    on_disk = json.load(f)
+            except Exception as e:
+                print(f"Ошибка чтения конфигурации перед сохранением: {e}")
+        
+        merged = {}
+        for section in GUILD_SECTIONS:
+            values = dict(on_disk.get(section, {}))
+            for changed_section, guild_key in changed:
+                if changed_section == section and guild_key in data[section]:
+                    values[guild_key] = data[section][guild_key]
+            merged[section] = values
+            data[section] = values
+        
+        # Пишем во временный файл и подменяем им конфиг, чтобы файл никогда не был записан наполовину
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        fd, tmp_path = tempfile.mkstemp(prefix='.config-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return merged
+    
+    def _apply_merged(self, merged: dict):
+        """Подтягивает в память настройки серверов, измененные другими процессами"""
+        for section, values in merged.items():
+            current = getattr(self, section)
+            for guild_key, value in values.items():
+                if (section, guild_key) not in self.changed_guild_keys:
+                    current[guild_key] = value
+        self.compile_log_masks()
+    
+    def _snapshot(self) -> dict:
+        """Возвращает копию сохраняемых настроек"""
         config_data = {
             'token': self.token,
             'prefix': self.prefix,
@@ -61,11 +398,45 @@ class BotConfig:
             'log_channels': self.log_channels,
             'log_roles': self.log_roles,
             'log_presence': self.log_presence,
+            'log_queue_size': self.log_queue_size,
+            'log_queue_overflow': self.log_queue_overflow,
+            'log_spill_dir': self.log_spill_dir,
+            'log_batch_size': self.log_batch_size,
+            'log_batch_interval': self.log_batch_interval,
+            'log_delivery_backend': self.log_delivery_backend,
+            'log_webhooks_per_channel': self.log_webhooks_per_channel,
+            'log_channel_retry': self.log_channel_retry,
+            'log_breaker_threshold': self.log_breaker_threshold,
+            'log_breaker_cooldown': self.log_breaker_cooldown,
+            'log_retry_attempts': self.log_retry_attempts,
+            'log_retry_base': self.log_retry_base,
+            'log_retry_max_delay': self.log_retry_max_delay,
+            'journal_path': self.journal_path,
+            'journal_flush_interval': self.journal_flush_interval,
+            'journal_batch_size': self.journal_batch_size,
+            'journal_retention_days': self.journal_retention_days,
+            'message_cache_size': self.message_cache_size,
+            'message_cache_chars': self.message_cache_chars,
+            'bulk_delete_transcript': self.bulk_delete_transcript,
+            'startup_mode': self.startup_mode,
+            'member_cache': self.member_cache,
+            'metrics_host': self.metrics_host,
+            'metrics_port': self.metrics_port,
+            'profiling': self.profiling,
+            'profiling_slow_ms': self.profiling_slow_ms,
+            'record_events': self.record_events,
+            'rate_limit_default': self.rate_limit_default,
+            'rate_limits': self.rate_limits,
+            'presence_dedupe_ttl': self.presence_dedupe_ttl,
+            'presence_window': self.presence_window,
+            'server_presence_windows': self.server_presence_windows,
+            'message_digest_interval': self.message_digest_interval,
+            'server_message_digests': self.server_message_digests,
+            'timezone_offset': self.timezone_offset,
+            'server_timezones': self.server_timezones,
+            'server_log_types': self.server_log_types,
             'server_log_channels': self.server_log_channels
         }
-        
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=4)
-        except Exception as e:
-            print(f"Ошибка сохранения конфигурации: {e}")
+        for section in GUILD_SECTIONS:
+            config_data[section] = copy.deepcopy(config_data[section])
+        return config_data
@@ -0,0 +1,478 @@
+"""
+Модуль неблокирующей доставки логов в Discord
+"""
+import asyncio
+import base64
+import contextvars
+import io
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Поведение при переполнении очереди сервера
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'spill')
+
+# Лимиты Discord на одно сообщение
+MAX_MESSAGE_EMBEDS = 10
+MAX_MESSAGE_EMBED_CHARS = 6000
+# Лимиты Discord на один embed
+MAX_EMBED_TITLE = 256
+MAX_EMBED_DESCRIPTION = 4096
+MAX_EMBED_FIELDS = 25
+MAX_EMBED_FIELD_VALUE = 1024
+
+
+# Как часто воркер перепроверяет канал, отложив пачку до конца паузы, сек
+DEFER_CHECK_INTERVAL = 5.0
+
+
+class DeliverySkipped(Exception):
+    """Пачка намеренно не отправлена: канал логов сервера отключен"""
+
+
+class DeliveryDeferred(Exception):
+    """Отправка приостановлена на время: пачку нужно повторить через delay секунд"""
+
+    def __init__(self, delay: float):
+        super().__init__(delay)
+        self.delay = delay
+
+
+class LogEntry:
+    """Один лог, ожидающий отправки (с необязательным файлом: имя и содержимое)"""
+    __slots__ = ('guild_id', 'channel', 'embed', 'created_at', 'attachment')
+
+    def __init__(self, guild_id: int, channel, embed: discord.Embed, created_at: float = None,
+                 attachment: Optional[Tuple[str, bytes]] = None):
+        self.guild_id = guild_id
+        self.channel = channel
+        self.embed = embed
+        self.created_at = created_at if created_at is not None else time.time()
+        self.attachment = attachment
+
+
+def make_files(batch: List[LogEntry]) -> List[discord.File]:
+    """Создает файлы вложений пачки; discord.File одноразовый, поэтому на каждую попытку новые"""
+    return [
+        discord.File(io.BytesIO(entry.attachment[1]), filename=entry.attachment[0])
+        for entry in batch if entry.attachment is not None
+    ]
+
+
+class LogDeliveryQueue:
+    """Ограниченные очереди логов для каждого сервера с фоновыми воркерами.
+
+    Обработчики событий только кладут лог в очередь и сразу возвращаются,
+    а отправкой в Discord занимается отдельная задача на каждый сервер.
+    Логи, накопившиеся за batch_interval, уходят одним сообщением
+    (до 10 embed), что сокращает число запросов во время всплесков.
+
+    При политике spill лишние логи копятся в памяти и записываются на диск
+    пачками в отдельном потоке. Пока у сервера есть сохраненные логи, новые
+    тоже идут на диск, а воркер досылает их по порядку, поэтому порядок
+    логов не нарушается. Файлы, оставшиеся от прошлого запуска, досылаются
+    после resume_spilled.
+    """
+
+    def __init__(self, bot, send_func: Callable[[List[LogEntry]], Awaitable[None]],
+                 maxsize: int = 500, overflow: str = 'drop_oldest',
+                 spill_dir: str = 'log_spill', batch_size: int = MAX_MESSAGE_EMBEDS,
+                 batch_interval: float = 0.5):
+        if overflow not in OVERFLOW_POLICIES:
+            logger.warning(f"Неизвестная политика переполнения '{overflow}', используется drop_oldest")
+            overflow = 'drop_oldest'
+
+        self.bot = bot
+        self.send_func = send_func
+        self.maxsize = max(1, maxsize)
+        self.overflow = overflow
+        self.spill_dir = spill_dir
+        self.batch_size = min(max(1, batch_size), MAX_MESSAGE_EMBEDS)
+        self.batch_interval = max(0.0, batch_interval)
+
+        self.queues: Dict[int, asyncio.Queue] = {}
+        self.workers: Dict[int, asyncio.Task] = {}
+        # ID сервера -> логов на диске и в буфере записи
+        self.spilled: Dict[int, int] = {}
+        self.spill_buffer: Dict[int, List[dict]] = {}
+        self.spill_task: Optional[asyncio.Task] = None
+        self.spill_lock = asyncio.Lock()
+        # ID сервера -> прочитанные с диска, но еще не отправленные логи
+        self.draining: Dict[int, List[LogEntry]] = {}
+        # ID сервера -> пачка, ожидающая конца временной паузы канала
+        self.deferred: Dict[int, List[LogEntry]] = {}
+        self._scan_spill()
+
+        self.sent = 0
+        self.requests = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.closed = False
+
+    def enqueue(self, entry: LogEntry) -> bool:
+        """Кладет лог в очередь сервера, не дожидаясь отправки"""
+        if self.closed:
+            self._count_drop(entry.guild_id, "очередь логов закрыта")
+            return False
+
+        queue = self._get_queue(entry.guild_id)
+
+        # Пока на диске есть более старые логи сервера, новые встают за ними
+        if self.spilled.get(entry.guild_id):
+            self._spill(entry)
+            return True
+
+        if queue.full():
+            if self.overflow == 'drop_newest':
+                self._count_drop(entry.guild_id)
+                return False
+            if self.overflow == 'spill':
+                self._spill(entry)
+                return True
+
+            # drop_oldest: освобождаем место за счет самого старого лога
+            try:
+                queue.get_nowait()
+                queue.task_done()
+            except asyncio.QueueEmpty:
+                pass
+            self._count_drop(entry.guild_id)
+
+        queue.put_nowait(entry)
+        return True
+
+    def _get_queue(self, guild_id: int) -> asyncio.Queue:
+        """Возвращает очередь сервера, запуская воркер при первом обращении"""
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.maxsize)
+            self.queues[guild_id] = queue
+
+        worker = self.workers.get(guild_id)
+        if worker is None or worker.done():
+            # Воркер не наследует контекст обработчика, который его запустил (замеры профилировщика)
+            self.workers[guild_id] = contextvars.Context().run(
+                asyncio.get_running_loop().create_task, self._worker(guild_id, queue)
+            )
+        return queue
+
+    def _count_drop(self, guild_id: int, reason: str = "очередь переполнена", amount: int = 1):
+        """Учитывает потерянный лог"""
+        before = self.dropped
+        self.dropped += amount
+        if before == 0 or before // 100 != self.dropped // 100:
+            logger.warning(f"Лог сервера {guild_id} потерян ({reason}), всего потеряно: {self.dropped}")
+
+    async def _worker(self, guild_id: int, queue: asyncio.Queue):
+        """Отправляет логи сервера пачками в порядке поступления"""
+        carry = None
+        while True:
+            # Логи на диске новее очереди, но старше всего, что придет после них
+            if carry is None and queue.empty() and self.spilled.get(guild_id):
+                await self._drain_spill(guild_id)
+                continue
+
+            first = carry if carry is not None else await queue.get()
+            batch, carry = await self._collect_batch(first, queue)
+            try:
+                await self._deliver(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _collect_batch(self, first: LogEntry, queue: asyncio.Queue):
+        """Набирает пачку логов для одного сообщения.
+
+        Ждет новые логи не дольше batch_interval и останавливается на лимитах
+        Discord. Лог, не поместившийся в пачку, возвращается вторым значением.
+        Логи с файлом отправляются отдельным сообщением.
+        """
+        batch = [first]
+        if first.attachment is not None:
+            return batch, None
+        size = len(first.embed)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_interval
+
+        while len(batch) < self.batch_size:
+            try:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    entry = await asyncio.wait_for(queue.get(), timeout)
+                else:
+                    entry = queue.get_nowait()
+            except asyncio.TimeoutError:
+                break
+
+            entry_size = len(entry.embed)
+            if (entry.attachment is not None or entry.channel.id != first.channel.id
+                    or size + entry_size > MAX_MESSAGE_EMBED_CHARS):
+                return batch, entry
+            batch.append(entry)
+            size += entry_size
+
+        return batch, None
+
+    def _split_batches(self, entries: List[LogEntry]) -> List[List[LogEntry]]:
+        """Разбивает готовый список логов на пачки с учетом лимитов Discord"""
+        batches = []
+        batch, size = [], 0
+        for entry in entries:
+            entry_size = len(entry.embed)
+            if batch and (len(batch) >= self.batch_size
+                          or entry.attachment is not None or batch[0].attachment is not None
+                          or entry.channel.id != batch[0].channel.id
+                          or size + entry_size > MAX_MESSAGE_EMBED_CHARS):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(entry)
+            size += entry_size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _deliver(self, batch: List[LogEntry]):
+        """Отправляет пачку логов, не давая ошибке остановить воркер.
+
+        Пока канал временно приостановлен, воркер держит пачку и ждет: логи
+        за ней остаются в очереди и при переполнении подчиняются политике
+        очереди (spill сохранит их на диск).
+        """
+        guild_id = batch[0].guild_id
+        while True:
+            try:
+                await self.send_func(batch)
+                self.sent += len(batch)
+                self.requests += 1
+            except asyncio.CancelledError:
+                raise
+            except DeliveryDeferred as e:
+                self.deferred[guild_id] = batch
+                await asyncio.sleep(min(e.delay, DEFER_CHECK_INTERVAL))
+                continue
+            except DeliverySkipped:
+                self.skipped += len(batch)
+            except Exception as e:
+                logger.error(f"Ошибка при отправке логов на сервер {guild_id}: {e}")
+            self.deferred.pop(guild_id, None)
+            return
+
+    # === СБРОС НА ДИСК ===
+    def _spill_path(self, guild_id: int) -> str:
+        return os.path.join(self.spill_dir, f"{guild_id}.jsonl")
+
+    @staticmethod
+    def _spill_record(entry: LogEntry) -> dict:
+        return {
+            'channel_id': entry.channel.id,
+            'created_at': entry.created_at,
+            'embed': entry.embed.to_dict(),
+            'attachment': entry.attachment
+        }
+
+    def _spill(self, entry: LogEntry):
+        """Откладывает лог в буфер записи на диск, не блокируя цикл событий"""
+        self.spill_buffer.setdefault(entry.guild_id, []).append(self._spill_record(entry))
+        self.spilled[entry.guild_id] = self.spilled.get(entry.guild_id, 0) + 1
+        if self.spill_task is None or self.spill_task.done():
+            self.spill_task = asyncio.get_running_loop().create_task(self._flush_spill())
+
+    async def _flush_spill(self):
+        """Записывает буфер на диск пачками в отдельном потоке"""
+        loop = asyncio.get_running_loop()
+        async with self.spill_lock:
+            while self.spill_buffer:
+                buffer, self.spill_buffer = self.spill_buffer, {}
+                try:
+                    await loop.run_in_executor(None, self._write_spill, buffer)
+                except OSError as e:
+                    logger.error(f"Не удалось сохранить логи на диск: {e}")
+                    for guild_id, records in buffer.items():
+                        self.spilled[guild_id] = max(0, self.spilled.get(guild_id, 0) - len(records))
+                        self._count_drop(guild_id, "ошибка записи на диск", len(records))
+
+    def _write_spill(self, buffer: Dict[int, List[dict]], suffix: str = ''):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        for guild_id, records in buffer.items():
+            with open(self._spill_path(guild_id) + suffix, 'a', encoding='utf-8') as f:
+                for record in records:
+                    attachment = record['attachment']
+                    if attachment is not None:
+                        name, data = attachment
+                        record['attachment'] = [name, base64.b64encode(data).decode('ascii')]
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def _scan_spill(self):
+        """Находит логи, сохраненные на диск прошлым запуском"""
+        try:
+            names = os.listdir(self.spill_dir)
+        except OSError:
+            return
+        for name in names:
+            guild_part = name.split('.', 1)[0]
+            if not guild_part.isdigit() or not (name.endswith('.jsonl') or name.endswith('.jsonl.draining')):
+                continue
+            try:
+                with open(os.path.join(self.spill_dir, name), 'rb') as f:
+                    count = sum(1 for line in f if line.strip())
+            except OSError as e:
+                logger.error(f"Не удалось прочитать сохраненные логи {name}: {e}")
+                continue
+            if count:
+                guild_id = int(guild_part)
+                self.spilled[guild_id] = self.spilled.get(guild_id, 0) + count
+
+    def resume_spilled(self, guild_ids):
+        """Запускает досылку логов прошлого запуска для серверов этого процесса.
+
+        Вызывается, когда каналы уже в кэше. Файлы чужих серверов (других
+        процессов кластера) не трогаются.
+        """
+        guild_ids = set(guild_ids)
+        for guild_id in list(self.spilled):
+            if guild_id not in guild_ids:
+                if guild_id not in self.queues:
+                    del self.spilled[guild_id]
+                continue
+            if self.spilled[guild_id]:
+                self._get_queue(guild_id)
+
+    def _read_spill(self, guild_id: int) -> list:
+        """Забирает сохраненные на диск логи сервера (сначала недосланные после сбоя)"""
+        path = self._spill_path(guild_id)
+        draining = path + '.draining'
+        if not os.path.exists(draining):
+            try:
+                os.replace(path, draining)
+            except FileNotFoundError:
+                return []
+
+        with open(draining, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        os.remove(draining)
+        return records
+
+    async def _drain_spill(self, guild_id: int):
+        """Досылает логи, сброшенные на диск, пока они не закончатся"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._flush_spill()
+            async with self.spill_lock:
+                try:
+                    records = await loop.run_in_executor(None, self._read_spill, guild_id)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Не удалось прочитать сохраненные логи сервера {guild_id}: {e}")
+                    records = None
+
+            if records is None:
+                lost = self.spilled.pop(guild_id, 0) - len(self.spill_buffer.pop(guild_id, ()))
+                self._count_drop(guild_id, "ошибка чтения с диска", max(0, lost))
+                return
+            if not records and not self.spill_buffer.get(guild_id):
+                self.spilled.pop(guild_id, None)
+                return
+
+            entries = self.draining[guild_id] = []
+            for record in records:
+                channel = self.bot.get_channel(record['channel_id'])
+                if channel is None:
+                    continue
+                attachment = record.get('attachment')
+                entries.append(LogEntry(
+                    guild_id,
+                    channel,
+                    discord.Embed.from_dict(record['embed']),
+                    record.get('created_at'),
+                    (attachment[0], base64.b64decode(attachment[1])) if attachment else None
+                ))
+
+            # Счетчик уменьшается после отправки, чтобы новые логи до тех пор шли на диск
+            for batch in self._split_batches(entries):
+                await self._deliver(batch)
+                del entries[:len(batch)]
+            del self.draining[guild_id]
+            self.spilled[guild_id] = max(0, self.spilled.get(guild_id, 0) - len(records))
+
+    # === СОСТОЯНИЕ ===
+    def depth(self, guild_id: Optional[int] = None) -> int:
+        """Возвращает количество логов в очереди сервера или во всех очередях"""
+        if guild_id is not None:
+            queue = self.queues.get(guild_id)
+            return queue.qsize() if queue else 0
+        return sum(queue.qsize() for queue in self.queues.values())
+
+    def get_stats(self, guild_id: Optional[int] = None) -> dict:
+        """Возвращает статистику очередей"""
+        return {
+            'depth': self.depth(guild_id),
+            'maxsize': self.maxsize,
+            'overflow': self.overflow,
+            'spilled': self.spilled.get(guild_id, 0) if guild_id is not None else sum(self.spilled.values()),
+            'sent': self.sent,
+            'requests': self.requests,
+            'dropped': self.dropped,
+            'skipped': self.skipped,
+            'deferred': len(self.deferred.get(guild_id, ())) if guild_id is not None
+            else sum(len(batch) for batch in self.deferred.values())
+        }
+
+    async def close(self, timeout: float = 5.0):
+        """Дожидается отправки накопленных логов и останавливает воркеры"""
+        self.closed = True
+        try:
+            await asyncio.wait_for(self._wait_idle(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Не все логи отправлены при остановке, осталось: {self.depth()}, "
+                f"на диске: {sum(self.spilled.values())}"
+            )
+
+        for worker in self.workers.values():
+            worker.cancel()
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+        self.workers.clear()
+        # Недосланное остается на диске до следующего запуска
+        await self._flush_spill()
+        if self.overflow == 'spill':
+            await self._spill_queues()
+
+    async def _spill_queues(self):
+        """Сохраняет недосланные логи и очереди перед логами на диске"""
+        leftovers: Dict[int, List[dict]] = {}
+        for guild_id, entries in self.draining.items():
+            leftovers[guild_id] = [self._spill_record(entry) for entry in entries]
+        self.draining.clear()
+        # Отложенная пачка из очереди старше остальных логов очереди (из файла она уже в draining)
+        for guild_id, batch in self.deferred.items():
+            if guild_id not in leftovers:
+                leftovers[guild_id] = [self._spill_record(entry) for entry in batch]
+        self.deferred.clear()
+        for guild_id, queue in self.queues.items():
+            while not queue.empty():
+                leftovers.setdefault(guild_id, []).append(self._spill_record(queue.get_nowait()))
+                queue.task_done()
+        if not leftovers:
+            return
+        try:
+            # Файл .draining читается при следующем запуске первым
+            await asyncio.get_running_loop().run_in_executor(None, self._write_spill, leftovers, '.draining')
+        except OSError as e:
+            logger.error(f"Не удалось сохранить логи очередей на диск: {e}")
+            for guild_id, records in leftovers.items():
+                self._count_drop(guild_id, "ошибка записи на диск", len(records))
+
+    async def _wait_idle(self):
+        """Ждет, пока опустеют очереди и сохраненные логи серверов с воркерами"""
+        while True:
+            await asyncio.gather(*(queue.join() for queue in self.queues.values()))
+            if not any(self.spilled.get(guild_id) for guild_id in self.workers):
+                return
+            await asyncio.sleep(0.05)
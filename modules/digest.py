@@ -0,0 +1,97 @@
+"""
+Модуль сводок сообщений вместо отдельного лога на каждое сообщение
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class GuildDigest:
+    """Счетчики сообщений одного сервера за текущий период"""
+    __slots__ = ('guild_id', 'started_at', 'messages', 'attachments', 'channels', 'authors', 'users')
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.started_at = datetime.now(timezone.utc)
+        self.messages = 0
+        self.attachments = 0
+        # ID канала -> сообщений, ID автора -> сообщений
+        self.channels: Counter = Counter()
+        self.authors: Counter = Counter()
+        # ID автора -> последний объект пользователя (для описания в сводке)
+        self.users: Dict[int, object] = {}
+
+
+class MessageDigest:
+    """Копит сообщения сервера и раз в период отдает их сводкой.
+
+    Первое сообщение открывает период для сервера, по его окончании
+    вызывается flush_func с накопленными счетчиками. Число логов зависит
+    от времени, а не от активности в чате. Пустые периоды не отправляются.
+    """
+
+    def __init__(self, flush_func: Callable[[GuildDigest], Awaitable[None]],
+                 interval_func: Callable[[int], float]):
+        self.flush_func = flush_func
+        # Период сводки сервера в минутах (0 - сводка выключена)
+        self.interval_func = interval_func
+        self.pending: Dict[int, GuildDigest] = {}
+        self.timers: Dict[int, asyncio.Task] = {}
+        self.counted = 0
+
+    def add(self, message) -> bool:
+        """Учитывает сообщение. Возвращает False, если для сервера сводка выключена"""
+        guild_id = message.guild.id
+        interval = self.interval_func(guild_id)
+        if interval <= 0:
+            return False
+
+        digest = self.pending.get(guild_id)
+        if digest is None:
+            digest = self.pending[guild_id] = GuildDigest(guild_id)
+            self.timers[guild_id] = asyncio.get_running_loop().create_task(
+                self._flush_later(guild_id, interval * 60)
+            )
+
+        author_id = message.author.id
+        digest.messages += 1
+        digest.attachments += len(message.attachments)
+        digest.channels[message.channel.id] += 1
+        digest.authors[author_id] += 1
+        digest.users[author_id] = message.author
+        self.counted += 1
+        return True
+
+    async def _flush_later(self, guild_id: int, delay: float):
+        """Отправляет сводку по окончании периода"""
+        await asyncio.sleep(delay)
+        self.timers.pop(guild_id, None)
+        await self._flush(guild_id)
+
+    async def _flush(self, guild_id: int):
+        digest = self.pending.pop(guild_id, None)
+        if digest is None:
+            return
+        try:
+            await self.flush_func(digest)
+        except Exception as e:
+            logger.error(f"Ошибка при отправке сводки сообщений на сервер {guild_id}: {e}")
+
+    async def flush_all(self):
+        """Немедленно отправляет все накопленные сводки (при остановке бота)"""
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+        for guild_id in list(self.pending):
+            await self._flush(guild_id)
+
+    def get_stats(self) -> dict:
+        """Возвращает статистику сводок"""
+        return {
+            'pending': len(self.pending),
+            'counted': self.counted
+        }
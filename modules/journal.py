@@ -0,0 +1,164 @@
+"""
+Модуль локального журнала событий
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER,
+    title TEXT NOT NULL,
+    description TEXT,
+    fields TEXT
+);
+CREATE INDEX IF NOT EXISTS events_guild_ts ON events (guild_id, ts);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+"""
+
+# Как часто удалять записи старше срока хранения, сек
+PRUNE_INTERVAL = 3600
+# Предел буфера, если база долго недоступна
+MAX_BUFFERED = 100_000
+
+
+class EventJournal:
+    """Журнал всех логируемых событий в SQLite (WAL) с отложенной записью.
+
+    Обработчики только добавляют запись в буфер, а фоновая задача
+    сбрасывает накопленное одной транзакцией в отдельном потоке, так что
+    fsync выполняется один раз на пачку, а не на каждое событие.
+    Пачка, которую не удалось записать (например, database is locked),
+    остается в буфере до следующей попытки. Записи старше retention_days
+    удаляются раз в час.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 500,
+                 retention_days: float = 30):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.retention_days = retention_days
+        self.pruned_at = 0.0
+
+        self.buffer: List[tuple] = []
+        self.connection: Optional[sqlite3.Connection] = None
+        # sqlite3 требует работы с соединением из одного потока
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='journal')
+        self.flush_task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.dropped = 0
+        self.pruned = 0
+
+    def append(self, guild_id: int, channel_id: Optional[int], title: str,
+               description: str, fields: Optional[List[tuple]] = None):
+        """Добавляет событие в буфер журнала"""
+        compact_fields = json.dumps(
+            [[name, str(value)] for name, value, _ in fields],
+            ensure_ascii=False
+        ) if fields else None
+        self.buffer.append((time.time(), guild_id, channel_id, title, description, compact_fields))
+
+        if self.flush_task is None or self.flush_task.done():
+            self.wakeup = asyncio.Event()
+            self.flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+        if len(self.buffer) >= self.batch_size:
+            self.wakeup.set()
+
+    async def _flush_loop(self):
+        """Периодически сбрасывает буфер на диск"""
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Записывает накопленные события одной транзакцией"""
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.executor, self._write_batch, batch)
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            self.errors += 1
+            # Пачка возвращается в начало буфера и записывается при следующем сбросе
+            self.buffer[:0] = batch
+            overflow = len(self.buffer) - MAX_BUFFERED
+            if overflow > 0:
+                del self.buffer[:overflow]
+                self.dropped += overflow
+            logger.error(f"Ошибка записи в журнал событий ({len(batch)} событий, повтор при следующем сбросе): {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            # FULL в режиме WAL - один fsync на каждую транзакцию (пачку)
+            self.connection.execute('PRAGMA synchronous=FULL')
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    def _write_batch(self, batch: List[tuple]):
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                'INSERT INTO events (ts, guild_id, channel_id, title, description, fields) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                batch
+            )
+        
+        now = time.time()
+        if self.retention_days > 0 and now - self.pruned_at >= PRUNE_INTERVAL:
+            with connection:
+                cursor = connection.execute(
+                    'DELETE FROM events WHERE ts < ?', (now - self.retention_days * 86400,)
+                )
+            self.pruned += cursor.rowcount
+            self.pruned_at = now
+
+    def _close_connection(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def get_stats(self) -> dict:
+        """Возвращает статистику журнала"""
+        return {
+            'buffered': len(self.buffer),
+            'written': self.written,
+            'batches': self.batches,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'pruned': self.pruned
+        }
+
+    async def close(self):
+        """Записывает остаток буфера и закрывает базу"""
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            await asyncio.gather(self.flush_task, return_exceptions=True)
+        await self.flush()
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._close_connection)
+        self.executor.shutdown(wait=True)
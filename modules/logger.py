@@ -3,78 +3,222 @@
 """
 import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
+import os
+import time
+from datetime import datetime
 from typing import Optional, List, Dict, Set
 import discord
 
+from modules.cache import FanoutDedupe
+from modules.config import LogType
+from modules.digest import GuildDigest, MessageDigest
+from modules.delivery import (
+    DeliveryDeferred, DeliverySkipped, LogDeliveryQueue, LogEntry, make_files, MAX_EMBED_DESCRIPTION,
+    MAX_EMBED_FIELD_VALUE, MAX_EMBED_FIELDS, MAX_EMBED_TITLE, MAX_MESSAGE_EMBED_CHARS
+)
+from modules.journal import EventJournal
+from modules.membership import MembershipIndex
+from modules.message_cache import CachedMessage, MessageContentCache
+from modules.metrics import LoggerMetrics
+from modules.presence import PendingPresence, PresenceCoalescer
+from modules.profiling import HandlerProfiler
+from modules.ratelimit import EventRateLimiter
+from modules.renderer import EmbedRenderer
+from modules.retry import RetryPolicy
+from modules.routing import LogRouter
+from modules.transcript import TRANSCRIPT_FORMATS, TranscriptMessage, render_transcript, transcript_filename
+from modules.webhooks import WebhookPool
+
 logger = logging.getLogger(__name__)
 
+# Расшифровки от этого числа сообщений собираются в отдельном потоке
+TRANSCRIPT_EXECUTOR_THRESHOLD = 50
+# Сколько авторов перечислять в сводке массового удаления
+BULK_DELETE_TOP_AUTHORS = 10
+# Сколько каналов и авторов перечислять в сводке сообщений
+DIGEST_TOP = 10
+# Длина текста в сокращенном embed, когда полный лог уходит файлом
+OVERFLOW_DESCRIPTION_PREVIEW = 1000
+OVERFLOW_FIELD_PREVIEW = 150
+# Запас под поле времени и подпись в общем лимите символов embed
+EMBED_RESERVED_CHARS = 100
+
+
+def preview(text: str, limit: int) -> str:
+    """Обрезает текст до limit символов с многоточием"""
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
 class DiscordLogger:
-    def __init__(self, bot, config):
+    def __init__(self, bot, config, metrics: Optional[LoggerMetrics] = None,
+                 profiler: Optional[HandlerProfiler] = None):
         self.bot = bot
         self.config = config
-        self.rate_limits = {}
+        self.metrics = metrics or LoggerMetrics()
+        # Необязательное профилирование методов log_* (настройка profiling)
+        self.profiler = profiler
+        if profiler is not None:
+            self.wrap_log_methods(profiler)
+        # Необязательная отправка через пул вебхуков вместо channel.send
+        self.webhooks = None
+        if config.log_delivery_backend == 'webhook':
+            trace = self.metrics.trace_config()
+            if profiler is not None:
+                profiler.attach(trace)
+            self.webhooks = WebhookPool(
+                bot,
+                pool_size=config.log_webhooks_per_channel,
+                trace_config=trace
+            )
+        # Локальный журнал событий (пустой путь - журнал выключен); у каждого процесса кластера свой файл
+        self.journal = None
+        if config.journal_path:
+            journal_path = config.journal_path
+            if config.cluster_id is not None:
+                root, ext = os.path.splitext(journal_path)
+                journal_path = f"{root}.cluster{config.cluster_id}{ext}"
+            self.journal = EventJournal(
+                journal_path,
+                flush_interval=config.journal_flush_interval,
+                batch_size=config.journal_batch_size,
+                retention_days=config.journal_retention_days
+            )
+        self.rate_limiter = EventRateLimiter(
+            limits=config.rate_limits,
+            default=config.rate_limit_default
+        )
+        self.router = LogRouter(bot, config)
+        self.renderer = EmbedRenderer(config)
+        self.transcript_format = config.bulk_delete_transcript
+        if self.transcript_format and self.transcript_format not in TRANSCRIPT_FORMATS:
+            logger.warning(f"Неизвестный формат расшифровки '{self.transcript_format}', используется txt")
+            self.transcript_format = 'txt'
+        self.membership = MembershipIndex()
+        # Серверы, участники которых сейчас загружаются (режим lazy)
+        self.chunking: Dict[int, asyncio.Task] = {}
+        # Компактный кэш текста сообщений для логов удаления старых сообщений
+        self.message_cache = MessageContentCache(
+            max_messages=config.message_cache_size,
+            max_chars=config.message_cache_chars
+        )
+        # discord.py присылает событие статуса отдельно для каждого общего сервера,
+        # а лог рассылается во все общие серверы при первом же из них
+        self.presence_dedupe = FanoutDedupe(ttl=config.presence_dedupe_ttl)
+        self.presence_coalescer = PresenceCoalescer(
+            self.log_presence_changes,
+            config.get_presence_window
+        )
+        # Сводка сообщений сервера раз в N минут вместо лога каждого сообщения
+        self.message_digest = MessageDigest(
+            self.log_message_digest,
+            config.get_message_digest
+        )
+        self.retry_policy = RetryPolicy(
+            attempts=config.log_retry_attempts,
+            base=config.log_retry_base,
+            max_delay=config.log_retry_max_delay
+        )
+        self.delivery = LogDeliveryQueue(
+            bot,
+            self.deliver_log,
+            maxsize=config.log_queue_size,
+            overflow=config.log_queue_overflow,
+            spill_dir=config.log_spill_dir,
+            batch_size=config.log_batch_size,
+            batch_interval=config.log_batch_interval
+        )
+        self.register_gauges()
+    
+    def wrap_log_methods(self, profiler: HandlerProfiler):
+        """Оборачивает все методы log_* и отправку пачек (deliver_log) замером времени"""
+        for name in dir(type(self)):
+            method = getattr(self, name)
+            if (name.startswith('log_') or name == 'deliver_log') and asyncio.iscoroutinefunction(method):
+                setattr(self, name, profiler.wrap(name, method))
+    
+    def register_gauges(self):
+        """Регистрирует показатели, которые считываются при запросе /metrics"""
+        metrics = self.metrics
+        metrics.add_gauge(
+            'discord_logger_queue_depth', 'Логи в очередях отправки', (),
+            lambda: [((), self.delivery.depth())]
+        )
+        metrics.add_gauge(
+            'discord_logger_queue_dropped', 'Логи, отброшенные при переполнении очередей', (),
+            lambda: [((), self.delivery.dropped)]
+        )
+        metrics.add_gauge(
+            'discord_logger_rate_limiter_keys', 'Ключи в лимитере частоты событий', (),
+            lambda: [((), len(self.rate_limiter.buckets))]
+        )
+        metrics.add_gauge(
+            'discord_logger_gateway_latency_seconds', 'Задержка шлюза по шардам', ('shard',),
+            self.shard_latencies
+        )
+    
+    def shard_latencies(self) -> List[tuple]:
+        latencies = getattr(self.bot, 'latencies', None)
+        if latencies is None:
+            latencies = [(self.bot.shard_id or 0, self.bot.latency)]
+        return [((shard_id,), latency) for shard_id, latency in latencies]
     
     async def get_log_channel(self, guild_id: int) -> Optional[discord.TextChannel]:
         """Получает канал для логов конкретного сервера"""
-        channel_id = self.config.get_log_channel_id(guild_id)
-        if not channel_id:
-            return None
-            
-        try:
-            channel = self.bot.get_channel(channel_id)
-            if not channel:
-                logger.error(f"Не удалось найти канал с ID {channel_id} для сервера {guild_id}")
-            return channel
-        except Exception as e:
-            logger.error(f"Ошибка при получении канала логов для сервера {guild_id}: {e}")
-            return None
+        return self.router.route(guild_id)
+    
+    def should_log(self, guild_id: int, log_type: LogType) -> bool:
+        """Проверяет, нужно ли логировать событие этого типа на сервере.
+
+        Вызывается первым в каждом обработчике: маска типов и таблица
+        маршрутов проверяются за O(1) до любого форматирования.
+        """
+        return self.config.is_log_enabled(guild_id, log_type) and self.router.route(guild_id) is not None
     
     def is_rate_limited(self, event_type: str, user_id: int) -> bool:
         """Проверяет, не превышен ли лимит частоты для события"""
-        now = datetime.utcnow()
-        key = f"{event_type}_{user_id}"
-        
-        if key not in self.rate_limits:
-            self.rate_limits[key] = []
-        
-        # Удаляем старые записи (старше 1 минуты)
-        self.rate_limits[key] = [
-            timestamp for timestamp in self.rate_limits[key]
-            if now - timestamp < timedelta(minutes=1)
-        ]
-        
-        # Проверяем лимит (максимум 5 событий в минуту)
-        if len(self.rate_limits[key]) >= 5:
+        if self.rate_limiter.hit(event_type, user_id):
+            self.metrics.events_suppressed.inc(event_type, 'rate_limit')
             return True
-        
-        self.rate_limits[key].append(now)
         return False
     
     async def send_log(self, guild_id: int, title: str, description: str, 
                       color: discord.Color = discord.Color.blue(), 
                       fields: List[tuple] = None, thumbnail: str = None, 
-                      image: str = None, footer: str = None):
-        """Отправляет лог в канал конкретного сервера"""
-        log_channel = await self.get_log_channel(guild_id)
+                      image: str = None, footer: str = None, attachment: tuple = None):
+        """Ставит лог в очередь на отправку в канал конкретного сервера.
+
+        attachment - необязательный файл (имя, содержимое) к сообщению лога.
+        """
+        log_channel = self.router.route(guild_id)
         if not log_channel:
-            logger.warning(f"Канал логов не настроен для сервера {guild_id}, лог не отправлен")
             return
+        
+        # Событие сохраняется локально, даже если отправка в Discord не удастся
+        if self.journal is not None:
+            self.journal.append(guild_id, log_channel.id, title, description, fields)
+        
+        fields = [(name, str(value), inline) for name, value, inline in fields] if fields else []
+        
+        # Не помещающийся в embed лог уходит целиком файлом, а embed сокращается
+        overflow = attachment is None and self.exceeds_embed_limits(title, description, fields)
+        if overflow:
+            attachment = self.overflow_attachment(guild_id, title, description, fields)
+            description = preview(description, OVERFLOW_DESCRIPTION_PREVIEW)
+            fields = [
+                (name, preview(value, OVERFLOW_FIELD_PREVIEW), inline)
+                for name, value, inline in fields[:MAX_EMBED_FIELDS - 1]
+            ]
             
         embed = discord.Embed(
-            title=title,
-            description=description,
+            title=preview(title, MAX_EMBED_TITLE),
+            description=preview(description, MAX_EMBED_DESCRIPTION),
             color=color
         )
         
         # Добавляем время в embed
-        embed.add_field(name="🕐 Время", value=self.format_time(), inline=True)
+        embed.add_field(name="🕐 Время", value=self.renderer.format_time(guild_id=guild_id), inline=True)
         
-        if fields:
-            for name, value, inline in fields:
-                if len(str(value)) > 1024:  # Ограничение Discord
-                    value = str(value)[:1021] + "..."
-                embed.add_field(name=name, value=value, inline=inline)
+        for name, value, inline in fields[:MAX_EMBED_FIELDS - 1]:
+            embed.add_field(name=name, value=preview(value, MAX_EMBED_FIELD_VALUE), inline=inline)
         
         if thumbnail:
             embed.set_thumbnail(url=thumbnail)
@@ -84,135 +228,412 @@ class DiscordLogger:
             
         if footer:
             embed.set_footer(text=footer)
+        elif overflow:
+            embed.set_footer(text=f"Сервер: {guild_id} • полный текст во вложении")
         else:
             embed.set_footer(text=f"Сервер: {guild_id}")
-            
+        
+        # Отправка идет в фоне, чтобы медленный канал логов не тормозил обработчики
+        self.delivery.enqueue(LogEntry(guild_id, log_channel, embed, attachment=attachment))
+    
+    @staticmethod
+    def exceeds_embed_limits(title: str, description: str, fields: List[tuple]) -> bool:
+        """Проверяет, превышает ли лог лимиты Discord на один embed"""
+        if (len(title) > MAX_EMBED_TITLE or len(description) > MAX_EMBED_DESCRIPTION
+                or len(fields) >= MAX_EMBED_FIELDS):
+            return True
+        total = len(title) + len(description) + EMBED_RESERVED_CHARS
+        for name, value, _ in fields:
+            if len(value) > MAX_EMBED_FIELD_VALUE:
+                return True
+            total += len(name) + len(value)
+        return total > MAX_MESSAGE_EMBED_CHARS
+    
+    def overflow_attachment(self, guild_id: int, title: str, description: str, fields: List[tuple]) -> tuple:
+        """Собирает полный текст лога для вложения (имя файла, содержимое)"""
+        parts = [title, description]
+        parts.extend(f"{name}:\n{value}" for name, value, _ in fields)
+        name = f"log-{guild_id}-{datetime.utcnow():%Y%m%d-%H%M%S}.txt"
+        return name, "\n\n".join(parts).encode('utf-8')
+    
+    async def send_event(self, guild_id: int, event: str, fields: List[tuple] = None,
+                         thumbnail: str = None, color: discord.Color = None,
+                         attachment: tuple = None, **values):
+        """Отправляет лог события по его шаблону из модуля renderer"""
+        title, description, template_color = self.renderer.render(event, **values)
+        self.metrics.events_logged.inc(event)
+        await self.send_log(
+            guild_id=guild_id,
+            title=title,
+            description=description,
+            color=color or template_color,
+            fields=fields,
+            thumbnail=thumbnail,
+            attachment=attachment
+        )
+    
+    async def deliver_log(self, batch: List[LogEntry]):
+        """Отправляет пачку логов из очереди одним сообщением"""
+        guild_id = batch[0].guild_id
+        embeds = [entry.embed for entry in batch]
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            # Во время временной паузы пачка ждет ее окончания; в удаленный канал
+            # или канал без прав накопленные логи не отправляем
+            if not self.router.is_available(guild_id):
+                remaining = self.router.pause_remaining(guild_id)
+                if remaining is not None:
+                    raise DeliveryDeferred(remaining)
+                self.metrics.deliveries.inc('skipped', amount=len(embeds))
+                raise DeliverySkipped()
+            try:
+                if self.webhooks is not None:
+                    await self.webhooks.send(batch[0].channel, embeds, lambda: make_files(batch))
+                else:
+                    await batch[0].channel.send(embeds=embeds, files=make_files(batch))
+                break
+            except discord.Forbidden as e:
+                self.metrics.deliveries.inc('failure', amount=len(embeds))
+                self.router.record_failure(guild_id, f"Discord отклонил отправку: {e.text or e.status}", permanent=True)
+                raise
+            except discord.NotFound:
+                self.metrics.deliveries.inc('failure', amount=len(embeds))
+                self.router.record_failure(guild_id, "канал логов не найден (404)", permanent=True)
+                raise
+            except Exception as e:
+                reason = policy.classify(e, webhook=self.webhooks is not None)
+                if reason is None or attempt >= policy.attempts:
+                    if reason is not None:
+                        policy.exhausted += 1
+                    self.metrics.deliveries.inc('failure', amount=len(embeds))
+                    self.router.record_failure(guild_id, f"ошибки отправки: {e}")
+                    raise
+                # Воркер сервера ждет сам, поэтому повторы не копятся поверх закрытого лимита
+                policy.retries[reason] += 1
+                self.metrics.send_retries.inc(reason)
+                await asyncio.sleep(policy.delay(attempt))
+                attempt += 1
+        
+        if attempt:
+            policy.recovered += 1
+        self.metrics.deliveries.inc('success', amount=len(embeds))
+        self.router.record_success(guild_id)
+    
+    def ensure_chunked(self, guild):
+        """Запускает фоновую загрузку участников сервера в режиме lazy"""
+        if self.config.startup_mode != 'lazy' or guild.chunked or guild.id in self.chunking:
+            return
+        self.chunking[guild.id] = asyncio.get_running_loop().create_task(self._chunk_guild(guild))
+    
+    async def _chunk_guild(self, guild):
+        """Загружает участников сервера и добавляет их в индекс"""
+        started = time.monotonic()
         try:
-            await log_channel.send(embed=embed)
+            await guild.chunk(cache=True)
+            self.membership.add_guild(guild)
+            logger.info(f"Участники сервера {guild.name} загружены за {time.monotonic() - started:.1f} с ({guild.member_count})")
         except Exception as e:
-            logger.error(f"Ошибка при отправке лога на сервер {guild_id}: {e}")
+            logger.error(f"Ошибка загрузки участников сервера {guild.id}: {e}")
+        finally:
+            self.chunking.pop(guild.id, None)
+    
+    def forget_channel(self, channel_id: int):
+        """Сбрасывает закэшированные данные удаленного канала"""
+        self.router.invalidate_channel(channel_id)
+        self.renderer.invalidate_channel(channel_id)
+        if self.webhooks is not None:
+            self.webhooks.invalidate(channel_id)
+    
+    async def close(self):
+        """Досылает накопленные логи перед остановкой бота"""
+        await self.presence_coalescer.flush_all()
+        await self.message_digest.flush_all()
+        await self.delivery.close()
+        if self.webhooks is not None:
+            await self.webhooks.close()
+        if self.journal is not None:
+            await self.journal.close()
+    
+    def enabled_guilds_for(self, user_id: int, log_type: LogType) -> tuple:
+        """Возвращает серверы пользователя, на которых включен тип логов"""
+        should_log = self.should_log
+        return tuple(
+            guild_id for guild_id in self.membership.guilds_for(user_id)
+            if should_log(guild_id, log_type)
+        )
     
     def format_user_info(self, user: discord.User) -> str:
         """Форматирует информацию о пользователе"""
-        return f"{user.mention} (`{user.id}`)\n{user.name}#{user.discriminator}"
+        return self.renderer.user(user)
+    
+    def format_user_id(self, user_id: int, user=None) -> str:
+        """Форматирует информацию о пользователе, известном только по ID"""
+        if user is None:
+            user = self.bot.get_user(user_id)
+        if user is not None:
+            return self.format_user_info(user)
+        return f"<@{user_id}> (`{user_id}`)"
     
     def format_channel_info(self, channel: discord.TextChannel) -> str:
         """Форматирует информацию о канале"""
-        category = f" в {channel.category.name}" if channel.category else ""
-        return f"{channel.mention} (`{channel.id}`){category}"
+        return self.renderer.channel(channel)
     
     # === ЛОГИРОВАНИЕ СООБЩЕНИЙ ===
     async def log_message_create(self, message):
         """Логирует создание сообщения"""
-        if not self.config.log_messages:
+        if not self.should_log(message.guild.id, LogType.MESSAGES):
+            return
+        
+        # Запоминаем текст для логов удаления/редактирования после вытеснения из кэша discord.py
+        self.message_cache.add(message)
+        
+        # В режиме сводки сообщение только учитывается в счетчиках сервера
+        if self.message_digest.add(message):
+            self.metrics.events_suppressed.inc("message_create", 'digest')
             return
         
         # Проверяем лимит частоты
         if self.is_rate_limited("message_create", message.author.id):
             return
         
-        content = message.content[:1000] if message.content else "*Сообщение без текста*"
+        content = message.content if message.content else "*Сообщение без текста*"
         
-        await self.send_log(
+        await self.send_event(
             guild_id=message.guild.id,
-            title="📝 Новое сообщение",
-            description=f"**Автор:** {self.format_user_info(message.author)}\n**Канал:** {message.channel.mention}\n**Содержание:** {content}",
-            color=discord.Color.green(),
+            event="message_create",
+            author=self.format_user_info(message.author),
+            channel=message.channel.mention,
+            content=content,
             fields=[
                 ("ID сообщения", str(message.id), True),
-                ("Время создания", self.format_time(message.created_at), True),
+                ("Время создания", self.format_time(message.created_at, message.guild.id), True),
                 ("Вложения", f"{len(message.attachments)}" if message.attachments else "0", True)
             ],
             thumbnail=message.author.display_avatar.url
         )
     
+    async def log_message_digest(self, digest: GuildDigest):
+        """Логирует сводку сообщений сервера за период"""
+        guild_id = digest.guild_id
+        if not self.should_log(guild_id, LogType.MESSAGES):
+            return
+        
+        channels_text = "\n".join(
+            f"<#{channel_id}>: {count}" for channel_id, count in digest.channels.most_common(DIGEST_TOP)
+        )
+        authors_text = "\n".join(
+            f"{self.format_user_info(digest.users[author_id])}: {count}"
+            for author_id, count in digest.authors.most_common(DIGEST_TOP)
+        )
+        
+        await self.send_event(
+            guild_id=guild_id,
+            event="message_digest",
+            count=digest.messages,
+            period=f"{self.format_time(digest.started_at, guild_id)} — {self.format_time(guild_id=guild_id)}",
+            fields=[
+                ("Каналы", channels_text, False),
+                ("Активные авторы", authors_text, False),
+                ("Авторов", str(len(digest.authors)), True),
+                ("Вложений", str(digest.attachments), True)
+            ]
+        )
+    
     async def log_message_edit(self, before, after):
         """Логирует редактирование сообщения"""
-        if not self.config.log_messages or before.content == after.content:
+        if not self.should_log(after.guild.id, LogType.MESSAGES) or before.content == after.content:
             return
         
         # Проверяем лимит частоты
         if self.is_rate_limited("message_edit", after.author.id):
             return
         
-        old_content = before.content[:500] if before.content else "*Пустое сообщение*"
-        new_content = after.content[:500] if after.content else "*Пустое сообщение*"
+        old_content = before.content if before.content else "*Пустое сообщение*"
+        new_content = after.content if after.content else "*Пустое сообщение*"
         
-        await self.send_log(
+        await self.send_event(
             guild_id=after.guild.id,
-            title="✏️ Сообщение отредактировано",
-            description=f"**Автор:** {self.format_user_info(after.author)}\n**Канал:** {after.channel.mention}",
-            color=discord.Color.orange(),
+            event="message_edit",
+            author=self.format_user_info(after.author),
+            channel=after.channel.mention,
             fields=[
                 ("Старое содержимое", old_content, False),
                 ("Новое содержимое", new_content, False),
                 ("ID сообщения", str(after.id), True),
-                ("Время редактирования", self.format_time(after.edited_at) if after.edited_at else "Неизвестно", True)
+                ("Время редактирования", self.format_time(after.edited_at, after.guild.id) if after.edited_at else "Неизвестно", True)
             ],
             thumbnail=after.author.display_avatar.url
         )
     
     async def log_message_delete(self, message):
         """Логирует удаление сообщения"""
-        if not self.config.log_messages:
+        if not self.should_log(message.guild.id, LogType.MESSAGES):
             return
         
         # Проверяем лимит частоты
         if self.is_rate_limited("message_delete", message.author.id):
             return
         
-        content = message.content[:1000] if message.content else "*Сообщение без текста*"
+        content = message.content if message.content else "*Сообщение без текста*"
         
-        await self.send_log(
+        await self.send_event(
             guild_id=message.guild.id,
-            title="🗑️ Сообщение удалено",
-            description=f"**Автор:** {self.format_user_info(message.author)}\n**Канал:** {message.channel.mention}\n**Содержание:** {content}",
-            color=discord.Color.red(),
+            event="message_delete",
+            author=self.format_user_info(message.author),
+            channel=message.channel.mention,
+            content=content,
             fields=[
                 ("ID сообщения", str(message.id), True),
-                ("Время создания", self.format_time(message.created_at), True),
-                ("Время удаления", self.format_time(), True)
+                ("Время создания", self.format_time(message.created_at, message.guild.id), True),
+                ("Время удаления", self.format_time(guild_id=message.guild.id), True)
             ],
             thumbnail=message.author.display_avatar.url
         )
     
+    def format_bulk_authors(self, counts: Dict[int, int], users: Dict[int, object]) -> str:
+        """Форматирует самых активных авторов удаленных сообщений"""
+        top = sorted(counts.items(), key=lambda item: -item[1])
+        lines = [
+            f"{self.format_user_id(author_id, users.get(author_id))}: {count}"
+            for author_id, count in top[:BULK_DELETE_TOP_AUTHORS]
+        ]
+        if len(top) > BULK_DELETE_TOP_AUTHORS:
+            lines.append(f"...и еще {len(top) - BULK_DELETE_TOP_AUTHORS}")
+        return "\n".join(lines) or "Неизвестно"
+    
+    async def build_transcript(self, channel_id: int, messages: List[TranscriptMessage]) -> Optional[tuple]:
+        """Собирает файл расшифровки удаленных сообщений (имя, содержимое)"""
+        if not self.transcript_format or not messages:
+            return None
+        
+        fmt = self.transcript_format
+        if len(messages) >= TRANSCRIPT_EXECUTOR_THRESHOLD:
+            # Крупная чистка не должна задерживать обработку остальных событий
+            data = await asyncio.get_running_loop().run_in_executor(None, render_transcript, messages, fmt)
+        else:
+            data = render_transcript(messages, fmt)
+        return transcript_filename(channel_id, fmt), data
+    
     async def log_bulk_message_delete(self, messages):
-        """Логирует массовое удаление сообщений"""
-        if not self.config.log_messages:
+        """Логирует массовое удаление сообщений одной сводкой с расшифровкой во вложении"""
+        guild_id = messages[0].guild.id
+        if not self.should_log(guild_id, LogType.MESSAGES):
             return
         
         # Группируем по авторам
-        authors = {}
+        counts = {}
+        users = {}
         for message in messages:
             author_id = message.author.id
-            if author_id not in authors:
-                authors[author_id] = {
-                    'user': message.author,
-                    'count': 0
-                }
-            authors[author_id]['count'] += 1
-        
-        # Отправляем лог для каждого автора
-        for author_data in authors.values():
-            user = author_data['user']
-            count = author_data['count']
-            
-            await self.send_log(
-                guild_id=messages[0].guild.id,
-                title="🗑️ Массовое удаление сообщений",
-                description=f"**Автор:** {self.format_user_info(user)}\n**Канал:** {messages[0].channel.mention}\n**Количество удаленных сообщений:** {count}",
-                color=discord.Color.dark_red(),
-                fields=[
-                    ("Время удаления", self.format_time(), True),
-                    ("Всего удалено", str(len(messages)), True)
-                ],
-                thumbnail=user.display_avatar.url
-            )
+            counts[author_id] = counts.get(author_id, 0) + 1
+            users[author_id] = message.author
+        
+        channel = messages[0].channel
+        transcript = [TranscriptMessage.from_message(message) for message in messages]
+        
+        await self.send_event(
+            guild_id=guild_id,
+            event="bulk_delete",
+            channel=channel.mention,
+            count=len(messages),
+            fields=[
+                ("Авторы", self.format_bulk_authors(counts, users), False),
+                ("Время удаления", self.format_time(guild_id=guild_id), True)
+            ],
+            attachment=await self.build_transcript(channel.id, transcript)
+        )
+    
+    async def log_raw_message_edit(self, cached: CachedMessage, new_content: str, edited_at=None):
+        """Логирует редактирование сообщения, которого нет в кэше discord.py"""
+        if not self.should_log(cached.guild_id, LogType.MESSAGES) or cached.content == new_content:
+            return
+        
+        # Проверяем лимит частоты
+        if self.is_rate_limited("message_edit", cached.author_id):
+            return
+        
+        author = self.bot.get_user(cached.author_id)
+        old_content = cached.content if cached.content else "*Пустое сообщение*"
+        new_content = new_content if new_content else "*Пустое сообщение*"
+        
+        await self.send_event(
+            guild_id=cached.guild_id,
+            event="message_edit",
+            author=self.format_user_id(cached.author_id, author),
+            channel=f"<#{cached.channel_id}>",
+            fields=[
+                ("Старое содержимое", old_content, False),
+                ("Новое содержимое", new_content, False),
+                ("ID сообщения", str(cached.message_id), True),
+                ("Время редактирования", self.format_time(edited_at, cached.guild_id), True)
+            ],
+            thumbnail=author.display_avatar.url if author else None
+        )
+    
+    async def log_raw_message_delete(self, cached: CachedMessage):
+        """Логирует удаление сообщения, которого нет в кэше discord.py"""
+        if not self.should_log(cached.guild_id, LogType.MESSAGES):
+            return
+        
+        # Проверяем лимит частоты
+        if self.is_rate_limited("message_delete", cached.author_id):
+            return
+        
+        author = self.bot.get_user(cached.author_id)
+        content = cached.content if cached.content else "*Сообщение без текста*"
+        
+        fields = [
+            ("ID сообщения", str(cached.message_id), True),
+            ("Время создания", self.format_time(cached.created_at, cached.guild_id), True),
+            ("Время удаления", self.format_time(guild_id=cached.guild_id), True)
+        ]
+        if cached.attachment_ids:
+            fields.append(("ID вложений", ", ".join(str(i) for i in cached.attachment_ids), False))
+        
+        await self.send_event(
+            guild_id=cached.guild_id,
+            event="message_delete",
+            author=self.format_user_id(cached.author_id, author),
+            channel=f"<#{cached.channel_id}>",
+            content=content,
+            fields=fields,
+            thumbnail=author.display_avatar.url if author else None
+        )
+    
+    async def log_raw_bulk_message_delete(self, guild_id: int, channel_id: int,
+                                          cached: List[CachedMessage], total: int):
+        """Логирует массовое удаление сообщений, которых нет в кэше discord.py"""
+        if not self.should_log(guild_id, LogType.MESSAGES):
+            return
+        
+        # Группируем по авторам
+        counts = {}
+        users = {}
+        for message in cached:
+            counts[message.author_id] = counts.get(message.author_id, 0) + 1
+            if message.author_id not in users:
+                users[message.author_id] = self.bot.get_user(message.author_id)
+        
+        transcript = [TranscriptMessage.from_cached(message, users[message.author_id]) for message in cached]
+        
+        await self.send_event(
+            guild_id=guild_id,
+            event="bulk_delete",
+            channel=f"<#{channel_id}>",
+            count=total,
+            fields=[
+                ("Авторы", self.format_bulk_authors(counts, users), False),
+                ("Известно из кэша", f"{len(cached)} из {total}", True),
+                ("Время удаления", self.format_time(guild_id=guild_id), True)
+            ],
+            attachment=await self.build_transcript(channel_id, transcript)
+        )
     
     # === ЛОГИРОВАНИЕ УЧАСТНИКОВ ===
     async def log_member_join(self, member):
         """Логирует присоединение участника"""
-        if not self.config.log_members:
+        if not self.should_log(member.guild.id, LogType.MEMBERS):
             return
         
         account_age = datetime.utcnow() - member.created_at
@@ -227,31 +648,29 @@ class DiscordLogger:
         if member.pending:
             fields.append(("Статус", "Ожидает проверки правил", True))
         
-        await self.send_log(
+        await self.send_event(
             guild_id=member.guild.id,
-            title="👋 Участник присоединился",
-            description=f"**Пользователь:** {self.format_user_info(member)}",
-            color=discord.Color.green(),
+            event="member_join",
+            user=self.format_user_info(member),
             fields=fields,
             thumbnail=member.display_avatar.url
         )
     
     async def log_member_remove(self, member):
         """Логирует выход участника"""
-        if not self.config.log_members:
+        if not self.should_log(member.guild.id, LogType.MEMBERS):
             return
         
         # Получаем роли участника
         roles = [role.mention for role in member.roles[1:]]  # Исключаем @everyone
         roles_text = ", ".join(roles) if roles else "Без ролей"
         
-        await self.send_log(
+        await self.send_event(
             guild_id=member.guild.id,
-            title="👋 Участник покинул сервер",
-            description=f"**Пользователь:** {self.format_user_info(member)}",
-            color=discord.Color.red(),
+            event="member_remove",
+            user=self.format_user_info(member),
             fields=[
-                ("Роли", roles_text[:1000], False),
+                ("Роли", roles_text, False),
                 ("Участников на сервере", str(member.guild.member_count), True),
                 ("Время на сервере", f"{(datetime.utcnow() - member.joined_at).days} дней" if member.joined_at else "Неизвестно", True)
             ],
@@ -260,7 +679,7 @@ class DiscordLogger:
     
     async def log_member_update(self, before, after):
         """Логирует обновление участника"""
-        if not self.config.log_members:
+        if not self.should_log(after.guild.id, LogType.MEMBERS):
             return
         
         changes = []
@@ -295,18 +714,19 @@ class DiscordLogger:
             fields = [("ID пользователя", str(after.id), True)]
             fields.extend(changes)
             
-            await self.send_log(
+            await self.send_event(
                 guild_id=after.guild.id,
-                title="👤 Профиль участника обновлен",
-                description=f"**Пользователь:** {self.format_user_info(after)}",
-                color=discord.Color.blue(),
+                event="member_update",
+                user=self.format_user_info(after),
                 fields=fields,
                 thumbnail=after.display_avatar.url
             )
     
     async def log_user_update(self, before, after):
         """Логирует обновление пользователя"""
-        if not self.config.log_members:
+        # Серверы пользователя, где включены логи участников
+        guild_ids = self.enabled_guilds_for(after.id, LogType.MEMBERS)
+        if not guild_ids:
             return
         
         changes = []
@@ -328,21 +748,19 @@ class DiscordLogger:
             fields.extend(changes)
             
             # Отправляем в каналы логов всех серверов, где есть этот пользователь
-            for guild in self.bot.guilds:
-                if guild.get_member(after.id):
-                    await self.send_log(
-                        guild_id=guild.id,
-                        title="👤 Профиль пользователя обновлен",
-                        description=f"**Пользователь:** {self.format_user_info(after)}",
-                        color=discord.Color.blue(),
-                        fields=fields,
-                        thumbnail=after.display_avatar.url
-                    )
+            for guild_id in guild_ids:
+                await self.send_event(
+                    guild_id=guild_id,
+                    event="user_update",
+                    user=self.format_user_info(after),
+                    fields=fields,
+                    thumbnail=after.display_avatar.url
+                )
     
     # === ЛОГИРОВАНИЕ КАНАЛОВ ===
     async def log_channel_create(self, channel):
         """Логирует создание канала"""
-        if not self.config.log_channels:
+        if not self.should_log(channel.guild.id, LogType.CHANNELS):
             return
         
         channel_type = self.get_channel_type_emoji(channel.type)
@@ -355,19 +773,20 @@ class DiscordLogger:
         ]
         
         if hasattr(channel, 'topic') and channel.topic:
-            fields.append(("Описание", channel.topic[:500], False))
+            fields.append(("Описание", channel.topic, False))
         
-        await self.send_log(
+        await self.send_event(
             guild_id=channel.guild.id,
-            title=f"{channel_type} Канал создан",
-            description=f"**Канал:** {channel.mention}{category}",
-            color=discord.Color.green(),
+            event="channel_create",
+            emoji=channel_type,
+            channel=channel.mention,
+            category=category,
             fields=fields
         )
     
     async def log_channel_delete(self, channel):
         """Логирует удаление канала"""
-        if not self.config.log_channels:
+        if not self.should_log(channel.guild.id, LogType.CHANNELS):
             return
         
         channel_type = self.get_channel_type_emoji(channel.type)
@@ -380,19 +799,20 @@ class DiscordLogger:
         ]
         
         if hasattr(channel, 'topic') and channel.topic:
-            fields.append(("Описание", channel.topic[:500], False))
+            fields.append(("Описание", channel.topic, False))
         
-        await self.send_log(
+        await self.send_event(
             guild_id=channel.guild.id,
-            title=f"{channel_type} Канал удален",
-            description=f"**Канал:** #{channel.name}{category}",
-            color=discord.Color.red(),
+            event="channel_delete",
+            emoji=channel_type,
+            name=channel.name,
+            category=category,
             fields=fields
         )
     
     async def log_channel_update(self, before, after):
         """Логирует обновление канала"""
-        if not self.config.log_channels:
+        if not self.should_log(after.guild.id, LogType.CHANNELS):
             return
         
         changes = []
@@ -403,8 +823,8 @@ class DiscordLogger:
         
         # Проверяем изменения описания
         if hasattr(before, 'topic') and hasattr(after, 'topic') and before.topic != after.topic:
-            old_topic = before.topic[:200] if before.topic else "*Без описания*"
-            new_topic = after.topic[:200] if after.topic else "*Без описания*"
+            old_topic = before.topic if before.topic else "*Без описания*"
+            new_topic = after.topic if after.topic else "*Без описания*"
             changes.append(("📄 Описание", f"{old_topic} → {new_topic}", False))
         
         # Проверяем изменения категории
@@ -421,18 +841,17 @@ class DiscordLogger:
             fields = [("ID канала", str(after.id), True)]
             fields.extend(changes)
             
-            await self.send_log(
+            await self.send_event(
                 guild_id=after.guild.id,
-                title="📝 Канал обновлен",
-                description=f"**Канал:** {after.mention}",
-                color=discord.Color.blue(),
+                event="channel_update",
+                channel=after.mention,
                 fields=fields
             )
     
     # === ЛОГИРОВАНИЕ РОЛЕЙ ===
     async def log_role_create(self, role):
         """Логирует создание роли"""
-        if not self.config.log_roles:
+        if not self.should_log(role.guild.id, LogType.ROLES):
             return
         
         fields = [
@@ -447,17 +866,17 @@ class DiscordLogger:
         if role.permissions.value != 0:
             fields.append(("Разрешения", f"{role.permissions.value}", False))
         
-        await self.send_log(
+        await self.send_event(
             guild_id=role.guild.id,
-            title="🎭 Роль создана",
-            description=f"**Роль:** {role.mention}",
+            event="role_create",
+            role=role.mention,
             color=role.color if role.color.value != 0 else discord.Color.blue(),
             fields=fields
         )
     
     async def log_role_delete(self, role):
         """Логирует удаление роли"""
-        if not self.config.log_roles:
+        if not self.should_log(role.guild.id, LogType.ROLES):
             return
         
         fields = [
@@ -467,17 +886,16 @@ class DiscordLogger:
             ("Позиция", str(role.position), True)
         ]
         
-        await self.send_log(
+        await self.send_event(
             guild_id=role.guild.id,
-            title="🎭 Роль удалена",
-            description=f"**Роль:** @{role.name}",
-            color=discord.Color.red(),
+            event="role_delete",
+            name=role.name,
             fields=fields
         )
     
     async def log_role_update(self, before, after):
         """Логирует обновление роли"""
-        if not self.config.log_roles:
+        if not self.should_log(after.guild.id, LogType.ROLES):
             return
         
         changes = []
@@ -515,10 +933,10 @@ class DiscordLogger:
             fields = [("ID роли", str(after.id), True)]
             fields.extend(changes)
             
-            await self.send_log(
+            await self.send_event(
                 guild_id=after.guild.id,
-                title="🎭 Роль обновлена",
-                description=f"**Роль:** {after.mention}",
+                event="role_update",
+                role=after.mention,
                 color=after.color if after.color.value != 0 else discord.Color.blue(),
                 fields=fields
             )
@@ -526,15 +944,18 @@ class DiscordLogger:
     # === ЛОГИРОВАНИЕ РЕАКЦИЙ ===
     async def log_reaction_add(self, reaction, user):
         """Логирует добавление реакции"""
+        if self.router.route(reaction.message.guild.id) is None:
+            return
+        
         # Проверяем лимит частоты
         if self.is_rate_limited("reaction_add", user.id):
             return
         
-        await self.send_log(
+        await self.send_event(
             guild_id=reaction.message.guild.id,
-            title="👍 Реакция добавлена",
-            description=f"**Пользователь:** {self.format_user_info(user)}\n**Канал:** {reaction.message.channel.mention}",
-            color=discord.Color.green(),
+            event="reaction_add",
+            user=self.format_user_info(user),
+            channel=reaction.message.channel.mention,
             fields=[
                 ("Реакция", str(reaction.emoji), True),
                 ("Количество", str(reaction.count), True),
@@ -546,15 +967,18 @@ class DiscordLogger:
     
     async def log_reaction_remove(self, reaction, user):
         """Логирует удаление реакции"""
+        if self.router.route(reaction.message.guild.id) is None:
+            return
+        
         # Проверяем лимит частоты
         if self.is_rate_limited("reaction_remove", user.id):
             return
         
-        await self.send_log(
+        await self.send_event(
             guild_id=reaction.message.guild.id,
-            title="👎 Реакция удалена",
-            description=f"**Пользователь:** {self.format_user_info(user)}\n**Канал:** {reaction.message.channel.mention}",
-            color=discord.Color.red(),
+            event="reaction_remove",
+            user=self.format_user_info(user),
+            channel=reaction.message.channel.mention,
             fields=[
                 ("Реакция", str(reaction.emoji), True),
                 ("Количество", str(reaction.count), True),
@@ -566,15 +990,17 @@ class DiscordLogger:
     
     async def log_reaction_clear(self, message, reactions):
         """Логирует очистку всех реакций"""
+        if self.router.route(message.guild.id) is None:
+            return
+        
         reactions_text = ", ".join([str(r.emoji) for r in reactions]) if reactions else "Нет реакций"
         
-        await self.send_log(
+        await self.send_event(
             guild_id=message.guild.id,
-            title="🧹 Все реакции очищены",
-            description=f"**Канал:** {message.channel.mention}",
-            color=discord.Color.orange(),
+            event="reaction_clear",
+            channel=message.channel.mention,
             fields=[
-                ("Очищенные реакции", reactions_text[:1000], False),
+                ("Очищенные реакции", reactions_text, False),
                 ("ID сообщения", str(message.id), True),
                 ("Ссылка на сообщение", f"[Перейти]({message.jump_url})", False)
             ]
@@ -583,52 +1009,37 @@ class DiscordLogger:
     # === ЛОГИРОВАНИЕ СТАТУСА ПОЛЬЗОВАТЕЛЕЙ ===
     async def log_presence_update(self, before, after):
         """Логирует изменения статуса пользователя (онлайн/офлайн)"""
-        if not self.config.log_presence:
-            return
-        
         # Проверяем, что пользователь изменил статус
         if before.status == after.status:
             return
         
-        # Получаем все серверы, где есть этот пользователь
-        guilds = []
-        for guild in self.bot.guilds:
-            if guild.get_member(after.id):
-                guilds.append(guild)
-        
-        if not guilds:
+        # Этот переход уже разослан по событию с другого общего сервера
+        if self.presence_dedupe.check_and_add((after.id, before.status, after.status), self.shared_copies(after.id)):
+            self.metrics.events_suppressed.inc('presence_update', 'dedupe')
             return
         
-        # Определяем статус
-        status_emojis = {
-            discord.Status.online: "🟢",
-            discord.Status.idle: "🟡", 
-            discord.Status.dnd: "🔴",
-            discord.Status.offline: "⚫"
-        }
-        
-        status_names = {
-            discord.Status.online: "В сети",
-            discord.Status.idle: "Неактивен",
-            discord.Status.dnd: "Не беспокоить",
-            discord.Status.offline: "Не в сети"
-        }
+        # Получаем все серверы пользователя, где включены логи статуса
+        guild_ids = self.enabled_guilds_for(after.id, LogType.PRESENCE)
+        if not guild_ids:
+            return
         
-        old_status = status_names.get(before.status, "Неизвестно")
-        new_status = status_names.get(after.status, "Неизвестно")
-        old_emoji = status_emojis.get(before.status, "❓")
-        new_emoji = status_emojis.get(after.status, "❓")
+        old_label = self.format_status(before.status)
+        new_label = self.format_status(after.status)
         
         # Отправляем лог во все серверы, где есть пользователь
-        for guild in guilds:
-            await self.send_log(
-                guild_id=guild.id,
-                title="📱 Статус пользователя изменен",
-                description=f"**Пользователь:** {self.format_user_info(after)}",
-                color=discord.Color.blue(),
+        for guild_id in guild_ids:
+            # Частые переключения копятся и уходят одним логом по окончании окна
+            if self.presence_coalescer.add(guild_id, after, 'status', old_label, new_label):
+                self.metrics.events_suppressed.inc('presence_update', 'coalesced')
+                continue
+            
+            await self.send_event(
+                guild_id=guild_id,
+                event="presence_status",
+                user=self.format_user_info(after),
                 fields=[
-                    ("Старый статус", f"{old_emoji} {old_status}", True),
-                    ("Новый статус", f"{new_emoji} {new_status}", True),
+                    ("Старый статус", old_label, True),
+                    ("Новый статус", new_label, True),
                     ("ID пользователя", str(after.id), True)
                 ],
                 thumbnail=after.display_avatar.url
@@ -636,20 +1047,19 @@ class DiscordLogger:
     
     async def log_user_activity_update(self, before, after):
         """Логирует изменения активности пользователя (игра, стрим и т.д.)"""
-        if not self.config.log_presence:
-            return
-        
         # Проверяем изменения активности
         if before.activity == after.activity:
             return
         
-        # Получаем все серверы, где есть этот пользователь
-        guilds = []
-        for guild in self.bot.guilds:
-            if guild.get_member(after.id):
-                guilds.append(guild)
+        # Этот переход уже разослан по событию с другого общего сервера
+        dedupe_key = (after.id, self.activity_key(before.activity), self.activity_key(after.activity))
+        if self.presence_dedupe.check_and_add(dedupe_key, self.shared_copies(after.id)):
+            self.metrics.events_suppressed.inc('user_activity_update', 'dedupe')
+            return
         
-        if not guilds:
+        # Получаем все серверы пользователя, где включены логи статуса
+        guild_ids = self.enabled_guilds_for(after.id, LogType.PRESENCE)
+        if not guild_ids:
             return
         
         # Определяем тип активности
@@ -665,20 +1075,90 @@ class DiscordLogger:
         new_activity = self.format_activity(after.activity) if after.activity else "Нет активности"
         
         # Отправляем лог во все серверы, где есть пользователь
-        for guild in guilds:
-            await self.send_log(
-                guild_id=guild.id,
-                title="🎯 Активность пользователя изменена",
-                description=f"**Пользователь:** {self.format_user_info(after)}",
-                color=discord.Color.purple(),
+        for guild_id in guild_ids:
+            # Частые смены активности копятся и уходят одним логом по окончании окна
+            if self.presence_coalescer.add(guild_id, after, 'activity', old_activity, new_activity):
+                self.metrics.events_suppressed.inc('user_activity_update', 'coalesced')
+                continue
+            
+            await self.send_event(
+                guild_id=guild_id,
+                event="presence_activity",
+                user=self.format_user_info(after),
                 fields=[
-                    ("Старая активность", old_activity[:1000], False),
-                    ("Новая активность", new_activity[:1000], False),
+                    ("Старая активность", old_activity, False),
+                    ("Новая активность", new_activity, False),
                     ("ID пользователя", str(after.id), True)
                 ],
                 thumbnail=after.display_avatar.url
             )
     
+    def shared_copies(self, user_id: int) -> int:
+        """Сколько копий события статуса пользователя придет с других общих серверов"""
+        return max(0, len(self.membership.guilds_for(user_id)) - 1)
+    
+    @staticmethod
+    def format_status(status) -> str:
+        """Форматирует онлайн-статус с эмодзи"""
+        status_emojis = {
+            discord.Status.online: "🟢",
+            discord.Status.idle: "🟡",
+            discord.Status.dnd: "🔴",
+            discord.Status.offline: "⚫"
+        }
+        status_names = {
+            discord.Status.online: "В сети",
+            discord.Status.idle: "Неактивен",
+            discord.Status.dnd: "Не беспокоить",
+            discord.Status.offline: "Не в сети"
+        }
+        return f"{status_emojis.get(status, '❓')} {status_names.get(status, 'Неизвестно')}"
+    
+    async def log_presence_changes(self, pending: PendingPresence):
+        """Логирует цепочку изменений статуса/активности, накопленную за окно"""
+        user = pending.user
+        
+        if pending.kind == 'status':
+            event = "presence_status"
+            old_name, new_name, inline = "Старый статус", "Новый статус", True
+            current = self.format_status(user.status)
+        else:
+            event = "presence_activity"
+            old_name, new_name, inline = "Старая активность", "Новая активность", False
+            current = self.format_activity(user.activity)
+        
+        # Цепочка должна заканчиваться текущим состоянием, даже если какой-то
+        # переход до нас не дошел
+        if current != pending.chain[-1]:
+            pending.chain.append(current)
+        
+        if pending.changes == 1:
+            fields = [
+                (old_name, pending.chain[0], inline),
+                (new_name, pending.chain[1], inline)
+            ]
+        else:
+            fields = [
+                ("Изменения", " → ".join(pending.chain), False),
+                ("Количество изменений", f"{pending.changes} за {round(pending.duration)} с", True)
+            ]
+        fields.append(("ID пользователя", str(user.id), True))
+        
+        await self.send_event(
+            guild_id=pending.guild_id,
+            event=event,
+            user=self.format_user_info(user),
+            fields=fields,
+            thumbnail=user.display_avatar.url
+        )
+    
+    @staticmethod
+    def activity_key(activity) -> Optional[tuple]:
+        """Возвращает хешируемый ключ активности для дедупликации"""
+        if not activity:
+            return None
+        return (activity.type, activity.name, getattr(activity, 'url', None))
+    
     def format_activity(self, activity):
         """Форматирует активность пользователя для отображения"""
         if not activity:
@@ -704,16 +1184,18 @@ class DiscordLogger:
     # === ЛОГИРОВАНИЕ ГОЛОСОВЫХ КАНАЛОВ ===
     async def log_voice_state_update(self, member, before, after):
         """Логирует изменения голосового состояния"""
-        if not self.config.log_voice or before.channel == after.channel or not member.guild:
+        if not member.guild or before.channel == after.channel:
+            return
+        if not self.should_log(member.guild.id, LogType.VOICE):
             return
         
         if before.channel is None:
             # Подключился к голосовому каналу
-            await self.send_log(
+            await self.send_event(
                 guild_id=member.guild.id,
-                title="🎤 Подключился к голосовому каналу",
-                description=f"**Пользователь:** {self.format_user_info(member)}\n**Канал:** {after.channel.mention}",
-                color=discord.Color.green(),
+                event="voice_join",
+                user=self.format_user_info(member),
+                channel=after.channel.mention,
                 fields=[
                     ("Участников в канале", str(len(after.channel.members)), True)
                 ],
@@ -721,11 +1203,11 @@ class DiscordLogger:
             )
         elif after.channel is None:
             # Отключился от голосового канала
-            await self.send_log(
+            await self.send_event(
                 guild_id=member.guild.id,
-                title="🎤 Отключился от голосового канала",
-                description=f"**Пользователь:** {self.format_user_info(member)}\n**Канал:** {before.channel.mention}",
-                color=discord.Color.red(),
+                event="voice_leave",
+                user=self.format_user_info(member),
+                channel=before.channel.mention,
                 fields=[
                     ("Участников в канале", str(len(before.channel.members)), True)
                 ],
@@ -733,11 +1215,10 @@ class DiscordLogger:
             )
         else:
             # Перешел в другой голосовой канал
-            await self.send_log(
+            await self.send_event(
                 guild_id=member.guild.id,
-                title="🎤 Перешел в другой голосовой канал",
-                description=f"**Пользователь:** {self.format_user_info(member)}",
-                color=discord.Color.blue(),
+                event="voice_move",
+                user=self.format_user_info(member),
                 fields=[
                     ("Из", before.channel.mention, True),
                     ("В", after.channel.mention, True),
@@ -749,6 +1230,9 @@ class DiscordLogger:
     # === ЛОГИРОВАНИЕ СЕРВЕРА ===
     async def log_guild_update(self, before, after):
         """Логирует обновление сервера"""
+        if self.router.route(after.id) is None:
+            return
+        
         changes = []
         
         # Проверяем изменения названия
@@ -757,8 +1241,8 @@ class DiscordLogger:
         
         # Проверяем изменения описания
         if before.description != after.description:
-            old_desc = before.description[:200] if before.description else "*Без описания*"
-            new_desc = after.description[:200] if after.description else "*Без описания*"
+            old_desc = before.description if before.description else "*Без описания*"
+            new_desc = after.description if after.description else "*Без описания*"
             changes.append(("📄 Описание", f"{old_desc} → {new_desc}", False))
         
         # Проверяем изменения иконки
@@ -781,72 +1265,73 @@ class DiscordLogger:
             fields = [("ID сервера", str(after.id), True)]
             fields.extend(changes)
             
-            await self.send_log(
+            await self.send_event(
                 guild_id=after.id,
-                title="🏰 Сервер обновлен",
-                description=f"**Сервер:** {after.name}",
-                color=discord.Color.blue(),
+                event="guild_update",
+                name=after.name,
                 fields=fields
             )
     
     async def log_guild_emojis_update(self, guild, before, after):
         """Логирует обновление эмодзи сервера"""
+        if self.router.route(guild.id) is None:
+            return
+        
         added = [emoji for emoji in after if emoji not in before]
         removed = [emoji for emoji in before if emoji not in after]
         
         if added:
             emojis_text = ", ".join([str(emoji) for emoji in added])
-            await self.send_log(
+            await self.send_event(
                 guild_id=guild.id,
-                title="😀 Эмодзи добавлены",
-                description=f"**Сервер:** {guild.name}",
-                color=discord.Color.green(),
+                event="emojis_add",
+                name=guild.name,
                 fields=[
-                    ("Добавленные эмодзи", emojis_text[:1000], False),
+                    ("Добавленные эмодзи", emojis_text, False),
                     ("Количество", str(len(added)), True)
                 ]
             )
         
         if removed:
             emojis_text = ", ".join([str(emoji) for emoji in removed])
-            await self.send_log(
+            await self.send_event(
                 guild_id=guild.id,
-                title="😀 Эмодзи удалены",
-                description=f"**Сервер:** {guild.name}",
-                color=discord.Color.red(),
+                event="emojis_remove",
+                name=guild.name,
                 fields=[
-                    ("Удаленные эмодзи", emojis_text[:1000], False),
+                    ("Удаленные эмодзи", emojis_text, False),
                     ("Количество", str(len(removed)), True)
                 ]
             )
     
     async def log_guild_stickers_update(self, guild, before, after):
         """Логирует обновление стикеров сервера"""
+        if self.router.route(guild.id) is None:
+            return
+        
         added = [sticker for sticker in after if sticker not in before]
         removed = [sticker for sticker in before if sticker not in after]
         
         if added:
             stickers_text = ", ".join([sticker.name for sticker in added])
-            await self.send_log(
+            await self.send_event(
                 guild_id=guild.id,
-                title="🎨 Стикеры добавлены",
-                description=f"**Сервер:** {guild.name}",
-                color=discord.Color.green(),
+                event="stickers_add",
+                name=guild.name,
                 fields=[
-                    ("Добавленные стикеры", stickers_text[:1000], False),
+                    ("Добавленные стикеры", stickers_text, False),
                     ("Количество", str(len(added)), True)
                 ]
             )
         
         if removed:
             stickers_text = ", ".join([sticker.name for sticker in removed])
-            await self.send_log(
+            await self.send_event(
                 guild_id=guild.id,
-                title="🎨 Стикеры удалены",
-                description=f"**Сервер:** {guild.name}",
-                color=discord.Color.red(),
+                event="stickers_remove",
+                name=guild.name,
                 fields=[
-                    ("Удаленные стикеры", stickers_text[:1000], False),
+                    ("Удаленные стикеры", stickers_text, False),
                     ("Количество", str(len(removed)), True)
                 ]
             )
@@ -864,16 +1349,6 @@ class DiscordLogger:
         }
         return emoji_map.get(channel_type, "❓")
     
-    def format_time(self, dt=None):
-        """Форматирует время для отображения в UTC+7 (Новосибирское)"""
-        if dt is None:
-            dt = datetime.utcnow()
-        
-        # Конвертируем в UTC+7 (Новосибирское время)
-        novosibirsk_tz = timezone(timedelta(hours=7))
-        if dt.tzinfo is None:
-            # Если время без timezone, считаем его UTC
-            dt = dt.replace(tzinfo=timezone.utc)
-        
-        local_time = dt.astimezone(novosibirsk_tz)
-        return local_time.strftime('%d.%m.%Y %H:%M:%S MSK+4')
+    def format_time(self, dt=None, guild_id: int = None):
+        """Форматирует время для отображения в часовом поясе сервера"""
+        return self.renderer.format_time(dt, guild_id)
@@ -0,0 +1,61 @@
+"""
+Модуль индекса участников серверов
+"""
+from typing import Dict, Iterable, Set
+
+_EMPTY: frozenset = frozenset()
+
+
+class MembershipIndex:
+    """Обратный индекс: ID пользователя -> ID серверов, где он состоит.
+
+    Позволяет находить общие серверы пользователя за O(1) вместо обхода
+    всех серверов бота на каждое событие статуса или профиля.
+    Индекс поддерживается инкрементально по событиям входа/выхода
+    участников и подключения/отключения бота от серверов.
+    """
+
+    def __init__(self):
+        self.user_guilds: Dict[int, Set[int]] = {}
+
+    def rebuild(self, guilds: Iterable):
+        """Полностью перестраивает индекс по текущему кэшу серверов"""
+        self.user_guilds.clear()
+        for guild in guilds:
+            self.add_guild(guild)
+
+    def add_guild(self, guild):
+        """Добавляет всех закэшированных участников сервера"""
+        for member in guild.members:
+            self.add_member(member.id, guild.id)
+
+    def remove_guild(self, guild):
+        """Удаляет сервер из индекса"""
+        members = guild.members
+        user_ids = [member.id for member in members] if members else list(self.user_guilds)
+        for user_id in user_ids:
+            self.remove_member(user_id, guild.id)
+
+    def add_member(self, user_id: int, guild_id: int):
+        """Отмечает, что пользователь состоит на сервере"""
+        guilds = self.user_guilds.get(user_id)
+        if guilds is None:
+            self.user_guilds[user_id] = {guild_id}
+        else:
+            guilds.add(guild_id)
+
+    def remove_member(self, user_id: int, guild_id: int):
+        """Отмечает, что пользователь покинул сервер"""
+        guilds = self.user_guilds.get(user_id)
+        if guilds is None:
+            return
+        guilds.discard(guild_id)
+        if not guilds:
+            del self.user_guilds[user_id]
+
+    def guilds_for(self, user_id: int) -> Set[int]:
+        """Возвращает ID серверов, на которых состоит пользователь"""
+        return self.user_guilds.get(user_id, _EMPTY)
+
+    def __len__(self) -> int:
+        return len(self.user_guilds)
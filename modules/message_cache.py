@@ -0,0 +1,91 @@
+"""
+Модуль компактного кэша содержимого сообщений
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class CachedMessage:
+    """Минимум данных сообщения, нужный для логов удаления и редактирования"""
+    __slots__ = ('message_id', 'guild_id', 'channel_id', 'author_id', 'content', 'attachment_ids', 'created_at')
+
+    def __init__(self, message_id: int, guild_id: int, channel_id: int, author_id: int,
+                 content: str, attachment_ids: Tuple[int, ...], created_at):
+        self.message_id = message_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.content = content
+        self.attachment_ids = attachment_ids
+        self.created_at = created_at
+
+    @classmethod
+    def from_message(cls, message) -> 'CachedMessage':
+        return cls(
+            message.id,
+            message.guild.id,
+            message.channel.id,
+            message.author.id,
+            message.content or "",
+            tuple(attachment.id for attachment in message.attachments),
+            message.created_at
+        )
+
+
+class MessageContentCache:
+    """Ограниченный по размеру кэш содержимого сообщений.
+
+    Встроенный кэш discord.py хранит полные объекты Message, поэтому
+    его приходится держать маленьким, и удаление старых сообщений не
+    логируется. Здесь хранится только текст, автор, канал и ID вложений,
+    а при превышении лимита по числу сообщений или суммарной длине текста
+    вытесняются самые старые записи.
+    """
+
+    def __init__(self, max_messages: int = 50000, max_chars: int = 20_000_000):
+        self.max_messages = max(1, max_messages)
+        self.max_chars = max(1, max_chars)
+        self.messages: "OrderedDict[int, CachedMessage]" = OrderedDict()
+        self.total_chars = 0
+
+    def add(self, message):
+        """Запоминает новое сообщение"""
+        self.put(CachedMessage.from_message(message))
+
+    def put(self, cached: CachedMessage):
+        old = self.messages.pop(cached.message_id, None)
+        if old is not None:
+            self.total_chars -= len(old.content)
+
+        self.messages[cached.message_id] = cached
+        self.total_chars += len(cached.content)
+
+        while len(self.messages) > self.max_messages or self.total_chars > self.max_chars:
+            _, evicted = self.messages.popitem(last=False)
+            self.total_chars -= len(evicted.content)
+
+    def get(self, message_id: int) -> Optional[CachedMessage]:
+        return self.messages.get(message_id)
+
+    def update_content(self, message_id: int, content: str):
+        """Обновляет текст отредактированного сообщения"""
+        cached = self.messages.get(message_id)
+        if cached is not None:
+            self.total_chars += len(content) - len(cached.content)
+            cached.content = content
+
+    def pop(self, message_id: int) -> Optional[CachedMessage]:
+        """Удаляет сообщение из кэша и возвращает его"""
+        cached = self.messages.pop(message_id, None)
+        if cached is not None:
+            self.total_chars -= len(cached.content)
+        return cached
+
+    def get_stats(self) -> dict:
+        return {
+            'messages': len(self.messages),
+            'chars': self.total_chars
+        }
+
+    def __len__(self) -> int:
+        return len(self.messages)
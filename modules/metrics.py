@@ -0,0 +1,204 @@
+"""
+Модуль метрик конвейера логов в текстовом формате Prometheus
+"""
+import logging
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограммы времени обработчиков, в секундах
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Счетчик с метками"""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values) -> float:
+        return self.values.get(label_values, 0)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Гистограмма с метками и фиксированными границами корзин"""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # Метки -> [счетчики корзин..., сумма, количество]
+        self.values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        state = self.values.get(label_values)
+        if state is None:
+            state = self.values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[index] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ('le',)
+        for label_values, state in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, label_values + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, label_values + ('+Inf',))} {state[-1]}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class Gauge:
+    """Показатель, который считывается функцией в момент запроса метрик"""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 func: Callable[[], Iterable[Tuple[tuple, float]]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.func = func
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        if self.func is None:
+            return lines
+        try:
+            samples = list(self.func())
+        except Exception as e:
+            logger.error(f"Ошибка чтения метрики {self.name}: {e}")
+            return lines
+        for label_values, value in samples:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class LoggerMetrics:
+    """Метрики конвейера логов: события, отправка, REST-ответы и состояние очередей.
+
+    Счетчики обновляются в обработчиках за O(1), а показатели (глубина
+    очередей, размер лимитера, задержка шлюза) считываются только при
+    запросе /metrics.
+    """
+
+    def __init__(self):
+        self.events_received = Counter(
+            'discord_logger_events_received_total',
+            'События шлюза, переданные обработчикам', ('event',)
+        )
+        self.events_logged = Counter(
+            'discord_logger_events_logged_total',
+            'Логи, поставленные в очередь отправки', ('event',)
+        )
+        self.events_suppressed = Counter(
+            'discord_logger_events_suppressed_total',
+            'События, не попавшие в лог', ('event', 'reason')
+        )
+        self.handler_latency = Histogram(
+            'discord_logger_handler_duration_seconds',
+            'Время работы обработчиков событий', ('event',)
+        )
+        self.deliveries = Counter(
+            'discord_logger_send_log_total',
+            'Результат отправки логов в Discord (по числу embed)', ('result',)
+        )
+        self.send_retries = Counter(
+            'discord_logger_send_retries_total',
+            'Повторные попытки отправки логов после временных ошибок', ('reason',)
+        )
+        self.rest_responses = Counter(
+            'discord_logger_rest_responses_total',
+            'Ответы REST API Discord по кодам', ('status',)
+        )
+        self.gauges: List[Gauge] = []
+
+    def add_gauge(self, name: str, documentation: str, labels: Tuple[str, ...],
+                  func: Callable[[], Iterable[Tuple[tuple, float]]]):
+        self.gauges.append(Gauge(name, documentation, labels, func))
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Возвращает трассировку aiohttp, считающую коды ответов (в том числе 429)"""
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_end(session, context, params):
+            self.rest_responses.inc(str(params.response.status))
+
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (self.events_received, self.events_logged, self.events_suppressed,
+                       self.handler_latency, self.deliveries, self.send_retries, self.rest_responses,
+                       *self.gauges):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Локальный HTTP-сервер с единственным адресом /metrics"""
+
+    def __init__(self, metrics: LoggerMetrics, host: str, port: int):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.runner: Optional[web.AppRunner] = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.metrics.render(), content_type='text/plain', charset='utf-8')
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(f"Метрики доступны на http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
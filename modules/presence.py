@@ -0,0 +1,109 @@
+"""
+Модуль объединения частых изменений статуса пользователей
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PendingPresence:
+    """Накопленная цепочка изменений одного пользователя на одном сервере"""
+    __slots__ = ('guild_id', 'user', 'kind', 'chain', 'first_at', 'last_at')
+
+    def __init__(self, guild_id: int, user, kind: str, old: str, new: str):
+        now = time.monotonic()
+        self.guild_id = guild_id
+        self.user = user
+        self.kind = kind
+        self.chain: List[str] = [old, new]
+        self.first_at = now
+        self.last_at = now
+
+    @property
+    def changes(self) -> int:
+        """Количество переходов в цепочке"""
+        return len(self.chain) - 1
+
+    @property
+    def duration(self) -> float:
+        """Время между первым и последним переходом в секундах"""
+        return self.last_at - self.first_at
+
+
+class PresenceCoalescer:
+    """Собирает изменения статуса/активности за окно и отдает их одним логом.
+
+    Первый переход логируется сразу и открывает окно для пары (сервер,
+    пользователь), последующие переходы в окне дописываются в цепочку, а
+    по окончании окна вызывается flush_func с накопленной цепочкой. После
+    отправки цепочки открывается следующее окно; окно без переходов
+    закрывается, и следующее изменение снова уходит сразу.
+    """
+
+    def __init__(self, flush_func: Callable[[PendingPresence], Awaitable[None]],
+                 window_func: Callable[[int], float]):
+        self.flush_func = flush_func
+        self.window_func = window_func
+        self.pending: Dict[Tuple[int, int, str], PendingPresence] = {}
+        # Открытые окна: ключ -> таймер окна
+        self.timers: Dict[Tuple[int, int, str], asyncio.Task] = {}
+        self.coalesced = 0
+
+    def add(self, guild_id: int, user, kind: str, old: str, new: str) -> bool:
+        """Добавляет переход. Возвращает False, если переход нужно залогировать сразу"""
+        window = self.window_func(guild_id)
+        if window <= 0:
+            return False
+
+        key = (guild_id, user.id, kind)
+        if key not in self.timers:
+            self.timers[key] = asyncio.get_running_loop().create_task(self._flush_later(key, window))
+            return False
+
+        pending = self.pending.get(key)
+        if pending is not None:
+            pending.chain.append(new)
+            pending.last_at = time.monotonic()
+            pending.user = user
+            self.coalesced += 1
+            return True
+
+        self.pending[key] = PendingPresence(guild_id, user, kind, old, new)
+        self.coalesced += 1
+        return True
+
+    async def _flush_later(self, key, window: float):
+        """Отправляет цепочку по окончании окна, пока переходы продолжаются"""
+        while True:
+            await asyncio.sleep(window)
+            if key not in self.pending:
+                break
+            await self._flush(key)
+        self.timers.pop(key, None)
+
+    async def _flush(self, key):
+        pending = self.pending.pop(key, None)
+        if pending is None:
+            return
+        try:
+            await self.flush_func(pending)
+        except Exception as e:
+            logger.error(f"Ошибка при отправке изменений статуса на сервер {pending.guild_id}: {e}")
+
+    async def flush_all(self):
+        """Немедленно отправляет все накопленные цепочки (при остановке бота)"""
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+        for key in list(self.pending):
+            await self._flush(key)
+
+    def get_stats(self) -> dict:
+        """Возвращает статистику объединения"""
+        return {
+            'pending': len(self.pending),
+            'coalesced': self.coalesced
+        }
@@ -0,0 +1,133 @@
+"""
+Модуль профилирования обработчиков событий
+"""
+import contextvars
+import functools
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class CallRecord:
+    """Один выполняющийся вызов обработчика"""
+    __slots__ = ('parent', 'rest', 'active')
+
+    def __init__(self, parent: Optional['CallRecord']):
+        self.parent = parent
+        self.rest = 0.0
+        self.active = True
+
+
+# Текущий вызов в задаче asyncio; по нему REST-запросы относятся к обработчику
+CURRENT_CALL: contextvars.ContextVar[Optional[CallRecord]] = contextvars.ContextVar('current_call', default=None)
+
+
+def _percentile(sorted_samples: List[float], q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+class HandlerStats:
+    """Накопленная статистика одного обработчика"""
+    __slots__ = ('calls', 'total', 'rest', 'samples')
+
+    def __init__(self, sample_size: int):
+        self.calls = 0
+        self.total = 0.0
+        self.rest = 0.0
+        # Длительности последних вызовов для перцентилей
+        self.samples = deque(maxlen=sample_size)
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        return {
+            'calls': self.calls,
+            'total': self.total,
+            'rest': self.rest,
+            'p50': _percentile(samples, 0.50),
+            'p95': _percentile(samples, 0.95),
+            'p99': _percentile(samples, 0.99)
+        }
+
+
+class HandlerProfiler:
+    """Замеряет время обработчиков событий и методов логирования.
+
+    Включается настройкой profiling. Для каждого обработчика считаются
+    вызовы, общее время, перцентили по последним вызовам и время ожидания
+    REST-запросов Discord (через трассировку aiohttp). Вызовы дольше
+    порога пишутся в лог.
+    """
+
+    def __init__(self, slow_threshold: float = 0.25, sample_size: int = 1000):
+        self.slow_threshold = slow_threshold
+        self.sample_size = sample_size
+        self.stats: Dict[str, HandlerStats] = {}
+        self.started_at = time.monotonic()
+
+    def _record(self, name: str, elapsed: float, rest: float):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = HandlerStats(self.sample_size)
+        stats.calls += 1
+        stats.total += elapsed
+        stats.rest += rest
+        stats.samples.append(elapsed)
+        if elapsed >= self.slow_threshold:
+            logger.warning(f"Медленный вызов {name}: {elapsed * 1000:.0f} мс (из них REST {rest * 1000:.0f} мс)")
+
+    async def run(self, name: str, coro_func, *args, **kwargs):
+        """Выполняет корутину и записывает время ее работы"""
+        call = CallRecord(CURRENT_CALL.get())
+        token = CURRENT_CALL.set(call)
+        started = time.perf_counter()
+        try:
+            return await coro_func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            call.active = False
+            CURRENT_CALL.reset(token)
+            self._record(name, elapsed, call.rest)
+
+    def wrap(self, name: str, coro_func):
+        """Возвращает обертку корутины, которая замеряет каждый вызов"""
+        @functools.wraps(coro_func)
+        async def wrapper(*args, **kwargs):
+            return await self.run(name, coro_func, *args, **kwargs)
+        return wrapper
+
+    def attach(self, trace: aiohttp.TraceConfig):
+        """Добавляет в трассировку aiohttp учет времени REST-запросов"""
+        async def on_request_start(session, context, params):
+            context.profiler_started = time.perf_counter()
+
+        async def on_request_done(session, context, params):
+            started = getattr(context, 'profiler_started', None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            # Время запроса входит во все выполняющиеся вызовы цепочки
+            call = CURRENT_CALL.get()
+            while call is not None:
+                if call.active:
+                    call.rest += elapsed
+                call = call.parent
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_done)
+        trace.on_request_exception.append(on_request_done)
+
+    def top(self, limit: int = 10) -> List[tuple]:
+        """Возвращает самые затратные обработчики по общему времени"""
+        ranked = sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)
+        return [(name, stats.summary()) for name, stats in ranked[:limit]]
+
+    def reset(self):
+        self.stats.clear()
+        self.started_at = time.monotonic()
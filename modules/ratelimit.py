@@ -0,0 +1,91 @@
+"""
+Модуль ограничения частоты логируемых событий
+"""
+import time
+from typing import Dict, Tuple
+
+# Лимит по умолчанию: 5 событий в минуту на пользователя
+DEFAULT_LIMIT = (5, 60.0)
+
+
+class EventRateLimiter:
+    """Ограничитель частоты событий на основе token bucket.
+
+    Для каждой пары (тип события, пользователь) хранится только число
+    оставшихся токенов и время последнего обращения, поэтому проверка
+    выполняется за O(1). Ключи, по которым давно не было событий,
+    периодически удаляются, чтобы память не росла с числом пользователей.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]] = None,
+                 default: Tuple[int, float] = DEFAULT_LIMIT,
+                 eviction_interval: float = 300.0):
+        self.default = self._parse_limit(default)
+        self.limits = {
+            event_type: self._parse_limit(limit)
+            for event_type, limit in (limits or {}).items()
+        }
+        self.eviction_interval = eviction_interval
+
+        # (тип события, ID пользователя) -> [токены, время последнего обращения]
+        self.buckets: Dict[Tuple[str, int], list] = {}
+        self.suppressed: Dict[str, int] = {}
+        self.last_eviction = time.monotonic()
+
+    @staticmethod
+    def _parse_limit(limit) -> Tuple[int, float]:
+        """Приводит лимит к виду (количество, период в секундах)"""
+        count, period = limit
+        return max(1, int(count)), max(0.001, float(period))
+
+    def get_limit(self, event_type: str) -> Tuple[int, float]:
+        """Возвращает лимит для типа события"""
+        return self.limits.get(event_type, self.default)
+
+    def hit(self, event_type: str, user_id: int) -> bool:
+        """Учитывает событие. Возвращает True, если лимит превышен"""
+        now = time.monotonic()
+        if now - self.last_eviction >= self.eviction_interval:
+            self.evict(now)
+
+        capacity, period = self.limits.get(event_type, self.default)
+        key = (event_type, user_id)
+        bucket = self.buckets.get(key)
+
+        if bucket is None:
+            self.buckets[key] = [capacity - 1, now]
+            return False
+
+        # Восполняем токены пропорционально прошедшему времени
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * capacity / period)
+        bucket[1] = now
+
+        if tokens < 1:
+            bucket[0] = tokens
+            self.suppressed[event_type] = self.suppressed.get(event_type, 0) + 1
+            return True
+
+        bucket[0] = tokens - 1
+        return False
+
+    def evict(self, now: float = None) -> int:
+        """Удаляет ключи, корзины которых уже полностью восстановились"""
+        if now is None:
+            now = time.monotonic()
+        self.last_eviction = now
+
+        idle = [
+            key for key, (tokens, last) in self.buckets.items()
+            if now - last >= self.get_limit(key[0])[1]
+        ]
+        for key in idle:
+            del self.buckets[key]
+        return len(idle)
+
+    def get_stats(self) -> dict:
+        """Возвращает статистику ограничителя"""
+        return {
+            'keys': len(self.buckets),
+            'suppressed': dict(self.suppressed),
+            'suppressed_total': sum(self.suppressed.values())
+        }
@@ -0,0 +1,108 @@
+"""
+Модуль записи событий шлюза для последующего воспроизведения (replay.py)
+"""
+import asyncio
+import gzip
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventRecorder:
+    """Записывает события шлюза Discord в сжатый файл JSON Lines.
+
+    Перехватываются парсеры ConnectionState, поэтому в файл попадают
+    события (READY, GUILD_CREATE, MESSAGE_CREATE, ...) уже после разбора
+    JSON вебсокетом, а не сырые пакеты. Каждая строка: время (epoch),
+    тип события и его данные. Запись идет пачками в отдельном потоке.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.buffer: List[str] = []
+        self.file = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recorder')
+        self.flush_task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.errors = 0
+
+    def attach(self, parsers: Dict[str, Callable]):
+        """Оборачивает парсеры событий записью (словарь меняется на месте)"""
+        for event, parser in list(parsers.items()):
+            parsers[event] = self._wrap(event, parser)
+        logger.info(f"Запись событий шлюза в {self.path}")
+
+    def _wrap(self, event: str, parser: Callable) -> Callable:
+        def recording_parser(data):
+            self.record(event, data)
+            return parser(data)
+        return recording_parser
+
+    def record(self, event: str, data):
+        try:
+            line = json.dumps({'t': time.time(), 'e': event, 'd': data}, ensure_ascii=False, separators=(',', ':'))
+        except (TypeError, ValueError) as e:
+            self.errors += 1
+            logger.error(f"Не удалось записать событие {event}: {e}")
+            return
+        self.buffer.append(line)
+        self.recorded += 1
+
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _write(self, lines: List[str]):
+        if self.file is None:
+            # Дозапись в gzip дает многочленный архив, который читается как один файл
+            self.file = gzip.open(self.path, 'at', encoding='utf-8')
+        self.file.write('\n'.join(lines) + '\n')
+        self.file.flush()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        lines, self.buffer = self.buffer, []
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._write, lines)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Ошибка записи событий в {self.path}: {e}")
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    async def close(self):
+        """Дописывает буфер и закрывает файл"""
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        await self.flush()
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._close_file)
+        self.executor.shutdown(wait=False)
+
+    def get_stats(self) -> dict:
+        return {
+            'recorded': self.recorded,
+            'buffered': len(self.buffer),
+            'errors': self.errors
+        }
+
+
+def read_recording(path: str):
+    """Читает записанные события по одному"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
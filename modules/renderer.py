@@ -0,0 +1,254 @@
+"""
+Модуль подготовки текста логов: шаблоны событий и кэши форматирования
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+import discord
+
+TIME_FORMAT = '%d.%m.%Y %H:%M:%S'
+
+
+class EmbedTemplate:
+    """Заголовок, описание и цвет лога одного типа события"""
+    __slots__ = ('title', 'description', 'color')
+
+    def __init__(self, title: str, description: str, color: Optional[discord.Color] = None):
+        self.title = title
+        self.description = description
+        self.color = color
+
+    def render(self, values: dict) -> Tuple[str, str, Optional[discord.Color]]:
+        title = self.title.format_map(values) if '{' in self.title else self.title
+        return title, self.description.format_map(values), self.color
+
+
+# Шаблоны логов по типам событий; цвет None задается вызывающим кодом
+TEMPLATES: Dict[str, EmbedTemplate] = {
+    'message_create': EmbedTemplate(
+        "📝 Новое сообщение",
+        "**Автор:** {author}\n**Канал:** {channel}\n**Содержание:** {content}",
+        discord.Color.green()
+    ),
+    'message_edit': EmbedTemplate(
+        "✏️ Сообщение отредактировано",
+        "**Автор:** {author}\n**Канал:** {channel}",
+        discord.Color.orange()
+    ),
+    'message_delete': EmbedTemplate(
+        "🗑️ Сообщение удалено",
+        "**Автор:** {author}\n**Канал:** {channel}\n**Содержание:** {content}",
+        discord.Color.red()
+    ),
+    'message_digest': EmbedTemplate(
+        "📊 Сводка сообщений",
+        "**Сообщений:** {count}\n**Период:** {period}",
+        discord.Color.blurple()
+    ),
+    'bulk_delete': EmbedTemplate(
+        "🗑️ Массовое удаление сообщений",
+        "**Канал:** {channel}\n**Количество удаленных сообщений:** {count}",
+        discord.Color.dark_red()
+    ),
+    'member_join': EmbedTemplate(
+        "👋 Участник присоединился",
+        "**Пользователь:** {user}",
+        discord.Color.green()
+    ),
+    'member_remove': EmbedTemplate(
+        "👋 Участник покинул сервер",
+        "**Пользователь:** {user}",
+        discord.Color.red()
+    ),
+    'member_update': EmbedTemplate(
+        "👤 Профиль участника обновлен",
+        "**Пользователь:** {user}",
+        discord.Color.blue()
+    ),
+    'user_update': EmbedTemplate(
+        "👤 Профиль пользователя обновлен",
+        "**Пользователь:** {user}",
+        discord.Color.blue()
+    ),
+    'channel_create': EmbedTemplate(
+        "{emoji} Канал создан",
+        "**Канал:** {channel}{category}",
+        discord.Color.green()
+    ),
+    'channel_delete': EmbedTemplate(
+        "{emoji} Канал удален",
+        "**Канал:** #{name}{category}",
+        discord.Color.red()
+    ),
+    'channel_update': EmbedTemplate(
+        "📝 Канал обновлен",
+        "**Канал:** {channel}",
+        discord.Color.blue()
+    ),
+    'role_create': EmbedTemplate("🎭 Роль создана", "**Роль:** {role}"),
+    'role_delete': EmbedTemplate("🎭 Роль удалена", "**Роль:** @{name}", discord.Color.red()),
+    'role_update': EmbedTemplate("🎭 Роль обновлена", "**Роль:** {role}"),
+    'reaction_add': EmbedTemplate(
+        "👍 Реакция добавлена",
+        "**Пользователь:** {user}\n**Канал:** {channel}",
+        discord.Color.green()
+    ),
+    'reaction_remove': EmbedTemplate(
+        "👎 Реакция удалена",
+        "**Пользователь:** {user}\n**Канал:** {channel}",
+        discord.Color.red()
+    ),
+    'reaction_clear': EmbedTemplate(
+        "🧹 Все реакции очищены",
+        "**Канал:** {channel}",
+        discord.Color.orange()
+    ),
+    'presence_status': EmbedTemplate(
+        "📱 Статус пользователя изменен",
+        "**Пользователь:** {user}",
+        discord.Color.blue()
+    ),
+    'presence_activity': EmbedTemplate(
+        "🎯 Активность пользователя изменена",
+        "**Пользователь:** {user}",
+        discord.Color.purple()
+    ),
+    'voice_join': EmbedTemplate(
+        "🎤 Подключился к голосовому каналу",
+        "**Пользователь:** {user}\n**Канал:** {channel}",
+        discord.Color.green()
+    ),
+    'voice_leave': EmbedTemplate(
+        "🎤 Отключился от голосового канала",
+        "**Пользователь:** {user}\n**Канал:** {channel}",
+        discord.Color.red()
+    ),
+    'voice_move': EmbedTemplate(
+        "🎤 Перешел в другой голосовой канал",
+        "**Пользователь:** {user}",
+        discord.Color.blue()
+    ),
+    'guild_update': EmbedTemplate("🏰 Сервер обновлен", "**Сервер:** {name}", discord.Color.blue()),
+    'emojis_add': EmbedTemplate("😀 Эмодзи добавлены", "**Сервер:** {name}", discord.Color.green()),
+    'emojis_remove': EmbedTemplate("😀 Эмодзи удалены", "**Сервер:** {name}", discord.Color.red()),
+    'stickers_add': EmbedTemplate("🎨 Стикеры добавлены", "**Сервер:** {name}", discord.Color.green()),
+    'stickers_remove': EmbedTemplate("🎨 Стикеры удалены", "**Сервер:** {name}", discord.Color.red()),
+}
+
+
+class TimestampCache:
+    """Строки текущего времени, закэшированные на секунду для каждого часового пояса"""
+
+    def __init__(self):
+        # Смещение от UTC в часах -> объект часового пояса и подпись
+        self.zones: Dict[float, Tuple[timezone, str]] = {}
+        # Смещение -> (секунда, готовая строка)
+        self.current: Dict[float, Tuple[int, str]] = {}
+
+    def zone(self, offset: float) -> Tuple[timezone, str]:
+        try:
+            return self.zones[offset]
+        except KeyError:
+            # Подпись отсчитывается от московского времени (UTC+3): UTC+7 -> MSK+4
+            label = "MSK" if offset == 3 else f"MSK{offset - 3:+g}"
+            zone = (timezone(timedelta(hours=offset)), label)
+            self.zones[offset] = zone
+            return zone
+
+    def now(self, offset: float) -> str:
+        second = int(time.time())
+        cached = self.current.get(offset)
+        if cached is not None and cached[0] == second:
+            return cached[1]
+        text = self.format(datetime.fromtimestamp(second, timezone.utc), offset)
+        self.current[offset] = (second, text)
+        return text
+
+    def format(self, dt: datetime, offset: float) -> str:
+        tz, label = self.zone(offset)
+        if dt.tzinfo is None:
+            # Если время без timezone, считаем его UTC
+            dt = dt.replace(tzinfo=timezone.utc)
+        return f"{dt.astimezone(tz).strftime(TIME_FORMAT)} {label}"
+
+
+class EmbedRenderer:
+    """Готовит текст логов по шаблонам событий.
+
+    Одни и те же пользователи и каналы попадают в логи снова и снова,
+    поэтому их описания хранятся в LRU-кэше и сбрасываются по событиям
+    обновления пользователя, участника и канала. Текущее время
+    форматируется не чаще раза в секунду для каждого часового пояса.
+    """
+
+    def __init__(self, config, max_snippets: int = 10000):
+        self.config = config
+        self.max_snippets = max(1, max_snippets)
+        self.templates = TEMPLATES
+        self.timestamps = TimestampCache()
+        # ('user' | 'channel', ID) -> готовый текст
+        self.snippets: "OrderedDict[tuple, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, event: str, **values) -> Tuple[str, str, Optional[discord.Color]]:
+        """Возвращает заголовок, описание и цвет лога события"""
+        return self.templates[event].render(values)
+
+    def format_time(self, dt: datetime = None, guild_id: int = None) -> str:
+        """Форматирует время в часовом поясе сервера"""
+        offset = self.config.get_timezone_offset(guild_id)
+        if dt is None:
+            return self.timestamps.now(offset)
+        return self.timestamps.format(dt, offset)
+
+    def _cached(self, key: tuple) -> Optional[str]:
+        text = self.snippets.get(key)
+        if text is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.snippets.move_to_end(key)
+        return text
+
+    def _store(self, key: tuple, text: str) -> str:
+        self.snippets[key] = text
+        if len(self.snippets) > self.max_snippets:
+            self.snippets.popitem(last=False)
+        return text
+
+    def user(self, user) -> str:
+        """Описание пользователя: упоминание, ID и имя"""
+        key = ('user', user.id)
+        text = self._cached(key)
+        if text is None:
+            text = self._store(key, f"{user.mention} (`{user.id}`)\n{user.name}#{user.discriminator}")
+        return text
+
+    def channel(self, channel) -> str:
+        """Описание канала: упоминание, ID и категория"""
+        key = ('channel', channel.id)
+        text = self._cached(key)
+        if text is None:
+            category = f" в {channel.category.name}" if channel.category else ""
+            text = self._store(key, f"{channel.mention} (`{channel.id}`){category}")
+        return text
+
+    def invalidate_user(self, user_id: int):
+        self.snippets.pop(('user', user_id), None)
+
+    def invalidate_channel(self, channel_id: int):
+        self.snippets.pop(('channel', channel_id), None)
+
+    def invalidate_channels(self):
+        """Сбрасывает описания всех каналов (например, после переименования категории)"""
+        for key in [key for key in self.snippets if key[0] == 'channel']:
+            del self.snippets[key]
+
+    def get_stats(self) -> dict:
+        return {
+            'snippets': len(self.snippets),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,68 @@
+"""
+Модуль повторной отправки логов после временных ошибок Discord
+"""
+import asyncio
+import random
+from collections import Counter
+from typing import Optional
+
+import aiohttp
+import discord
+
+# Ответы, которые HTTP-клиент discord.py сам повторяет до 5 раз
+DISCORD_RETRIED_STATUSES = frozenset({500, 502, 504, 524})
+
+
+class RetryPolicy:
+    """Повтор временных ошибок с экспоненциальной паузой и случайным разбросом.
+
+    Повторяются только ошибки, которые discord.py не повторяет сам:
+    обрывы соединения и тайм-ауты, а при отправке через channel.send еще
+    ответы 5xx вне DISCORD_RETRIED_STATUSES (например, 503). Вебхуки
+    discord.py повторяет при любом 5xx, а 429 - в обоих случаях (бот не
+    задает max_ratelimit_timeout), поэтому второй слой повторов только
+    держал бы воркер сервера.
+
+    Пауза выбирается случайно от 0 до base * 2^попытка (не больше
+    max_delay), чтобы воркеры разных серверов не повторяли запросы
+    одновременно.
+    """
+
+    def __init__(self, attempts: int = 3, base: float = 1.0, max_delay: float = 30.0):
+        self.attempts = max(0, attempts)
+        self.base = base
+        self.max_delay = max_delay
+        self.rng = random.Random()
+
+        # Причина -> число повторов; пачки, отправленные после повтора, и брошенные пачки
+        self.retries: Counter = Counter()
+        self.recovered = 0
+        self.exhausted = 0
+
+    @staticmethod
+    def classify(error: BaseException, webhook: bool = False) -> Optional[str]:
+        """Возвращает причину повтора временной ошибки или None.
+
+        webhook - пачка отправлялась через вебхуки, которые discord.py
+        сам повторяет при любом 5xx.
+        """
+        if isinstance(error, discord.HTTPException):
+            if webhook or error.status < 500 or error.status in DISCORD_RETRIED_STATUSES:
+                return None
+            return '5xx'
+        if isinstance(error, (aiohttp.ClientError, OSError, asyncio.TimeoutError)):
+            return 'connection'
+        return None
+
+    def delay(self, attempt: int) -> float:
+        """Пауза перед повтором номер attempt (с нуля)"""
+        return self.rng.uniform(0, min(self.max_delay, self.base * 2 ** attempt))
+
+    def get_stats(self) -> dict:
+        """Возвращает статистику повторов"""
+        return {
+            'retries': sum(self.retries.values()),
+            'by_reason': dict(self.retries),
+            'recovered': self.recovered,
+            'exhausted': self.exhausted
+        }
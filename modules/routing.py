@@ -0,0 +1,277 @@
+"""
+Модуль таблицы маршрутизации логов
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Set
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Права бота, без которых в канал нельзя отправить лог (расшифровки и длинные логи идут файлами)
+REQUIRED_PERMISSIONS = ('view_channel', 'send_messages', 'embed_links', 'attach_files')
+# Максимальная пауза отправки в неисправный канал, сек
+MAX_BREAKER_COOLDOWN = 3600
+
+
+class DestinationState:
+    """Сбои отправки в канал логов одного сервера"""
+    __slots__ = ('failures', 'trips', 'reason', 'notified', 'permanent')
+
+    def __init__(self):
+        self.failures = 0
+        # Сколько раз отправка приостанавливалась подряд (пауза удваивается)
+        self.trips = 0
+        self.reason: Optional[str] = None
+        self.notified = False
+        # Причина не пройдет сама (нет канала или прав): накопленные логи не ждут ее окончания
+        self.permanent = False
+
+
+class LogRouter:
+    """Таблица «сервер -> канал логов» с заранее найденными каналами.
+
+    Обработчики событий проверяют маршрут первым делом, поэтому события
+    серверов без настроенного канала отбрасываются до любого форматирования.
+    Таблица сбрасывается при смене канала логов, удалении канала и
+    переподключении бота.
+
+    Канал попадает в таблицу только вместе с проверенными правами бота.
+    Канал, которого нет в кэше, запрашивается через fetch_channel, а
+    ненайденный канал, канал без прав и канал, отправка в который
+    постоянно сбоит, отключаются на время (negative caching). Пока маршрут
+    отключен, события сервера отбрасываются без ошибок в журнале, а
+    владелец сервера один раз получает сообщение о проблеме.
+    """
+
+    def __init__(self, bot, config):
+        self.bot = bot
+        self.config = config
+        # ID сервера -> канал логов (None - канал не настроен или недоступен)
+        self.routes: Dict[int, Optional[object]] = {}
+        # ID сервера -> момент повторной проверки отключенного маршрута
+        self.retry_at: Dict[int, float] = {}
+        self.states: Dict[int, DestinationState] = {}
+        self.fetching: Set[int] = set()
+        self.tasks: Set[asyncio.Task] = set()
+        self.fetched = 0
+        self.notifications = 0
+
+    def route(self, guild_id: int):
+        """Возвращает канал логов сервера или None"""
+        try:
+            channel = self.routes[guild_id]
+        except KeyError:
+            return self._resolve(guild_id)
+        if channel is None:
+            retry_at = self.retry_at.get(guild_id)
+            if retry_at is not None and time.monotonic() >= retry_at:
+                return self._resolve(guild_id)
+        return channel
+
+    def _resolve(self, guild_id: int):
+        self.retry_at.pop(guild_id, None)
+        channel_id = self.config.get_log_channel_id(guild_id)
+        if not channel_id:
+            self.routes[guild_id] = None
+            return None
+
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            # До on_ready кэш каналов еще пуст, такой промах не запоминаем
+            if not self.bot.is_ready():
+                return None
+            self._start_fetch(guild_id, channel_id)
+            self._disable(guild_id, f"канал {channel_id} не найден в кэше", notify=False)
+            return None
+
+        return self._accept(guild_id, channel)
+
+    def _accept(self, guild_id: int, channel):
+        """Запоминает канал, если у бота есть права на отправку логов"""
+        missing = self.missing_permissions(channel)
+        if missing:
+            self._disable(guild_id, f"нет прав {', '.join(missing)} в канале #{channel.name}", permanent=True)
+            return None
+        self.routes[guild_id] = channel
+        return channel
+
+    @staticmethod
+    def missing_permissions(channel) -> List[str]:
+        """Возвращает недостающие права бота в канале логов"""
+        me = channel.guild.me
+        if me is None:
+            # Участник-бот еще не загружен: права проверим при отправке
+            return []
+        permissions = channel.permissions_for(me)
+        return [name for name in REQUIRED_PERMISSIONS if not getattr(permissions, name)]
+
+    def _start_fetch(self, guild_id: int, channel_id: int):
+        """Запрашивает канал через REST API, если его нет в кэше"""
+        if guild_id in self.fetching:
+            return
+        self.fetching.add(guild_id)
+        self._spawn(self._fetch(guild_id, channel_id))
+
+    async def _fetch(self, guild_id: int, channel_id: int):
+        try:
+            channel = await self.bot.fetch_channel(channel_id)
+        except discord.NotFound:
+            self._disable(guild_id, f"канал {channel_id} удален", permanent=True)
+            return
+        except discord.Forbidden:
+            self._disable(guild_id, f"нет доступа к каналу {channel_id}", permanent=True)
+            return
+        except (discord.HTTPException, OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"Не удалось запросить канал логов {channel_id} сервера {guild_id}: {e}")
+            return
+        finally:
+            self.fetching.discard(guild_id)
+
+        self.fetched += 1
+        # Пока шел запрос, канал логов могли сменить
+        if self.config.get_log_channel_id(guild_id) != channel_id:
+            return
+        if getattr(channel, 'guild', None) is None or channel.guild.id != guild_id:
+            self._disable(guild_id, f"канал {channel_id} не принадлежит серверу", permanent=True)
+            return
+        if self._accept(guild_id, channel) is not None:
+            self.retry_at.pop(guild_id, None)
+            self.states.pop(guild_id, None)
+
+    # === АВТОМАТ ОТКЛЮЧЕНИЯ ===
+    def _disable(self, guild_id: int, reason: str, ttl: float = None, notify: bool = True,
+                 permanent: bool = False):
+        """Отключает маршрут сервера на ttl секунд"""
+        if ttl is None:
+            ttl = self.config.log_channel_retry
+        self.routes[guild_id] = None
+        self.retry_at[guild_id] = time.monotonic() + ttl
+
+        state = self.states.get(guild_id)
+        if state is None:
+            state = self.states[guild_id] = DestinationState()
+        state.permanent = permanent
+        if state.reason != reason:
+            state.reason = reason
+            logger.warning(f"Логи сервера {guild_id} приостановлены на {ttl:g} с: {reason}")
+        if notify and not state.notified:
+            state.notified = True
+            self._spawn(self._notify_owner(guild_id, reason))
+
+    def record_success(self, guild_id: int):
+        """Отмечает успешную отправку: канал снова исправен"""
+        state = self.states.pop(guild_id, None)
+        if state is not None and state.reason is not None:
+            logger.info(f"Отправка логов сервера {guild_id} восстановлена")
+
+    def record_failure(self, guild_id: int, reason: str, permanent: bool = False):
+        """Учитывает сбой отправки.
+
+        Постоянная ошибка (403, 404) или серия из log_breaker_threshold
+        временных сразу приостанавливает отправку; пауза удваивается с
+        каждым повторным срабатыванием.
+        """
+        state = self.states.get(guild_id)
+        if state is None:
+            state = self.states[guild_id] = DestinationState()
+        state.failures += 1
+        if not permanent and state.failures < self.config.log_breaker_threshold:
+            return
+
+        cooldown = min(self.config.log_breaker_cooldown * 2 ** state.trips, MAX_BREAKER_COOLDOWN)
+        state.trips += 1
+        self._disable(guild_id, reason, ttl=cooldown, permanent=permanent)
+
+    def is_available(self, guild_id: int) -> bool:
+        """Проверяет, не приостановлена ли отправка в канал логов сервера"""
+        retry_at = self.retry_at.get(guild_id)
+        return retry_at is None or time.monotonic() >= retry_at
+
+    def pause_remaining(self, guild_id: int) -> Optional[float]:
+        """Возвращает, сколько секунд осталось до проверки канала после временной паузы.
+
+        None - отправка не приостановлена или причина постоянная (канал
+        удален, нет прав): ждать ее окончания бессмысленно.
+        """
+        retry_at = self.retry_at.get(guild_id)
+        if retry_at is None:
+            return None
+        remaining = retry_at - time.monotonic()
+        if remaining <= 0:
+            return None
+        state = self.states.get(guild_id)
+        if state is not None and state.permanent:
+            return None
+        return remaining
+
+    def unavailable_reason(self, guild_id: int) -> Optional[str]:
+        """Возвращает причину приостановки отправки или None"""
+        if self.is_available(guild_id):
+            return None
+        state = self.states.get(guild_id)
+        return state.reason if state is not None else None
+
+    async def _notify_owner(self, guild_id: int, reason: str):
+        """Сообщает владельцу сервера о неисправном канале логов"""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        try:
+            owner = guild.owner or await self.bot.fetch_user(guild.owner_id)
+            await owner.send(
+                f"⚠️ Бот не может отправлять логи сервера **{guild.name}**: {reason}.\n"
+                f"Проверьте канал логов (`!setlogchannel`) и права бота в нем: просмотр канала, "
+                f"отправка сообщений, встраивание ссылок и прикрепление файлов."
+            )
+            self.notifications += 1
+        except (discord.HTTPException, AttributeError) as e:
+            logger.warning(f"Не удалось уведомить владельца сервера {guild_id}: {e}")
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    # === СБРОС ===
+    def invalidate(self, guild_id: int):
+        """Сбрасывает маршрут и сбои сервера (например, после !setlogchannel)"""
+        self.routes.pop(guild_id, None)
+        self.retry_at.pop(guild_id, None)
+        self.states.pop(guild_id, None)
+
+    def refresh_guild(self, guild_id: int):
+        """Перепроверяет канал и права после изменения ролей или участника-бота"""
+        self.routes.pop(guild_id, None)
+        self.retry_at.pop(guild_id, None)
+
+    def refresh_channel(self, channel):
+        """Перепроверяет права, если изменился канал логов или его категория"""
+        guild_id = channel.guild.id
+        log_channel_id = self.config.get_log_channel_id(guild_id)
+        if not log_channel_id:
+            return
+        if channel.id == log_channel_id or isinstance(channel, discord.CategoryChannel):
+            self.refresh_guild(guild_id)
+
+    def invalidate_channel(self, channel_id: int):
+        """Сбрасывает маршруты, ведущие в удаленный канал"""
+        for guild_id, channel in list(self.routes.items()):
+            if channel is not None and channel.id == channel_id:
+                del self.routes[guild_id]
+
+    def clear(self):
+        """Сбрасывает всю таблицу"""
+        self.routes.clear()
+        self.retry_at.clear()
+
+    def get_stats(self) -> dict:
+        """Возвращает статистику маршрутов"""
+        return {
+            'routes': sum(1 for channel in self.routes.values() if channel is not None),
+            'unavailable': sum(1 for guild_id in self.retry_at if not self.is_available(guild_id)),
+            'fetched': self.fetched,
+            'notifications': self.notifications
+        }
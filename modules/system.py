@@ -0,0 +1,29 @@
+"""
+Модуль сведений о процессе бота
+"""
+import os
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def get_rss_bytes() -> int:
+    """Возвращает текущий размер резидентной памяти процесса в байтах"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    if resource is not None:
+        # На других Unix доступен только пик памяти (в КБ на Linux, в байтах на macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    return 0
+
+
+def format_bytes(size: int) -> str:
+    """Форматирует размер в мегабайтах"""
+    return f"{size / (1024 * 1024):.1f} МБ"
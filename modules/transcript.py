@@ -0,0 +1,88 @@
+"""
+Модуль расшифровок удаленных сообщений для логов массового удаления
+"""
+import io
+import json
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+# Форматы расшифровки: txt (для чтения) и jsonl (для обработки)
+TRANSCRIPT_FORMATS = ('txt', 'jsonl')
+
+
+class TranscriptMessage:
+    """Удаленное сообщение, снятое с объектов discord.py в потоке событий"""
+    __slots__ = ('message_id', 'author_id', 'author_name', 'created_at', 'content', 'attachments')
+
+    def __init__(self, message_id: int, author_id: int, author_name: Optional[str],
+                 created_at: Optional[datetime], content: str, attachments: Tuple[str, ...]):
+        self.message_id = message_id
+        self.author_id = author_id
+        self.author_name = author_name
+        self.created_at = created_at
+        self.content = content
+        self.attachments = attachments
+
+    @classmethod
+    def from_message(cls, message) -> 'TranscriptMessage':
+        return cls(
+            message.id,
+            message.author.id,
+            str(message.author),
+            message.created_at,
+            message.content or "",
+            tuple(attachment.url for attachment in message.attachments)
+        )
+
+    @classmethod
+    def from_cached(cls, cached, author=None) -> 'TranscriptMessage':
+        """Из записи MessageContentCache: вложения известны только по ID"""
+        return cls(
+            cached.message_id,
+            cached.author_id,
+            str(author) if author is not None else None,
+            cached.created_at,
+            cached.content,
+            tuple(str(attachment_id) for attachment_id in cached.attachment_ids)
+        )
+
+
+def _write_txt(out: io.StringIO, messages: List[TranscriptMessage]):
+    for message in messages:
+        created = f"{message.created_at:%Y-%m-%d %H:%M:%S} UTC" if message.created_at else "время неизвестно"
+        author = f"{message.author_name} ({message.author_id})" if message.author_name else str(message.author_id)
+        out.write(f"[{created}] {author}: {message.content}\n")
+        for attachment in message.attachments:
+            out.write(f"    вложение: {attachment}\n")
+
+
+def _write_jsonl(out: io.StringIO, messages: List[TranscriptMessage]):
+    for message in messages:
+        out.write(json.dumps({
+            'id': message.message_id,
+            'author_id': message.author_id,
+            'author': message.author_name,
+            'created_at': message.created_at.isoformat() if message.created_at else None,
+            'content': message.content,
+            'attachments': list(message.attachments)
+        }, ensure_ascii=False))
+        out.write("\n")
+
+
+def render_transcript(messages: Iterable[TranscriptMessage], fmt: str = 'txt') -> bytes:
+    """Собирает расшифровку в порядке отправки сообщений.
+
+    Не обращается к объектам discord.py, поэтому может выполняться в
+    отдельном потоке.
+    """
+    ordered = sorted(messages, key=lambda message: message.message_id)
+    out = io.StringIO()
+    if fmt == 'jsonl':
+        _write_jsonl(out, ordered)
+    else:
+        _write_txt(out, ordered)
+    return out.getvalue().encode('utf-8')
+
+
+def transcript_filename(channel_id: int, fmt: str = 'txt') -> str:
+    return f"deleted-{channel_id}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{fmt}"
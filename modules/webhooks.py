@@ -0,0 +1,123 @@
+"""
+Модуль отправки логов через пул вебхуков
+"""
+import itertools
+import logging
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Имя вебхуков, которые бот создает и переиспользует в каналах логов
+WEBHOOK_NAME = "Discord Logger"
+
+
+class WebhookPool:
+    """Отправляет логи через несколько вебхуков канала по кругу.
+
+    У каждого вебхука собственный лимит частоты, поэтому несколько вебхуков
+    на канал позволяют отправлять больше логов в секунду, не занимая лимит
+    бота на канал. Если у бота нет права Manage Webhooks или Discord
+    отклонил запрос вебхуков, канал до сброса (invalidate) переводится на
+    обычную отправку через channel.send.
+    """
+
+    def __init__(self, bot, pool_size: int = 2, trace_config: Optional[aiohttp.TraceConfig] = None):
+        self.bot = bot
+        self.pool_size = max(1, pool_size)
+        self.trace_config = trace_config
+        self.session: Optional[aiohttp.ClientSession] = None
+
+        # ID канала -> вебхуки (None - канал работает без вебхуков)
+        self.pools: Dict[int, Optional[List[discord.Webhook]]] = {}
+        self.cycles: Dict[int, itertools.cycle] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую HTTP-сессию для всех вебхуков"""
+        if self.session is None or self.session.closed:
+            trace_configs = [self.trace_config] if self.trace_config is not None else None
+            self.session = aiohttp.ClientSession(trace_configs=trace_configs)
+        return self.session
+
+    async def _load_pool(self, channel) -> Optional[List[discord.Webhook]]:
+        """Находит или создает вебхуки бота в канале"""
+        me = channel.guild.me
+        if me is None or not channel.permissions_for(me).manage_webhooks:
+            logger.warning(f"Нет права Manage Webhooks в канале {channel.id}, логи отправляются напрямую")
+            return None
+
+        try:
+            existing = [
+                webhook for webhook in await channel.webhooks()
+                if webhook.name == WEBHOOK_NAME and webhook.token
+            ]
+        except discord.HTTPException as e:
+            logger.warning(f"Не удалось получить вебхуки канала {channel.id} ({e.status}), логи отправляются напрямую")
+            return None
+
+        try:
+            while len(existing) < self.pool_size:
+                existing.append(await channel.create_webhook(name=WEBHOOK_NAME, reason="Пул вебхуков для логов"))
+        except discord.HTTPException as e:
+            # Например, в канале уже 15 вебхуков: работаем с теми, что есть
+            logger.warning(f"Не удалось создать вебхук в канале {channel.id} ({e.status}), в пуле: {len(existing)}")
+            if not existing:
+                return None
+
+        session = self._get_session()
+        return [
+            discord.Webhook.partial(webhook.id, webhook.token, session=session)
+            for webhook in existing[:self.pool_size]
+        ]
+
+    async def _next_webhook(self, channel) -> Optional[discord.Webhook]:
+        """Возвращает следующий вебхук канала по кругу"""
+        if channel.id not in self.pools:
+            pool = await self._load_pool(channel)
+            self.pools[channel.id] = pool
+            if pool:
+                self.cycles[channel.id] = itertools.cycle(pool)
+
+        if not self.pools[channel.id]:
+            return None
+        return next(self.cycles[channel.id])
+
+    def invalidate(self, channel_id: int):
+        """Сбрасывает закэшированные вебхуки канала"""
+        self.pools.pop(channel_id, None)
+        self.cycles.pop(channel_id, None)
+
+    async def send(self, channel, embeds: List[discord.Embed],
+                   make_files: Callable[[], List[discord.File]] = list):
+        """Отправляет embed через вебхук канала или напрямую при его отсутствии.
+
+        Если вебхук отклонил пачку, она один раз отправляется через
+        channel.send. make_files создает вложения заново для каждой попытки.
+        """
+        webhook = await self._next_webhook(channel)
+        if webhook is None:
+            await channel.send(embeds=embeds, files=make_files())
+            return
+
+        user = self.bot.user
+        try:
+            await webhook.send(
+                embeds=embeds,
+                files=make_files(),
+                username=user.display_name if user else WEBHOOK_NAME,
+                avatar_url=user.display_avatar.url if user else None
+            )
+        except discord.HTTPException as e:
+            # Вебхук удалили, у бота отозвали Manage Webhooks или Discord не ответил после
+            # своих повторов: пул пересоздадим при следующей отправке, а эту пачку отправим
+            # напрямую. До маршрутизатора доходит только ошибка прямой отправки
+            logger.warning(f"Вебхук канала {channel.id} не принял логи ({e.status}), отправка напрямую")
+            self.invalidate(channel.id)
+            await channel.send(embeds=embeds, files=make_files())
+
+    async def close(self):
+        """Закрывает HTTP-сессию вебхуков"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
@@ -0,0 +1,310 @@
+"""
+Воспроизведение записанных событий шлюза через обработчики bot.py
+
+Запись включается настройкой record_events (RECORD_EVENTS=events.jsonl.gz).
+Воспроизведение не подключается к Discord: вебсокет и REST API заменены
+заглушками, а события передаются в парсеры discord.py и дальше в
+обработчики bot.py, как при настоящей работе. Конфигурация берется из
+config.json, но изменения команд сохраняются во временную копию.
+
+С --rest-url запросы идут не в заглушку, а в HTTP-сервер по адресу
+(например, benchmarks/fake_discord.py) через настоящий клиент discord.py
+с его обработкой лимитов.
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import discord
+import discord.webhook.async_
+
+# Бот воспроизводит все события в одном процессе без шардов
+os.environ.pop('SHARD_COUNT', None)
+os.environ.pop('SHARD_IDS', None)
+os.environ.pop('CLUSTER_ID', None)
+
+import bot as bot_module
+from modules.journal import EventJournal
+from modules.recorder import read_recording
+
+logger = logging.getLogger('replay')
+
+# События подключения: воспроизводятся без пауз до готовности бота
+SETUP_EVENTS = {'READY', 'GUILD_CREATE', 'GUILD_MEMBERS_CHUNK', 'RESUMED'}
+
+
+class StubGateway:
+    """Заглушка вебсокета шлюза"""
+    latency = 0.0
+    shard_id = None
+
+    async def change_presence(self, **kwargs):
+        pass
+
+    async def request_chunks(self, *args, **kwargs):
+        pass
+
+    def is_ratelimited(self) -> bool:
+        return False
+
+
+class StubHTTP:
+    """Заглушка REST API: считает запросы и отвечает правдоподобными данными"""
+
+    def __init__(self, client, latency: float = 0.0):
+        self.client = client
+        self.latency = latency
+        self.requests = collections.Counter()
+        self.message_id = 0
+
+    async def request(self, route, **kwargs):
+        self.requests[f"{route.method} {route.path}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if route.method == 'POST' and route.path.endswith('/messages'):
+            return self.message_payload(route.channel_id)
+        return {}
+
+    def message_payload(self, channel_id) -> dict:
+        self.message_id += 1
+        user = self.client.user
+        return {
+            'id': str(self.message_id),
+            'channel_id': str(channel_id),
+            'type': 0,
+            'content': '',
+            'author': {
+                'id': str(user.id) if user else '0',
+                'username': user.name if user else 'replay',
+                'discriminator': '0',
+                'avatar': None
+            },
+            'attachments': [],
+            'embeds': [],
+            'mentions': [],
+            'mention_roles': [],
+            'mention_everyone': False,
+            'pinned': False,
+            'tts': False,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'edited_timestamp': None,
+            'flags': 0,
+            'components': []
+        }
+
+
+class Replayer:
+    """Передает записанные события в парсеры ConnectionState"""
+
+    def __init__(self, client, speed: float, max_gap: float):
+        self.client = client
+        self.state = client._connection
+        self.speed = speed
+        self.max_gap = max_gap
+        self.replayed = collections.Counter()
+        self.skipped = collections.Counter()
+        self.errors = 0
+        self.seen_ready = False
+        # Задачи обработчиков, запущенные dispatch: их ждут до закрытия очереди логов
+        self.handlers = set()
+        schedule_event = client._schedule_event
+
+        def track_event(*args, **kwargs):
+            task = schedule_event(*args, **kwargs)
+            self.handlers.add(task)
+            task.add_done_callback(self.handlers.discard)
+            return task
+
+        client._schedule_event = track_event
+
+    def feed(self, record: dict):
+        event = record['e']
+        # Несколько шардов записи - несколько READY; повторный READY очистил бы кэш
+        if event == 'READY':
+            if self.seen_ready:
+                self.skipped[event] += 1
+                return
+            self.seen_ready = True
+
+        parser = self.state.parsers.get(event)
+        if parser is None:
+            self.skipped[event] += 1
+            return
+        try:
+            parser(record['d'])
+        except Exception as e:
+            self.errors += 1
+            if self.errors <= 10:
+                logger.error(f"Ошибка разбора события {event}: {e}")
+            return
+        self.replayed[event] += 1
+
+    async def wait_handlers(self):
+        """Дожидается обработчиков, которые еще готовят логи (например, расшифровку в потоке)"""
+        while self.handlers:
+            await asyncio.gather(*self.handlers, return_exceptions=True)
+
+    async def run(self, records) -> float:
+        """Воспроизводит события после подключения и возвращает время воспроизведения"""
+        records = iter(records)
+        pending = None
+
+        # Подключение: READY и серверы загружаются без пауз и в замер не входят
+        for record in records:
+            if record['e'] not in SETUP_EVENTS:
+                pending = record
+                break
+            self.feed(record)
+            await asyncio.sleep(0)
+        try:
+            await asyncio.wait_for(self.client.wait_until_ready(), timeout=30)
+        except asyncio.TimeoutError:
+            logger.warning("Бот не перешел в состояние готовности, воспроизведение продолжается")
+
+        if pending is None:
+            return 0.0
+        return await self.play(itertools.chain([pending], records))
+
+    async def play(self, records, skip_setup: bool = False) -> float:
+        """Воспроизводит события с паузами записи.
+
+        skip_setup пропускает READY и GUILD_CREATE при повторном проходе по
+        той же записи, чтобы серверы не добавлялись в кэш заново.
+        """
+        started = time.perf_counter()
+        virtual = 0.0
+        previous = None
+        for record in records:
+            if skip_setup and record['e'] in SETUP_EVENTS:
+                continue
+            if self.speed > 0:
+                if previous is not None:
+                    virtual += min(max(record['t'] - previous, 0.0), self.max_gap)
+                previous = record['t']
+                delay = started + virtual / self.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self.feed(record)
+            # Даем обработчикам, запущенным dispatch, выполниться
+            await asyncio.sleep(0)
+        return time.perf_counter() - started
+
+
+def prepare(args):
+    """Настраивает бота из bot.py для работы без Discord"""
+    client = bot_module.bot
+    config = bot_module.config
+    discord_logger = bot_module.discord_logger
+
+    # Команды из записанных сообщений не должны менять рабочий config.json
+    config_dir = tempfile.mkdtemp(prefix='replay-')
+    replay_config = os.path.join(config_dir, 'config.json')
+    if os.path.exists(config.config_file):
+        shutil.copy(config.config_file, replay_config)
+    config.config_file = replay_config
+
+    # Логи уходят в заглушку REST, а не в рабочий журнал и вебхуки
+    discord_logger.journal = EventJournal(args.journal) if args.journal else None
+
+    client.ws = StubGateway()
+    if args.rest_url:
+        # Настоящий HTTP-клиент discord.py, но с другим адресом API
+        base = args.rest_url.rstrip('/') + '/api/v10'
+        discord.http.Route.BASE = base
+        discord.webhook.async_.Route.BASE = base
+        stub_http = None
+    else:
+        discord_logger.webhooks = None
+        stub_http = StubHTTP(client, latency=args.rest_latency)
+        client.http.request = stub_http.request
+    client._connection._chunk_guilds = False
+    client._connection.guild_ready_timeout = 0.1
+    bot_module.bot_commands.setup_commands()
+    return client, discord_logger, stub_http, config_dir
+
+
+async def replay(args):
+    client, discord_logger, stub_http, config_dir = prepare(args)
+    await client._async_setup_hook()
+    if args.rest_url:
+        await client.http.static_login(bot_module.config.token or 'replay')
+
+    replayer = Replayer(client, speed=args.speed, max_gap=args.max_gap)
+    records = read_recording(args.path)
+    if args.limit:
+        records = itertools.islice(records, args.limit)
+
+    elapsed = await replayer.run(records)
+    await finish(client, discord_logger, config_dir, replayer)
+    report(args, replayer, elapsed, discord_logger, stub_http)
+
+
+async def finish(client, discord_logger, config_dir: str, replayer: Replayer = None):
+    """Дожидается обработчиков и отправки логов и освобождает ресурсы"""
+    # После close() очередь отклоняет логи, поэтому сначала ждем незавершенные обработчики
+    if replayer is not None:
+        await replayer.wait_handlers()
+    while discord_logger.delivery.depth():
+        await asyncio.sleep(0.01)
+    await discord_logger.close()
+    await client.http.close()
+    shutil.rmtree(config_dir, ignore_errors=True)
+
+
+def report(args, replayer: Replayer, elapsed: float, discord_logger, stub_http):
+    total = sum(replayer.replayed.values())
+    metrics = bot_module.metrics
+    handled = sum(state[-1] for state in metrics.handler_latency.values.values())
+    handler_time = sum(state[-2] for state in metrics.handler_latency.values.values())
+    delivery = discord_logger.delivery.get_stats()
+
+    print(f"Воспроизведено событий: {total} (пропущено: {sum(replayer.skipped.values())}, ошибок: {replayer.errors})")
+    if elapsed:
+        print(f"Время: {elapsed:.2f} с, {total / elapsed:,.0f} событий/с (скорость x{args.speed:g})")
+    print(f"Вызовов обработчиков: {handled}, суммарно {handler_time * 1000:.0f} мс")
+    print(
+        f"Логов отправлено: {delivery['sent']} в {delivery['requests']} запросах, "
+        f"потеряно: {delivery['dropped']} (в том числе отклонено после остановки), "
+        f"пропущено: {delivery['skipped']}"
+    )
+    print("Частые события:")
+    for event, count in replayer.replayed.most_common(args.top):
+        print(f"  {event:<32} {count}")
+    if stub_http is not None:
+        print("Запросы к REST API:")
+        for route, count in stub_http.requests.most_common(args.top):
+            print(f"  {route:<48} {count}")
+
+
+def build_parser(description: str = __doc__) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='файл записи (events.jsonl.gz)')
+    parser.add_argument('--speed', type=float, default=1.0, help='ускорение относительно записи (0 - без пауз)')
+    parser.add_argument('--max-gap', type=float, default=5.0, help='максимальная пауза между событиями, сек')
+    parser.add_argument('--limit', type=int, default=0, help='воспроизвести только первые N событий')
+    parser.add_argument('--rest-latency', type=float, default=0.0, help='задержка ответа заглушки REST, сек')
+    parser.add_argument('--journal', default='', help='писать журнал SQLite в указанный файл')
+    parser.add_argument('--rest-url', default='', help='адрес сервера, заменяющего REST API (вместо заглушки)')
+    parser.add_argument('--top', type=int, default=10)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"❌ Файл записи не найден: {args.path}")
+        sys.exit(1)
+    asyncio.run(replay(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Тесты логирования статуса: отсев копий с общих серверов и объединение переходов
+"""
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import discord
+
+from fakes import FakeBot, FakeGuild
+from modules.config import BotConfig
+from modules.logger import DiscordLogger
+
+USER_ID = 1
+A = discord.Status.online
+B = discord.Status.idle
+
+
+def presence(status):
+    return SimpleNamespace(status=status)
+
+
+class PresenceTestCase(unittest.IsolatedAsyncioTestCase):
+    presence_window = 0
+
+    async def asyncSetUp(self):
+        self.config_dir = tempfile.TemporaryDirectory()
+        self.guilds = [FakeGuild(guild_id, [USER_ID]) for guild_id in (1, 2)]
+
+        config = BotConfig(os.path.join(self.config_dir.name, 'config.json'))
+        config.journal_path = ''
+        config.server_log_channels = {str(guild.id): guild.log_channel.id for guild in self.guilds}
+        config.presence_window = self.presence_window
+        config.compile_log_masks()
+
+        self.logger = DiscordLogger(FakeBot(self.guilds), config)
+        self.logger.membership.rebuild(self.guilds)
+        self.sent = []
+
+        async def send_event(guild_id, event, user, fields, **kwargs):
+            self.sent.append((guild_id, event, fields))
+
+        self.logger.send_event = send_event
+
+    async def asyncTearDown(self):
+        await self.logger.presence_coalescer.flush_all()
+        self.config_dir.cleanup()
+
+    async def dispatch(self, old, new):
+        """Имитирует discord.py: по событию с каждого общего сервера"""
+        for guild in self.guilds:
+            member = guild.get_member(USER_ID)
+            member.status = new
+            await self.logger.log_presence_update(presence(old), member)
+
+
+class PresenceDedupeTest(PresenceTestCase):
+
+    async def test_copies_from_shared_guilds_logged_once(self):
+        await self.dispatch(A, B)
+
+        self.assertEqual(sorted(guild_id for guild_id, _, _ in self.sent), sorted(g.id for g in self.guilds))
+        self.assertEqual(self.logger.presence_dedupe.hits, 1)
+
+    async def test_repeated_transition_is_not_dropped(self):
+        for old, new in ((A, B), (B, A), (A, B), (B, A)):
+            await self.dispatch(old, new)
+
+        # Каждый из 4 переходов доходит до обоих серверов
+        self.assertEqual(len(self.sent), 8)
+        self.assertEqual(self.logger.presence_dedupe.hits, 4)
+        self.assertEqual(len(self.logger.presence_dedupe), 0)
+
+
+
+class PresenceCoalesceTest(PresenceTestCase):
+    presence_window = 60
+
+    def chains(self):
+        """Цепочки из логов, отправленных по окончании окна"""
+        return {
+            guild_id: dict((name, value) for name, value, _ in fields)["Изменения"]
+            for guild_id, _, fields in self.sent
+            if fields[0][0] == "Изменения"
+        }
+
+    async def test_repeated_transitions_kept_in_chain(self):
+        for old, new in ((A, B), (B, A), (A, B), (B, A)):
+            await self.dispatch(old, new)
+        # Первый переход уходит сразу, остальные копятся в окне
+        self.assertEqual(len(self.sent), 2)
+
+        await self.logger.presence_coalescer.flush_all()
+
+        labels = [self.logger.format_status(status) for status in (B, A, B, A)]
+        expected = " → ".join(labels)
+        self.assertEqual(self.chains(), {guild.id: expected for guild in self.guilds})
+
+    async def test_flush_ends_with_current_status(self):
+        for old, new in ((A, B), (B, A), (A, B)):
+            await self.dispatch(old, new)
+        # Переход B→A, событие которого не дошло
+        for guild in self.guilds:
+            guild.get_member(USER_ID).status = A
+
+        await self.logger.presence_coalescer.flush_all()
+
+        labels = [self.logger.format_status(status) for status in (B, A, B, A)]
+        expected = " → ".join(labels)
+        self.assertEqual(self.chains(), {guild.id: expected for guild in self.guilds})
+
+
+if __name__ == '__main__':
+    unittest.main()